@@ -1,46 +1,100 @@
+import time
+_started = time.perf_counter()
+
 import sys
+from types import MappingProxyType
 from typing import Dict
 
-from frozendict import frozendict
-
-from PyQt5.Qt import QApplication
-from PyQt5.QtCore import QTranslator, QLibraryInfo, QLocale
+from PyQt5.QtCore import QTranslator, QLibraryInfo, QLocale, QTimer, QT_VERSION_STR
+from PyQt5.QtWidgets import QApplication
 
 from common import finalize
-from hw_config_controller import HardwareConfigController
+from instrumentation import StallWatchdog, enable_from_argv
+from save_queue import autosave_interval_from_argv
+from startup_profile import StartupProfile, callOnFirstPaint
+from warm_cache import WarmStartCache
 
 __all__ = ['main', 'manifest', 'HardwareConfigController']
 
 
-qt_translation_dir = QLibraryInfo.location(QLibraryInfo.TranslationsPath)
-
-manifest = frozendict(
+manifest = MappingProxyType(dict(
 	applicationName="Конфигуратор АРМ",
 	applicationVersion="1.0",
 	organizationName="Александра Хетцер",
 	# organizationDomain="",
-)
+))
+
 
+# The controller pulls in most of the application; it is only imported when asked for
+def __getattr__(name):
+	if name == 'HardwareConfigController':
+		from hw_config_controller import HardwareConfigController
+		return HardwareConfigController
+	raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
+
+# `known_paths` maps a file to the translation found for it last time, which skips the lookup
 @finalize(dict)
-def loadTranslations(directory, *files) -> Dict[str, QTranslator]:
+def loadTranslations(directory, *files, known_paths=None) -> Dict[str, QTranslator]:
 	locale = QLocale('ru')
 	for file in files:
 		tran = QTranslator()
-		if tran.load(locale, file, '_', directory):
+		path = (known_paths or {}).get(file)
+		if path and tran.load(path) or tran.load(locale, file, '_', directory):
 			yield file, tran
 
 
-def main():
-	app = QApplication(sys.argv, **manifest)
-	app.setApplicationDisplayName(manifest['applicationName'])
-	trans = loadTranslations(qt_translation_dir, 'qtbase')
+def installTranslations(app: QApplication, cache: WarmStartCache = None):
+	key = f'translations/{QT_VERSION_STR}'
+	known_paths = cache.get(key, dict()).get('value') if cache is not None else None
+	if known_paths and cache.getFor(key, *known_paths.values()) is None:
+		known_paths = None
+	qt_translation_dir = QLibraryInfo.location(QLibraryInfo.TranslationsPath)
+	trans = loadTranslations(qt_translation_dir, 'qtbase', known_paths=known_paths)
 	for tran in trans.values():
 		app.installTranslator(tran)
 		tran.setParent(app)
-	wnd = HardwareConfigController()
+	if cache is not None:
+		paths = {file: tran.filePath() for file, tran in trans.items()}
+		cache.setFor(key, paths, *paths.values())
+
+
+def main():
+	profile = StartupProfile.fromArgv(sys.argv, _started)
+	profile.mark("import")
+	tracer = enable_from_argv(sys.argv)
+	app = QApplication(sys.argv, **manifest)
+	app.setApplicationDisplayName(manifest['applicationName'])
+	cache = WarmStartCache.forApplication(manifest['applicationVersion'])
+	profile.mark("QApplication")
+	from hw_config_controller import HardwareConfigController
+	profile.mark("controller import")
+	wnd = HardwareConfigController(warm_cache=cache, autosave_interval=autosave_interval_from_argv(sys.argv))
+	profile.mark("window construction")
+
+	def onPainted():
+		profile.mark("first show")
+		QTimer.singleShot(0, onShown)
+
+	def onShown():
+		# Only Qt's own dialogs need the translations, and none can be up yet
+		installTranslations(app, cache)
+		cache.save()
+		profile.mark("translator load")
+		profile.report()
+
+	callOnFirstPaint(wnd, onPainted)
 	wnd.show()
-	app.exec()
+	if tracer is None:
+		app.exec()
+		return
+	watchdog = StallWatchdog(tracer)
+	watchdog.start()
+	try:
+		app.exec()
+	finally:
+		watchdog.stop()
+		tracer.save()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,202 @@
+import argparse
+import io
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from hw_config_file import JsonFormat, create_file_formats
+from hw_config_model import HardwareConfig
+
+__all__ = ['ExportJob', 'read_manifest', 'export_batch', 'export_into', 'main']
+
+
+# Batch export without the GUI: no `QApplication` is created, only the file formats are used.
+#
+# The manifest is JSON Lines, one configuration per line:
+#     {"output": "out/arm-001.html", "config": {"systemUnit": "...", "monitor": "..."}}
+#     {"output": "out/arm-002.txt", "source": "saved/arm-002.json"}
+# `source` names a configuration saved as JSON; `format` ("HTML", "json", "txt", ...) overrides the
+# format otherwise chosen by the output suffix. Relative paths are resolved against the manifest.
+# With `--into`, all configurations are streamed into one file instead and `output` is not needed.
+
+_FORMATS_BY_NAME = {file_format.name().casefold(): file_format for file_format in create_file_formats()}
+_FORMATS_BY_SUFFIX = {
+	suffix: file_format
+	for file_format in create_file_formats()
+	for suffix in file_format.fileSuffixes()
+}
+# Several configurations in one JSON file are written as JSON Lines
+_FORMATS_BY_SUFFIX['jsonl'] = _FORMATS_BY_SUFFIX['json']
+
+
+class ExportJob(NamedTuple):
+	output: Optional[str]
+	config: Optional[HardwareConfig] = None
+	source: Optional[str] = None
+	format: Optional[str] = None
+	# Line of the manifest, for error messages
+	line: int = 0
+	# Why the manifest line could not be read; the job then only reports it
+	error: Optional[str] = None
+
+
+# Every job needs an `output` unless `require_output` is false (for `export_into`)
+def read_manifest(file_name, output_dir=None, require_output=True) -> Iterator[ExportJob]:
+	base = os.path.dirname(os.path.abspath(file_name))
+	output_base = os.path.abspath(output_dir) if output_dir else base
+	with io.open(file_name, 'rt', encoding='utf-8') as file:
+		for line_number, line in enumerate(file, 1):
+			if not line.strip():
+				continue
+			# A malformed line fails on its own, like a missing `source`, instead of ending the run
+			try:
+				entry = json.loads(line)
+				if not isinstance(entry, dict):
+					raise ValueError("ожидается объект JSON")
+				if ('config' in entry) == ('source' in entry):
+					raise ValueError("нужно одно из \"config\"/\"source\"")
+				source, output = entry.get('source'), entry.get('output')
+				if require_output and not output:
+					raise ValueError("нужно поле \"output\" (или --into)")
+				job = ExportJob(
+					output=os.path.join(output_base, output) if output else None,
+					config=HardwareConfig(entry['config']) if 'config' in entry else None,
+					source=os.path.join(base, source) if source else None,
+					format=entry.get('format'),
+					line=line_number,
+				)
+			except (ValueError, TypeError) as ex:
+				job = ExportJob(output=None, line=line_number, error=_error_text(ex))
+			yield job
+
+
+def _file_format(format_name, file_name):
+	if format_name:
+		key = format_name.casefold()
+		file_format = _FORMATS_BY_NAME.get(key) or _FORMATS_BY_SUFFIX.get(key)
+	else:
+		file_format = _FORMATS_BY_SUFFIX.get(os.path.splitext(file_name or '')[1][1:].lower())
+	if file_format is None or not file_format.writable():
+		raise ValueError(f"Неизвестный формат файла: {format_name or file_name}")
+	return file_format
+
+
+def _config(job: ExportJob, reader: JsonFormat):
+	return job.config if job.config is not None else reader.read(job.source)
+
+
+def _error_text(ex):
+	return ''.join(traceback.format_exception_only(type(ex), ex)).strip()
+
+
+# Runs in the workers; one call per chunk keeps the per-job overhead of a process pool low
+def _export_chunk(jobs: List[ExportJob]) -> List[Tuple[ExportJob, Optional[str]]]:
+	results = list()
+	made_dirs = set()
+	reader = JsonFormat()
+	for job in jobs:
+		if job.error is not None:
+			results.append((job, job.error))
+			continue
+		try:
+			config = _config(job, reader)
+			directory = os.path.dirname(job.output)
+			if directory not in made_dirs:
+				os.makedirs(directory, exist_ok=True)
+				made_dirs.add(directory)
+			# Replaced atomically, but not synced one by one: a batch is simply rerun
+			_file_format(job.format, job.output).write(job.output, config, sync=False)
+			results.append((job, None))
+		except Exception as ex:
+			results.append((job, _error_text(ex)))
+	return results
+
+
+def _chunked(jobs: Iterable[ExportJob], size):
+	iterator = iter(jobs)
+	while chunk := list(islice(iterator, size)):
+		yield chunk
+
+
+# Yields `(job, error)` for every job, `error` being `None` on success. Results come chunk by chunk
+# in manifest order; at most `2 * workers` chunks are in flight, so the manifest is read lazily.
+def export_batch(jobs: Iterable[ExportJob], workers=None, processes=False, chunk_size=64) \
+		-> Iterator[Tuple[ExportJob, Optional[str]]]:
+	workers = workers or os.cpu_count() or 1
+	executor_type = ProcessPoolExecutor if processes else ThreadPoolExecutor
+	with executor_type(max_workers=workers) as executor:
+		pending = list()
+		for chunk in _chunked(jobs, chunk_size):
+			pending.append(executor.submit(_export_chunk, chunk))
+			if len(pending) >= 2 * workers:
+				yield from pending.pop(0).result()
+		for future in pending:
+			yield from future.result()
+
+
+# Streams every configuration into the one file `file_name` (JSON Lines, plain text records or
+# an HTML report), holding one configuration in memory at a time
+def export_into(jobs: Iterable[ExportJob], file_name, format_name=None) -> Iterator[Tuple[ExportJob, Optional[str]]]:
+	file_format = _file_format(format_name, file_name)
+	if not file_format.streamWritable():
+		raise ValueError(f"Формат {file_format.name()} не поддерживает несколько конфигураций в файле")
+	return _stream_into(jobs, file_format, file_name)
+
+
+def _stream_into(jobs, file_format, file_name):
+	reader = JsonFormat()
+	with file_format.openWriter(file_name) as writer:
+		for job in jobs:
+			if job.error is not None:
+				yield job, job.error
+				continue
+			try:
+				config = _config(job, reader)
+			except Exception as ex:
+				yield job, _error_text(ex)
+			else:
+				writer.write(config)
+				yield job, None
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Конфигуратор АРМ: пакетная выгрузка конфигураций")
+	parser.add_argument('manifest', help="JSON Lines file, one configuration per line")
+	parser.add_argument('-o', '--output-dir', help="base directory for relative output paths")
+	parser.add_argument('-j', '--jobs', type=int, help="number of workers (default: CPU count)")
+	parser.add_argument('--processes', action='store_true', help="use worker processes instead of threads")
+	parser.add_argument('--chunk-size', type=int, default=64)
+	parser.add_argument('--into', metavar='FILE', help="write all configurations into this one file")
+	parser.add_argument('--format', help="format of the --into file (default: by its suffix)")
+	args = parser.parse_args(argv)
+
+	started = time.perf_counter()
+	done = failed = 0
+	jobs = read_manifest(args.manifest, args.output_dir, require_output=not args.into)
+	if args.into:
+		try:
+			results = export_into(jobs, args.into, args.format)
+		except ValueError as ex:
+			parser.error(str(ex))
+	else:
+		results = export_batch(jobs, args.jobs, args.processes, args.chunk_size)
+	for job, error in results:
+		if error is None:
+			done += 1
+		else:
+			failed += 1
+			target = job.output or args.into
+			print(f"{args.manifest}:{job.line}: {target + ': ' if target else ''}{error}", file=sys.stderr)
+	elapsed = time.perf_counter() - started
+	rate = done / elapsed if elapsed else float('inf')
+	print(f"Выгружено {done} конфигураций за {elapsed:.2f} с ({rate:,.0f} в секунду), ошибок: {failed}")
+	return 1 if failed else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
@@ -0,0 +1,630 @@
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from registry_store import REGISTRY_COLUMNS, RegistryColumns
+
+try:
+	import resource
+except ImportError:
+	# Windows
+	resource = None
+
+__all__ = ['DEFAULT_SIZES', 'make_synthetic_goods', 'run_size', 'run_suite', 'compare_results', 'main']
+
+
+_NAME_STEMS = [
+	"Системный блок БЕШТАУ PC{n}/B560-{v:02}, БЕРТ.466219.{n:03}",
+	"Системный блок RDW Optimal G{v}",
+	"LCD-монитор «Сова» модель OМ{n}I, арт. OМ{n}I.FHD.SS.{v:02}.P2, ВРТГ.463135.{n:03}",
+	"Монитор БЕШТАУ M{n}FHD",
+	"Клавиатура ППКОП-{v} NFC в корпусе М{n}",
+	"Мышь компьютерная БЕШТАУ М{n}РУ",
+	"Кабель силовой ПВС {v}x{n} мм²",
+	"Источник бесперебойного питания «Штиль» {n}-{v}",
+]
+
+_OKPD2 = ['26.20.15.000', '26.20.17.110', '26.20.16.110', '26.20.16.120', '27.32.13.190', '27.90.11.000']
+_TNVED = ['8471500000', '8528520000', '8471607000', '8471608000', '8544429009', '8504403009']
+# Connectors listed in the specification per name stem, taken in turn
+_SPECS = [
+	("Параметры: HDMI, DisplayPort", "Параметры: VGA, DVI-D", None),
+	("Параметры: HDMI, DisplayPort", None),
+	("Входы: HDMI", "Входы: DisplayPort", "Входы: VGA", None),
+	("Входы: HDMI, VGA", None),
+	("Интерфейс: USB", "Интерфейс: PS/2", None),
+	("Интерфейс: USB", "Интерфейс: Bluetooth", None),
+	(None,),
+	(None,),
+]
+
+# Index into `_OKPD2`/`_TNVED` per name stem
+_STEM_CODES = [0, 0, 1, 1, 2, 3, 4, 5]
+
+
+def _synthetic_record(rng: random.Random, i):
+	kind = rng.randrange(len(_NAME_STEMS))
+	name = _NAME_STEMS[kind].format(n=rng.randrange(100, 999), v=rng.randrange(1, 20))
+	code = _STEM_CODES[kind]
+	return {
+		'gisp_url': f"https://gisp.gov.ru/goods/#/product/{i}",
+		'product_gisp_url': f"https://gisp.gov.ru/pp719v2/pub/prod/{i}/",
+		'org_name': f"ООО «Производитель {i % 997}»",
+		'org_ogrn': f"{1027700000000 + i % 997}",
+		'product_reg_number': f"{10000000 + i}\\{2020 + i % 5}",
+		'product_reg_number_2022': None,
+		'product_reg_number_2023': f"РЭ-{i}/23" if i % 3 else None,
+		'product_writeout_url': f"https://gisp.gov.ru/documents/{i}.pdf",
+		'product_name': name,
+		'product_okpd2': _OKPD2[code],
+		'product_tnved': _TNVED[code],
+		'product_spec': _SPECS[kind][i % len(_SPECS[kind])],
+		'product_score_value': rng.randrange(0, 100),
+		'product_score_desc': "Баллы за выполнение технологических операций",
+		'product_electronic_product_level': rng.randrange(0, 3),
+	}
+
+
+def make_synthetic_goods(file_name, count, seed=0):
+	rng = random.Random(seed)
+	with io.open(file_name, 'wt', encoding='utf-8') as file:
+		file.write(f'{{"total_count": {count}, "items": [\n')
+		for i in range(count):
+			if i:
+				file.write(',\n')
+			json.dump(_synthetic_record(rng, i), file, ensure_ascii=False)
+		file.write('\n]}\n')
+
+
+def _load_with_json_load(file_name):
+	with io.open(file_name, 'rt', encoding='utf-8') as file:
+		data = json.load(file)
+	store = RegistryColumns(REGISTRY_COLUMNS)
+	for record in data['items']:
+		store.appendRecord(record)
+	return store
+
+
+def _load_streaming(file_name):
+	from registry_json import load_goods_columns
+	return load_goods_columns(file_name, REGISTRY_COLUMNS)
+
+
+_GOODS_LOADERS = {
+	'json.load': _load_with_json_load,
+	'streaming': _load_streaming,
+}
+
+
+# Peak resident set size of this process; `None` on Windows without psutil
+def _max_rss_kib():
+	if resource is not None:
+		rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+		# In bytes on macOS
+		return rss // 1024 if sys.platform == 'darwin' else rss
+	try:
+		import psutil
+	except ImportError:
+		return None
+	return psutil.Process().memory_info().peak_wset // 1024
+
+
+def _measure_goods_load(loader, file_name, results):
+	rss_before = _max_rss_kib()
+	started = time.perf_counter()
+	store = _GOODS_LOADERS[loader](file_name)
+	elapsed = time.perf_counter() - started
+	rss_after = _max_rss_kib()
+	results.put({
+		'loader': loader,
+		'rows': len(store),
+		'seconds': elapsed,
+		'peak_rss_delta_kib': rss_after - rss_before if rss_after is not None else None,
+		'store_bytes': store.nbytes(),
+	})
+
+
+def bench_classify(count, seed=0):
+	from registry_classify import classify_product
+	rng = random.Random(seed)
+	records = [_synthetic_record(rng, i) for i in range(count)]
+	counts = dict()
+	started = time.perf_counter()
+	for record in records:
+		category = classify_product(record)
+		counts[category] = counts.get(category, 0) + 1
+	elapsed = time.perf_counter() - started
+	return {
+		'rows': count,
+		'seconds': elapsed,
+		'rows_per_second': count / elapsed if elapsed else float('inf'),
+		'categories': counts,
+	}
+
+
+# `HtmlFormat.write` before the template engine: a full-document `str.replace` pass per category
+_LEGACY_HTML = '''
+		<!DOCTYPE html>
+		<html>
+		<head><title>Конфигурация АРМ</title></head>
+		<body>
+			<h1>Конфигурация АРМ</h1>
+			<p>
+				<table>
+					<tr>
+						<th>Компонент</th>
+						<th>Наименование</th>
+					</tr>
+					<tr>
+						<td>Системный блок</td>
+						<td>{{systemUnit}}</td>
+					</tr>
+					<tr>
+						<td>Монитор</td>
+						<td>{{monitor}}</td>
+					</tr>
+					<tr>
+						<td>Клавиатура</td>
+						<td>{{keyboard}}</td>
+					</tr>
+					<tr>
+						<td>Мышь</td>
+						<td>{{mouse}}</td>
+					</tr>
+				</table>
+			<p>
+		</body>
+		</html>
+	'''
+
+
+def _render_legacy_html(data, escape=lambda text: text):
+	return _LEGACY_HTML \
+		.replace('{{systemUnit}}', escape(data.get('systemUnit', "(не выбрано)"))) \
+		.replace('{{monitor}}', escape(data.get('monitor', "(не выбрано)"))) \
+		.replace('{{keyboard}}', escape(data.get('keyboard', "(не выбрано)"))) \
+		.replace('{{mouse}}', escape(data.get('mouse', "(не выбрано)")))
+
+
+# Configurations drawn from a few products per category, as in a real shop
+def _synthetic_configs(rng: random.Random, count, choices=8):
+	names = {
+		category: [_NAME_STEMS[k].format(n=rng.randrange(100, 999), v=rng.randrange(1, 20)) for _ in range(choices)]
+		for k, category in ((0, 'systemUnit'), (2, 'monitor'), (4, 'keyboard'), (5, 'mouse'))
+	}
+	return [
+		{category: rng.choice(products) for category, products in names.items() if rng.random() < 0.9}
+		for _ in range(count)
+	]
+
+
+def bench_html(count, seed=0):
+	from hw_config_file import HtmlFormat
+	configs = _synthetic_configs(random.Random(seed), count)
+	html_format = HtmlFormat()
+	results = dict()
+	from html import escape
+	renderers = (
+		('replace', _render_legacy_html),
+		('replace + escape', lambda data: _render_legacy_html(data, escape)),
+		('template', lambda data: html_format.render((data,))),
+	)
+	for name, render in renderers:
+		started = time.perf_counter()
+		for data in configs:
+			render(data)
+		results[name] = time.perf_counter() - started
+	started = time.perf_counter()
+	html_format.render(configs, captions=[f"АРМ {i}" for i in range(count)])
+	results['template report'] = time.perf_counter() - started
+	return results
+
+
+def bench_archive(count, seed=0):
+	import tracemalloc
+	from config_archive import ConfigArchive
+	configs = _synthetic_configs(random.Random(seed), count)
+	results = dict()
+	with tempfile.TemporaryDirectory() as temp_dir:
+		file_name = os.path.join(temp_dir, 'configs.db')
+		archive = ConfigArchive(file_name)
+		started = time.perf_counter()
+		archive.addMany((data, f"АРМ {i}") for i, data in enumerate(configs))
+		results['add'] = time.perf_counter() - started
+		results['distinct'] = archive.configCount()
+		archive.close()
+
+		started = time.perf_counter()
+		archive = ConfigArchive(file_name)
+		listed = sum(1 for _ in archive.iterConfigs())
+		results['open_and_list'] = time.perf_counter() - started
+		assert listed == count
+		archive.close()
+		# Measured on a second pass, as tracing slows it down several times
+		tracemalloc.start()
+		archive = ConfigArchive(file_name)
+		for _ in archive.iterConfigs():
+			pass
+		results['list_peak_kib'] = tracemalloc.get_traced_memory()[1] // 1024
+		tracemalloc.stop()
+
+		name = configs[0].get('mouse') or next(iter(configs[0].values()))
+		started = time.perf_counter()
+		results['using'] = len(archive.configsUsing(name))
+		results['using_seconds'] = time.perf_counter() - started
+		archive.close()
+	return results
+
+
+# Memory held by what `build` returns, counted by `tracemalloc`
+def _retained_kib(build):
+	import gc
+	import tracemalloc
+	gc.collect()
+	tracemalloc.start()
+	try:
+		kept = build()
+		size = tracemalloc.get_traced_memory()[0]
+	finally:
+		tracemalloc.stop()
+	del kept
+	return size // 1024
+
+
+# Registry records and configurations as parsed dicts versus `Product` and `HardwareConfig`.
+# Everything is parsed from JSON text, so no string is shared by accident.
+def bench_model(count, seed=0):
+	from hw_config_model import HardwareConfig, Product
+	from registry_classify import classify_product
+	records = [json.dumps(_synthetic_record(random.Random(seed + i), i), ensure_ascii=False) for i in range(count)]
+	configs = [json.dumps(data, ensure_ascii=False) for data in _synthetic_configs(random.Random(seed), count)]
+
+	def products():
+		products = list()
+		for text in records:
+			record = json.loads(text)
+			products.append(Product.fromRecord(record, classify_product(record)))
+		return products
+
+	return {
+		'records': count,
+		'record dicts': _retained_kib(lambda: [json.loads(text) for text in records]),
+		'products': _retained_kib(products),
+		'config dicts': _retained_kib(lambda: [json.loads(text) for text in configs]),
+		'hardware configs': _retained_kib(lambda: [HardwareConfig(json.loads(text)) for text in configs]),
+	}
+
+
+# Each loader runs in a fresh process, so peak RSS is not shared between them
+def bench_goods_load(file_name, loaders=tuple(_GOODS_LOADERS)):
+	context = multiprocessing.get_context('spawn')
+	results = context.Queue()
+	for loader in loaders:
+		process = context.Process(target=_measure_goods_load, args=(loader, file_name, results))
+		process.start()
+		yield results.get()
+		process.join()
+
+
+# The suite: every size in a process of its own, from the synthetic registry through the search
+# table and the selectors to the file formats; results are JSON, for comparing runs
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+# Typed one letter at a time, as the search box sees it, then a few one-off queries
+_TYPED_QUERY = "монитор"
+_QUERIES = ("бешт", "pc5", "\\2021", "ничего такого нет")
+
+# Results are compared by these keys between runs
+_FORMAT_VERSION = 1
+
+
+@contextmanager
+def _timed(timings: dict, stage):
+	started = time.perf_counter()
+	yield
+	timings[stage] = time.perf_counter() - started
+
+
+def _process_events():
+	from PyQt5.QtWidgets import QApplication
+	QApplication.processEvents()
+
+
+def _bench_registry(timings, counts, goods_file, work_dir):
+	from PyQt5.QtWidgets import QTableView
+	from registry_model import RegistryTableModel
+	from registry_snapshot import RegistrySnapshot, write_snapshot
+
+	with _timed(timings, 'load_goods_columns'):
+		store = _load_streaming(goods_file)
+	counts['rows'] = len(store)
+	snapshot_file = os.path.join(work_dir, 'goods.snap')
+	with _timed(timings, 'write_snapshot'):
+		write_snapshot(snapshot_file, (store.row(row) for row in range(len(store))))
+	del store
+	with _timed(timings, 'open_snapshot'):
+		snapshot = RegistrySnapshot(snapshot_file)
+
+	# The result table of `SearchDialog`
+	def table():
+		model = RegistryTableModel(snapshot, REGISTRY_COLUMNS)
+		view = QTableView()
+		view.resize(800, 600)
+		view.show()
+		return model, view
+
+	model, view = table()
+	with _timed(timings, 'table first page'):
+		view.setModel(model)
+		model.setRows(None)
+		_process_events()
+	with _timed(timings, 'table fill all'):
+		model.fetchAll()
+		_process_events()
+	view.setModel(None)
+	del model, view
+
+	# What `SearchDialog` does per query, with the search itself run here rather than on a pool thread
+	model, view = table()
+	view.setModel(model)
+	model.setRows(None)
+	_process_events()
+	index = snapshot.index()
+	result = None
+	queries = [_TYPED_QUERY[:k] for k in range(1, len(_TYPED_QUERY) + 1)] + [None] + list(_QUERIES)
+	with _timed(timings, 'filter total'):
+		for query in queries:
+			if query is None:
+				result = None
+				continue
+			with _timed(timings, f'filter "{query}"'):
+				result = index.search(query, result, limit=model.fetch_batch_size)
+				model.setSearchResult(result, index)
+				_process_events()
+			# Matches shown, at most a batch
+			counts[f'filter "{query}"'] = model.rowCount()
+	view.setModel(None)
+	del model, view, index
+	snapshot.close()
+
+
+def _bench_selectors(timings, counts, goods_file, work_dir):
+	from PyQt5.QtCore import QObject, pyqtSlot
+	from PyQt5.QtWidgets import QWidget
+	from catalogue_model import CatalogueModels, attachCatalogue
+	from compatibility import Feature, product_features
+	from component_catalogue import ComponentCatalogue, build_catalogue
+	from hw_config_controller import HardwareConfigController
+	from hw_config_model import ComponentCategory
+	from registry_classify import classify_name
+	from registry_json import load_goods_columns
+
+	class Receiver(QObject):
+		@pyqtSlot()
+		def touch(self):
+			pass
+
+	store = load_goods_columns(goods_file, REGISTRY_COLUMNS + ('product_spec',))
+	rows = ((classify_name(name), reg_number, name, product_features(name, spec))
+		for reg_number, name, spec in map(store.row, range(len(store))))
+	with _timed(timings, 'build_catalogue'):
+		build_catalogue(sorted(row for row in rows if row[0]), 1, work_dir)
+	del store
+	with _timed(timings, 'open_catalogue'):
+		catalogue = ComponentCatalogue.open(1, work_dir)
+	for category in catalogue.categories():
+		counts[f'catalogue {category}'] = len(catalogue.section(category))
+	with _timed(timings, 'compatibility table'):
+		catalogue.compatibility()
+
+	receiver = Receiver()
+	with _timed(timings, 'createComponentSelectors'):
+		selectors = HardwareConfigController._createComponentSelectors(receiver)
+	form = QWidget()
+	for widget in selectors.values():
+		widget.setParent(form)
+	form.show()
+	_process_events()
+	with _timed(timings, 'attach catalogue'):
+		models = CatalogueModels(catalogue)
+		for category, widget in selectors.items():
+			attachCatalogue(widget, models, category)
+		_process_events()
+	with _timed(timings, 'complete "бешт"'):
+		for category, widget in selectors.items():
+			widget.completer().model().setQuery("бешт")
+		_process_events()
+	# A system unit with a VGA output only and then a monitor with HDMI only, as `touch` narrows the rest
+	choices = [(ComponentCategory.SYSTEM_UNIT, Feature.VGA), (ComponentCategory.MONITOR, Feature.HDMI)]
+	chosen = dict()
+	with _timed(timings, 'narrow selectors'):
+		for category, features in choices:
+			chosen[category] = int(features)
+			models.narrow(chosen)
+		_process_events()
+	for category in catalogue.categories():
+		counts[f'narrowed {category}'] = models.model(category).allowed().count(1) \
+			if models.model(category).allowed() is not None else len(catalogue.section(category))
+	form.close()
+	del models, form
+	catalogue.close()
+
+
+def _bench_writers(timings, counts, record_count, work_dir, seed):
+	from hw_config_file import create_file_formats
+	configs = _synthetic_configs(random.Random(seed), max(record_count // 10, 1))
+	for file_format in create_file_formats():
+		name = file_format.name()
+		file_name = os.path.join(work_dir, f'configs.{file_format.fileSuffixes()[0]}')
+		single = configs[:1000]
+		with _timed(timings, f'{name} write x{len(single)}'):
+			for data in single:
+				file_format.write(file_name, data)
+		if file_format.streamWritable():
+			with _timed(timings, f'{name} stream x{len(configs)}'):
+				with file_format.openWriter(file_name) as writer:
+					for data in configs:
+						writer.write(data)
+			counts[f'{name} stream bytes'] = os.path.getsize(file_name)
+
+
+# One size in the current process; `run_suite` gives each size a process of its own
+def run_size(record_count, seed=0) -> dict:
+	from PyQt5.QtWidgets import QApplication
+	app = QApplication.instance() or QApplication([sys.argv[0]])
+	timings = dict()
+	counts = dict()
+	with tempfile.TemporaryDirectory() as work_dir:
+		goods_file = os.path.join(work_dir, 'goods.json')
+		with _timed(timings, 'make_synthetic_goods'):
+			make_synthetic_goods(goods_file, record_count, seed)
+		counts['goods bytes'] = os.path.getsize(goods_file)
+		_bench_registry(timings, counts, goods_file, work_dir)
+		_bench_selectors(timings, counts, goods_file, work_dir)
+		_bench_writers(timings, counts, record_count, work_dir, seed)
+	del app
+	return dict(
+		records=record_count,
+		seconds=timings,
+		counts=counts,
+		peak_rss_kib=_max_rss_kib(),
+	)
+
+
+def _run_size_into(record_count, seed, results):
+	try:
+		results.put(run_size(record_count, seed))
+	except BaseException as ex:
+		results.put(dict(records=record_count, error=repr(ex)))
+		raise
+
+
+def run_suite(sizes=DEFAULT_SIZES, seed=0, progress=None) -> dict:
+	# Children inherit the environment: no display is needed
+	os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+	from PyQt5.QtCore import PYQT_VERSION_STR, QT_VERSION_STR
+	context = multiprocessing.get_context('spawn')
+	results = context.Queue()
+	runs = list()
+	for size in sizes:
+		process = context.Process(target=_run_size_into, args=(size, seed, results))
+		process.start()
+		runs.append(results.get())
+		process.join()
+		if progress is not None:
+			progress(runs[-1])
+	return dict(
+		version=_FORMAT_VERSION,
+		created=time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+		python=platform.python_version(),
+		qt=QT_VERSION_STR,
+		pyqt=PYQT_VERSION_STR,
+		platform=platform.platform(),
+		machine=platform.machine(),
+		seed=seed,
+		runs=runs,
+	)
+
+
+# `(records, stage, baseline seconds, current seconds)` of every stage both results have
+def compare_results(baseline: dict, current: dict):
+	baseline_runs = {run['records']: run for run in baseline.get('runs', ()) if 'seconds' in run}
+	for run in current.get('runs', ()):
+		previous = baseline_runs.get(run['records'])
+		if previous is None or 'seconds' not in run:
+			continue
+		for stage, seconds in run['seconds'].items():
+			if stage in previous['seconds']:
+				yield run['records'], stage, previous['seconds'][stage], seconds
+
+
+def _print_run(run, file=sys.stderr):
+	if 'error' in run:
+		print(f"{run['records']:>9}: ошибка {run['error']}", file=file)
+		return
+	for stage, seconds in run['seconds'].items():
+		print(f"{run['records']:>9} {stage:<32} {seconds * 1000:10.1f} ms", file=file)
+	if run['peak_rss_kib'] is not None:
+		print(f"{run['records']:>9} {'peak RSS':<32} {run['peak_rss_kib'] / 1024:10.1f} MiB", file=file)
+
+
+def _suite_main(args):
+	result = run_suite(args.sizes, args.seed, None if args.quiet else _print_run)
+	if args.output:
+		with io.open(args.output, 'wt', encoding='utf-8') as file:
+			json.dump(result, file, ensure_ascii=False, indent=1)
+	else:
+		json.dump(result, sys.stdout, ensure_ascii=False, indent=1)
+		print()
+
+	if args.compare:
+		with io.open(args.compare, 'rt', encoding='utf-8') as file:
+			baseline = json.load(file)
+		for records, stage, before, after in compare_results(baseline, result):
+			ratio = after / before if before else float('inf')
+			print(f"{records:>9} {stage:<32} {before * 1000:10.1f} -> {after * 1000:10.1f} ms  x{ratio:.2f}",
+				file=sys.stderr)
+	return 1 if any('error' in run for run in result['runs']) else 0
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Конфигуратор АРМ: замеры производительности")
+	parser.add_argument('--records', type=int, default=100_000)
+	parser.add_argument('--goods', help="goods.json to load instead of a synthetic registry")
+	parser.add_argument('--only', action='append', choices=('load', 'classify', 'html', 'archive', 'model'),
+		help="run only these benchmarks")
+	commands = parser.add_subparsers(dest='command')
+	suite = commands.add_parser('suite', description="Конфигуратор АРМ: набор замеров на синтетическом реестре")
+	suite.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="registry sizes, in records")
+	suite.add_argument('--seed', type=int, default=0)
+	suite.add_argument('-o', '--output', help="write the results as JSON here instead of stdout")
+	suite.add_argument('--compare', metavar='BASELINE', help="results of an earlier run to compare with")
+	suite.add_argument('--quiet', action='store_true', help="do not print timings to stderr as they come")
+	args = parser.parse_args(argv)
+	if args.command == 'suite':
+		return _suite_main(args)
+	benchmarks = args.only or ('load', 'classify', 'html', 'archive', 'model')
+
+	if 'classify' in benchmarks:
+		result = bench_classify(args.records)
+		print("classify: {rows} rows, {seconds:.2f} s, {rows_per_second:,.0f} rows/s".format(**result))
+		print("          " + ", ".join(f"{category}: {n}" for category, n in result['categories'].items()))
+	if 'archive' in benchmarks:
+		result = bench_archive(args.records)
+		print("archive: {0} configs ({distinct} distinct) added in {add:.2f} s, opened and listed in "
+			"{open_and_list:.2f} s (peak {list_peak_kib} KiB), {using} configs using a product found in "
+			"{using_seconds:.4f} s".format(args.records, **result))
+	if 'model' in benchmarks:
+		result = bench_model(args.records)
+		for name, kib in result.items():
+			if name != 'records':
+				print(f"{name:>16}: {args.records} held in {kib / 1024:7.1f} MiB, {kib * 1024 / args.records:6.0f} B each")
+	if 'html' in benchmarks:
+		for name, seconds in bench_html(args.records // 10).items():
+			print(f"{'html ' + name:>22}: {args.records // 10} configs, {seconds:.3f} s")
+	if 'load' not in benchmarks:
+		return
+
+	with tempfile.TemporaryDirectory() as temp_dir:
+		file_name = args.goods
+		if not file_name:
+			file_name = os.path.join(temp_dir, 'goods.json')
+			make_synthetic_goods(file_name, args.records)
+		print(f"{file_name}: {os.path.getsize(file_name) / 2**20:.1f} MiB")
+		for result in bench_goods_load(file_name):
+			rss = result['peak_rss_delta_kib']
+			print("{loader:>10}: {rows} rows, {seconds:.2f} s, {rss}store {store_bytes} B".format(
+				rss=f"peak RSS +{rss} KiB, " if rss is not None else '', **result))
+
+
+if __name__ == '__main__':
+	sys.exit(main())
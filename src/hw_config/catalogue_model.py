@@ -0,0 +1,227 @@
+import os.path
+import traceback
+from typing import List, Mapping, Optional
+
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QAbstractListModel, QModelIndex, QVariant, \
+	pyqtSignal, pyqtSlot
+from PyQt5.QtWidgets import QComboBox, QCompleter
+
+from compatibility import bitset_flags, bitset_rows, product_features
+from component_catalogue import CatalogueSection, ComponentCatalogue, build_catalogue
+from registry_db import REGISTRY_DB_NAME, RegistryDatabase
+
+__all__ = ['CatalogueListModel', 'CatalogueCompletionModel', 'CatalogueModels', 'CatalogueLoadTask',
+	'attachCatalogue']
+
+
+# The products of a category, or only those compatible with the other chosen components
+class CatalogueListModel(QAbstractListModel):
+	fetch_batch_size = 256
+
+	def __init__(self, section: CatalogueSection, parent=None):
+		super().__init__(parent)
+		self._section = section
+		# Section rows shown and a flag byte per section row; `None` while every row is shown
+		self._rows = None
+		self._allowed = None
+		self._allowed_bits = None
+		# The combo box popup only asks for more once it is scrolled to the end
+		self._fetched = min(self.fetch_batch_size, len(section))
+
+	def section(self) -> CatalogueSection:
+		return self._section
+
+	def allowed(self) -> Optional[bytes]:
+		return self._allowed
+
+	# Section row of a model row
+	def sectionRow(self, row) -> int:
+		return row if self._rows is None else self._rows[row]
+
+	def _total(self):
+		return len(self._section) if self._rows is None else len(self._rows)
+
+	# Shows only the rows in the `compatibility` bitset; `None` shows them all. False if nothing changed.
+	def setAllowed(self, bits: Optional[int]) -> bool:
+		if bits == self._allowed_bits:
+			return False
+		self.beginResetModel()
+		self._allowed_bits = bits
+		if bits is None:
+			self._rows = self._allowed = None
+		else:
+			self._allowed = bitset_flags(bits, len(self._section))
+			self._rows = bitset_rows(bits, len(self._section))
+		self._fetched = min(self.fetch_batch_size, self._total())
+		self.endResetModel()
+		return True
+
+	def rowCount(self, parent=QModelIndex()):
+		return 0 if parent.isValid() else self._fetched
+
+	def data(self, index: QModelIndex, role=Qt.DisplayRole):
+		if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole, Qt.ToolTipRole):
+			return QVariant()
+		return self._section.name(self.sectionRow(index.row()))
+
+	def canFetchMore(self, parent=QModelIndex()):
+		return not parent.isValid() and self._fetched < self._total()
+
+	def fetchMore(self, parent=QModelIndex()):
+		count = min(self.fetch_batch_size, self._total() - self._fetched)
+		if parent.isValid() or count <= 0:
+			return
+		self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+		self._fetched += count
+		self.endInsertRows()
+
+
+# Top matches of the text typed into a selector, looked up in the category's search index,
+# among the rows its list model shows
+class CatalogueCompletionModel(QAbstractListModel):
+	limit = 50
+
+	def __init__(self, list_model: CatalogueListModel, parent=None):
+		super().__init__(parent)
+		self._list_model = list_model
+		self._section = list_model.section()
+		self._rows = range(0)
+
+	def rowCount(self, parent=QModelIndex()):
+		return 0 if parent.isValid() else len(self._rows)
+
+	def data(self, index: QModelIndex, role=Qt.DisplayRole):
+		if not index.isValid() or role not in (Qt.DisplayRole, Qt.EditRole):
+			return QVariant()
+		return self._section.name(self._rows[index.row()])
+
+	@pyqtSlot(str)
+	def setQuery(self, query: str):
+		self.beginResetModel()
+		self._rows = self._section.search(query, self.limit, self._list_model.allowed())
+		self.endResetModel()
+
+
+# One list model per category, shared by every selector showing that category
+class CatalogueModels(QObject):
+
+	def __init__(self, catalogue: ComponentCatalogue, parent=None):
+		super().__init__(parent)
+		self._catalogue = catalogue
+		self._models = {
+			category: CatalogueListModel(catalogue.section(category), self)
+			for category in catalogue.categories()
+		}
+
+	def catalogue(self) -> ComponentCatalogue:
+		return self._catalogue
+
+	def model(self, category) -> CatalogueListModel:
+		return self._models[category]
+
+	def section(self, category) -> CatalogueSection:
+		return self._catalogue.section(category)
+
+	# `compatibility.Feature` flags of the component named `text`: those of its catalogue row if it has
+	# one (`row` of the list model, when the combo box knows it), else whatever the name itself says
+	def features(self, category, text: str, row=-1) -> int:
+		model = self._models[category]
+		section_row = model.sectionRow(row) if 0 <= row < model.rowCount() else None
+		section = model.section()
+		if section_row is None or section.name(section_row) != text:
+			section_row = section.find(text)
+		if section_row is None:
+			return product_features(text)
+		return section.features()[section_row]
+
+	# Narrows every category's model down to what is compatible with the components chosen in the
+	# others (category -> `compatibility.Feature` flags). Categories whose rows changed.
+	def narrow(self, chosen: Mapping[str, int]) -> List[str]:
+		compatibility = self._catalogue.compatibility()
+		changed = list()
+		for category, model in self._models.items():
+			others = {other: features for other, features in chosen.items() if other != category}
+			if model.setAllowed(compatibility.allowed(category, others)):
+				changed.append(category)
+		return changed
+
+
+def attachCatalogue(combo_box: QComboBox, models: CatalogueModels, category):
+	text = combo_box.currentText()
+	combo_box.blockSignals(True)
+	previous = combo_box.completer()
+	if previous is not None:
+		if isinstance(previous.model(), CatalogueCompletionModel):
+			combo_box.lineEdit().textEdited.disconnect(previous.model().setQuery)
+		# The combo box would hand it the whole category, which it then fetches at once.
+		# Qt deletes the completer it replaces.
+		combo_box.setCompleter(None)
+	combo_box.setModel(models.model(category))
+	completion_model = CatalogueCompletionModel(models.model(category), combo_box)
+	completer = QCompleter(completion_model, combo_box)
+	completer.setCompletionMode(QCompleter.UnfilteredPopupCompletion)
+	combo_box.setCompleter(completer)
+	combo_box.lineEdit().textEdited.connect(completion_model.setQuery)
+	# `setCurrentText` would look the text up and so fetch the whole category
+	combo_box.setCurrentIndex(-1)
+	combo_box.setEditText(text)
+	combo_box.blockSignals(False)
+
+
+class CatalogueLoadSignals(QObject):
+	loaded = pyqtSignal(object)
+	failed = pyqtSignal(str, str)
+
+
+# Opens the cached catalogue of the current registry generation, rebuilding it first if it is stale.
+# Falls back to the built-in sample data while there is no local registry.
+# With the `generation` known to be current, its snapshots are opened without asking the registry.
+class CatalogueLoadTask(QRunnable):
+
+	def __init__(self, db_file_name=REGISTRY_DB_NAME, directory='.', generation=None):
+		super().__init__()
+		self._db_file_name = db_file_name
+		self._directory = directory
+		self._generation = generation
+		self.signals = CatalogueLoadSignals()
+
+	def start(self, pool: QThreadPool = None):
+		(pool or QThreadPool.globalInstance()).start(self)
+
+	def run(self):
+		try:
+			self.signals.loaded.emit(self._load())
+		except Exception as ex:
+			self.signals.failed.emit(str(ex), ''.join(traceback.format_exception(type(ex), ex, ex.__traceback__)))
+
+	def _load(self) -> ComponentCatalogue:
+		if self._generation is not None:
+			catalogue = ComponentCatalogue.open(self._generation, self._directory)
+			if catalogue is not None:
+				catalogue.compatibility()
+				return catalogue
+		if not os.path.exists(self._db_file_name):
+			return ComponentCatalogue.fromDummyData()
+		database = RegistryDatabase(self._db_file_name)
+		try:
+			if not database.productCount():
+				return ComponentCatalogue.fromDummyData()
+			if not database.isClassified():
+				database.classifyProducts()
+			generation = database.generation()
+			catalogue = ComponentCatalogue.open(generation, self._directory)
+			if catalogue is None:
+				try:
+					build_catalogue(database.iterCategorised(), generation, self._directory)
+				except OSError:
+					pass
+				catalogue = ComponentCatalogue.open(generation, self._directory)
+			if catalogue is None:
+				# The snapshots could not be written or read back (no space, a read-only directory):
+				# this run keeps the catalogue in memory instead
+				catalogue = ComponentCatalogue.fromRows(database.iterCategorised())
+			# Precomputed here rather than on the first choice in the GUI thread
+			catalogue.compatibility()
+			return catalogue
+		finally:
+			database.close()
@@ -0,0 +1,147 @@
+import array
+import re
+from enum import IntFlag
+from itertools import compress
+from typing import Dict, List, Mapping, NamedTuple, Optional
+
+from hw_config_model import ComponentCategory
+
+__all__ = ['Feature', 'VIDEO_PORTS', 'INPUT_PORTS', 'CompatibilityRule', 'COMPATIBILITY_RULES', 'product_features',
+	'features_compatible', 'check_compatibility', 'bitset_rows', 'bitset_flags', 'CompatibilityTable']
+
+
+# Connectors a product is known to have; a product fits in a byte of them
+class Feature(IntFlag):
+	HDMI = 1
+	DISPLAY_PORT = 2
+	DVI = 4
+	VGA = 8
+	USB = 16
+	PS2 = 32
+	BLUETOOTH = 64
+
+
+VIDEO_PORTS = Feature.HDMI | Feature.DISPLAY_PORT | Feature.DVI | Feature.VGA
+INPUT_PORTS = Feature.USB | Feature.PS2 | Feature.BLUETOOTH
+
+_FEATURE_PATTERNS = {
+	Feature.HDMI:         r'hdmi',
+	Feature.DISPLAY_PORT: r'display\s*port|\b(?:mini\s*)?dp\b',
+	Feature.DVI:          r'\bdvi',
+	Feature.VGA:          r'\bvga\b|\bd-?sub',
+	Feature.USB:          r'\busb|радиоканал',
+	Feature.PS2:          r'\bps\s*/\s*2\b',
+	Feature.BLUETOOTH:    r'bluetooth|блютуз',
+}
+
+_FEATURE_PATTERN = re.compile('|'.join(
+	f'(?P<{feature.name}>{pattern})' for feature, pattern in _FEATURE_PATTERNS.items()), re.IGNORECASE)
+
+
+# Connectors named anywhere in the texts (a product name, its specification)
+def product_features(*texts: Optional[str]) -> int:
+	features = 0
+	for text in texts:
+		if text:
+			for match in _FEATURE_PATTERN.finditer(text):
+				features |= Feature[match.lastgroup]
+	return int(features)
+
+
+# Products of two categories go together if they share one of the `features`. A product that
+# names none of them is not ruled out: most registry entries do not list their connectors.
+class CompatibilityRule(NamedTuple):
+	first: ComponentCategory
+	second: ComponentCategory
+	features: int
+	message: str
+
+
+COMPATIBILITY_RULES = (
+	CompatibilityRule(ComponentCategory.SYSTEM_UNIT, ComponentCategory.MONITOR, int(VIDEO_PORTS),
+		"У системного блока и монитора нет общего видеоразъёма"),
+	CompatibilityRule(ComponentCategory.SYSTEM_UNIT, ComponentCategory.KEYBOARD, int(INPUT_PORTS),
+		"Клавиатуру не к чему подключить у системного блока"),
+	CompatibilityRule(ComponentCategory.SYSTEM_UNIT, ComponentCategory.MOUSE, int(INPUT_PORTS),
+		"Мышь не к чему подключить у системного блока"),
+)
+
+
+def features_compatible(rule: CompatibilityRule, first: int, second: int) -> bool:
+	first &= rule.features
+	second &= rule.features
+	return not first or not second or bool(first & second)
+
+
+# Messages of the rules the chosen components break, given the features of each chosen one
+def check_compatibility(chosen: Mapping[str, int], rules=COMPATIBILITY_RULES) -> List[str]:
+	return [
+		rule.message for rule in rules
+		if rule.first in chosen and rule.second in chosen
+		and not features_compatible(rule, chosen[rule.first], chosen[rule.second])
+	]
+
+
+# Sets of rows are Python ints, bit `row` set for each row in the set: intersecting and
+# joining them runs over machine words. These convert them for the models.
+_DIGIT_FLAGS = bytes.maketrans(b'01', b'\x00\x01')
+_FLAG_DIGITS = bytes.maketrans(b'\x00\x01', b'01')
+
+
+# One byte per row, 1 for the rows in the set
+def bitset_flags(bits: int, size: int) -> bytes:
+	flags = format(bits, 'b')[::-1].encode('ascii').translate(_DIGIT_FLAGS) if bits else b''
+	return flags[:size] + bytes(size - len(flags))
+
+
+def bitset_rows(bits: int, size: int) -> array.array:
+	return array.array('I', compress(range(size), bitset_flags(bits, size)))
+
+
+def _bitset(flags: bytes) -> int:
+	return int(flags.translate(_FLAG_DIGITS)[::-1], 2) if flags else 0
+
+
+def _byte_table(predicate) -> bytes:
+	return bytes(1 if predicate(value) else 0 for value in range(256))
+
+
+# Precomputed compatibility of the products of a catalogue: per category, the set of rows having
+# each feature and the set of rows naming none of a rule's features. The rows a choice leaves in
+# another category are then a few unions and intersections, whatever the size of the catalogue.
+class CompatibilityTable:
+
+	def __init__(self, features: Mapping[str, bytes], rules=COMPATIBILITY_RULES):
+		self._rules = tuple(rules)
+		self._with: Dict[str, Dict[int, int]] = dict()
+		self._unknown: Dict[str, Dict[int, int]] = dict()
+		for category, row_features in features.items():
+			masks = {rule.features for rule in self._rules if category in (rule.first, rule.second)}
+			bits = {bit for mask in masks for bit in Feature if bit & mask}
+			self._with[category] = {
+				int(bit): _bitset(row_features.translate(_byte_table(lambda value: value & bit))) for bit in bits}
+			self._unknown[category] = {
+				mask: _bitset(row_features.translate(_byte_table(lambda value: not value & mask))) for mask in masks}
+
+	# Rows of `category` compatible with the chosen components (category -> features), `None` if
+	# nothing chosen narrows it down
+	def allowed(self, category, chosen: Mapping[str, int]) -> Optional[int]:
+		if category not in self._with:
+			return None
+		allowed = None
+		for rule in self._rules:
+			if rule.first == category:
+				other = rule.second
+			elif rule.second == category:
+				other = rule.first
+			else:
+				continue
+			wanted = chosen.get(other, 0) & rule.features
+			if not wanted:
+				continue
+			rows = self._unknown[category][rule.features]
+			for bit, with_bit in self._with[category].items():
+				if bit & wanted:
+					rows |= with_bit
+			allowed = rows if allowed is None else allowed & rows
+		return allowed
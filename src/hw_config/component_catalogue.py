@@ -0,0 +1,180 @@
+import array
+import os
+from itertools import compress, groupby, islice
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from compatibility import CompatibilityTable, product_features
+from hw_config_model import COMPONENT_CATEGORIES
+from registry_index import RegistryIndex
+from registry_snapshot import RegistrySnapshot, SnapshotError, write_snapshot
+from registry_store import REGISTRY_COLUMNS, RegistryColumns
+
+__all__ = ['CATALOGUE_CATEGORIES', 'CATALOGUE_FIELDS', 'CATALOGUE_FEATURES', 'CatalogueSection', 'ComponentCatalogue', 'build_catalogue']
+
+
+CATALOGUE_CATEGORIES = COMPONENT_CATEGORIES
+
+CATALOGUE_FIELDS = REGISTRY_COLUMNS
+# The product's `compatibility.Feature` flags, a byte per row, stored next to the columns
+CATALOGUE_FEATURES = 'features'
+
+# The generation is part of the name, so a rebuild never has to replace a file that is still mapped
+CATALOGUE_SNAPSHOT_NAME = 'goods.{category}.{generation}.snap'
+
+
+def _snapshot_path(directory, category, generation):
+	return os.path.join(directory, CATALOGUE_SNAPSHOT_NAME.format(category=category, generation=generation))
+
+
+def _remove_stale_snapshots(directory, generation):
+	current = {os.path.basename(_snapshot_path(directory, category, generation)) for category in CATALOGUE_CATEGORIES}
+	prefixes = tuple(CATALOGUE_SNAPSHOT_NAME.split('{category}')[0] + f'{category}.' for category in CATALOGUE_CATEGORIES)
+	for name in os.listdir(directory):
+		if name.startswith(prefixes) and name.endswith('.snap') and name not in current:
+			try:
+				os.remove(os.path.join(directory, name))
+			except OSError:
+				# Still mapped by a running instance; the next rebuild retries
+				pass
+
+
+# Products of one category: a column store (or snapshot) plus its search index
+class CatalogueSection:
+
+	def __init__(self, store, index: RegistryIndex, features):
+		self._store = store
+		self._names = store.column('product_name')
+		self._index = index
+		self._features = bytes(features)
+
+	def __len__(self):
+		return len(self._store)
+
+	def name(self, row) -> str:
+		return self._names[row]
+
+	def store(self):
+		return self._store
+
+	# `compatibility.Feature` flags of every row, a byte each
+	def features(self) -> bytes:
+		return self._features
+
+	# Row of the product named exactly `name`, if there is one
+	def find(self, name: str) -> Optional[int]:
+		rows = self._index.search(name).rows if name else None
+		return next((row for row in rows or () if self._names[row] == name), None)
+
+	# Names containing the query or, failing that, the closest ones; only `allowed` rows (a flag
+	# byte per row) if given
+	def search(self, query: str, limit: int, allowed: bytes = None) -> Sequence[int]:
+		rows = self._index.search(query).rows
+		if rows is None:
+			rows = range(len(self._store))
+		elif not rows:
+			rows = self._index.rank(query, limit if allowed is None else len(self._store)).rows
+		if allowed is not None:
+			rows = list(islice(compress(rows, map(allowed.__getitem__, rows)), limit))
+		return rows[:limit]
+
+
+class ComponentCatalogue:
+
+	def __init__(self, sections: Dict[str, CatalogueSection], generation=None, snapshots=()):
+		self._sections = sections
+		self._generation = generation
+		self._snapshots = tuple(snapshots)
+		self._compatibility = None
+
+	def generation(self):
+		return self._generation
+
+	def categories(self):
+		return tuple(self._sections)
+
+	def section(self, category) -> CatalogueSection:
+		return self._sections[category]
+
+	# Built on first use, which `CatalogueLoadTask` makes on its pool thread
+	def compatibility(self) -> CompatibilityTable:
+		if self._compatibility is None:
+			self._compatibility = CompatibilityTable(
+				{category: section.features() for category, section in self._sections.items()})
+		return self._compatibility
+
+	def close(self):
+		for snapshot in self._snapshots:
+			snapshot.close()
+		self._snapshots = ()
+
+	# In memory, from rows as `build_catalogue` takes them
+	@classmethod
+	def fromRows(cls, rows: Iterable[Tuple[str, str, str, int]]) -> 'ComponentCatalogue':
+		stores = {category: RegistryColumns(CATALOGUE_FIELDS) for category in CATALOGUE_CATEGORIES}
+		features = {category: array.array('B') for category in CATALOGUE_CATEGORIES}
+		for category, reg_number, name, row_features in rows:
+			if category in stores:
+				stores[category].append((reg_number, name))
+				features[category].append(row_features or 0)
+		sections = dict()
+		for category, store in stores.items():
+			index = RegistryIndex(store, ('product_name',))
+			index.update()
+			sections[category] = CatalogueSection(store, index, features[category])
+		return cls(sections)
+
+	@classmethod
+	def fromNames(cls, names: Dict[str, Iterable[str]]) -> 'ComponentCatalogue':
+		return cls.fromRows(
+			(category, '', name, product_features(name))
+			for category in CATALOGUE_CATEGORIES for name in names.get(category, ()))
+
+	@classmethod
+	def fromDummyData(cls) -> 'ComponentCatalogue':
+		from dummy_data import dummy_data
+		return cls.fromNames(dummy_data)
+
+	# Opens the per-category snapshots written by `build_catalogue`; `None` if any is missing or stale
+	@classmethod
+	def open(cls, generation, directory='.') -> Optional['ComponentCatalogue']:
+		snapshots = dict()
+		try:
+			for category in CATALOGUE_CATEGORIES:
+				snapshot = RegistrySnapshot(_snapshot_path(directory, category, generation))
+				snapshots[category] = snapshot
+				if snapshot.generation() != generation or snapshot.fields() != CATALOGUE_FIELDS \
+						or snapshot.array(CATALOGUE_FEATURES) is None:
+					raise SnapshotError("Каталог устарел")
+		except (OSError, SnapshotError):
+			for snapshot in snapshots.values():
+				snapshot.close()
+			return None
+		sections = {
+			category: CatalogueSection(snapshot, snapshot.index(), snapshot.array(CATALOGUE_FEATURES))
+			for category, snapshot in snapshots.items()
+		}
+		return cls(sections, generation, snapshots.values())
+
+
+# The columns of the rows, their features collected into `features` on the way
+def _split_features(rows, features: array.array):
+	for _, reg_number, name, row_features in rows:
+		features.append(row_features or 0)
+		yield reg_number, name
+
+
+# Writes a snapshot per category of `(category, reg_number, name, features)` rows that come grouped
+# by category, as `RegistryDatabase.iterCategorised` yields them
+def build_catalogue(rows: Iterable[Tuple[str, str, str, int]], generation, directory='.'):
+	pending = set(CATALOGUE_CATEGORIES)
+	for category, group in groupby(rows, key=lambda row: row[0]):
+		if category in pending:
+			pending.remove(category)
+			features = array.array('B')
+			write_snapshot(_snapshot_path(directory, category, generation),
+				_split_features(group, features), CATALOGUE_FIELDS, generation=generation,
+				arrays={CATALOGUE_FEATURES: features})
+	for category in pending:
+		write_snapshot(_snapshot_path(directory, category, generation), (), CATALOGUE_FIELDS, generation=generation,
+			arrays={CATALOGUE_FEATURES: array.array('B')})
+	_remove_stale_snapshots(directory, generation)
@@ -0,0 +1,238 @@
+import argparse
+import array
+import hashlib
+import json
+import sqlite3
+import sys
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Mapping, NamedTuple, Optional, Tuple
+
+from hw_config_file import AbstractFileFormat, JsonFormat
+from hw_config_model import HardwareConfig
+
+__all__ = ['CONFIG_ARCHIVE_NAME', 'ArchiveEntry', 'ConfigArchive']
+
+
+CONFIG_ARCHIVE_NAME = 'configs.db'
+
+# A configuration is stored once per distinct content, as the sorted IDs of its interned components
+# packed into a `u32` array; `digest` is the hash of that array. Every save of it is an `entry`.
+# `config_component` maps each component to the configurations using it.
+_SCHEMA = '''
+	CREATE TABLE IF NOT EXISTS component (
+		id INTEGER PRIMARY KEY,
+		category TEXT NOT NULL,
+		name TEXT NOT NULL,
+		UNIQUE (category, name)
+	);
+	CREATE INDEX IF NOT EXISTS component_name ON component (name);
+	CREATE TABLE IF NOT EXISTS config (
+		id INTEGER PRIMARY KEY,
+		digest BLOB NOT NULL UNIQUE,
+		components BLOB NOT NULL
+	);
+	CREATE TABLE IF NOT EXISTS config_component (
+		component_id INTEGER NOT NULL,
+		config_id INTEGER NOT NULL,
+		PRIMARY KEY (component_id, config_id)
+	) WITHOUT ROWID;
+	CREATE TABLE IF NOT EXISTS entry (
+		id INTEGER PRIMARY KEY,
+		name TEXT,
+		config_id INTEGER NOT NULL
+	);
+	CREATE INDEX IF NOT EXISTS entry_config ON entry (config_id);
+'''
+
+
+class ArchiveEntry(NamedTuple):
+	id: int
+	name: Optional[str]
+	config_id: int
+
+
+def _digest(components: array.array) -> bytes:
+	return hashlib.blake2b(components.tobytes(), digest_size=16).digest()
+
+
+# Archive of saved configurations in SQLite. Component strings are interned, so a configuration
+# costs a few integers, and identical configurations share one row however often they are saved.
+class ConfigArchive:
+
+	def __init__(self, file_name=CONFIG_ARCHIVE_NAME):
+		self._db = sqlite3.connect(file_name, isolation_level=None)
+		self._db.execute('PRAGMA journal_mode=WAL')
+		self._db.execute('PRAGMA synchronous=NORMAL')
+		self._db.executescript(_SCHEMA)
+		# Filled on first use: `(category, name) -> id` and back
+		self._component_ids: Optional[Dict[Tuple[str, str], int]] = None
+		self._components: Dict[int, Tuple[str, str]] = dict()
+
+	def close(self):
+		self._db.close()
+
+	@contextmanager
+	def _transaction(self):
+		self._db.execute('BEGIN IMMEDIATE')
+		try:
+			yield self._db
+		except BaseException:
+			self._db.execute('ROLLBACK')
+			raise
+		else:
+			self._db.execute('COMMIT')
+
+	def _loadComponents(self):
+		if self._component_ids is None:
+			self._component_ids = dict()
+			for id_, category, name in self._db.execute('SELECT id, category, name FROM component'):
+				self._component_ids[category, name] = id_
+				self._components[id_] = (category, name)
+		return self._component_ids
+
+	def _intern(self, category, name) -> int:
+		ids = self._loadComponents()
+		key = (category, name)
+		id_ = ids.get(key)
+		if id_ is None:
+			id_ = self._db.execute('INSERT INTO component (category, name) VALUES (?, ?)', key).lastrowid
+			ids[key] = id_
+			self._components[id_] = key
+		return id_
+
+	def _componentIds(self, data: Mapping) -> array.array:
+		ids = list()
+		for category, value in data.items():
+			for name in (value if isinstance(value, (list, tuple)) else (value,)):
+				ids.append(self._intern(category, name))
+		return array.array('I', sorted(set(ids)))
+
+	def _decode(self, components: bytes) -> HardwareConfig:
+		self._loadComponents()
+		ids = array.array('I')
+		ids.frombytes(components)
+		config = dict()
+		for id_ in ids:
+			category, name = self._components[id_]
+			if category not in config:
+				config[category] = name
+			elif isinstance(config[category], list):
+				config[category].append(name)
+			else:
+				config[category] = [config[category], name]
+		return HardwareConfig(config)
+
+	def _addConfig(self, db, data: Mapping) -> int:
+		components = self._componentIds(data)
+		digest = _digest(components)
+		row = db.execute('SELECT id FROM config WHERE digest = ?', (digest,)).fetchone()
+		if row:
+			return row[0]
+		config_id = db.execute('INSERT INTO config (digest, components) VALUES (?, ?)',
+			(digest, components.tobytes())).lastrowid
+		db.executemany('INSERT INTO config_component (component_id, config_id) VALUES (?, ?)',
+			((component_id, config_id) for component_id in components))
+		return config_id
+
+	# Returns the id of the new entry
+	def add(self, data: Mapping, name=None) -> int:
+		return self.addMany(((data, name),))[0]
+
+	def addMany(self, items: Iterable[Tuple[Mapping, Optional[str]]]) -> List[int]:
+		entry_ids = list()
+		try:
+			with self._transaction() as db:
+				for data, name in items:
+					config_id = self._addConfig(db, data)
+					entry_ids.append(db.execute('INSERT INTO entry (name, config_id) VALUES (?, ?)',
+						(name, config_id)).lastrowid)
+		except BaseException:
+			# Interned IDs of the rolled back components are gone too
+			self._component_ids = None
+			self._components.clear()
+			raise
+		return entry_ids
+
+	def entryCount(self):
+		return self._db.execute('SELECT count(*) FROM entry').fetchone()[0]
+
+	def configCount(self):
+		return self._db.execute('SELECT count(*) FROM config').fetchone()[0]
+
+	def entries(self) -> Iterator[ArchiveEntry]:
+		for row in self._db.execute('SELECT id, name, config_id FROM entry ORDER BY id'):
+			yield ArchiveEntry(*row)
+
+	# Every entry with its configuration, read in one pass
+	def iterConfigs(self) -> Iterator[Tuple[ArchiveEntry, HardwareConfig]]:
+		decoded = dict()
+		sql = 'SELECT e.id, e.name, e.config_id, c.components FROM entry e JOIN config c ON c.id = e.config_id ORDER BY e.id'
+		for id_, name, config_id, components in self._db.execute(sql):
+			config = decoded.get(config_id)
+			if config is None:
+				if len(decoded) >= 4096:
+					decoded.clear()
+				config = decoded[config_id] = self._decode(components)
+			yield ArchiveEntry(id_, name, config_id), config
+
+	def config(self, config_id) -> HardwareConfig:
+		row = self._db.execute('SELECT components FROM config WHERE id = ?', (config_id,)).fetchone()
+		if row is None:
+			raise KeyError(config_id)
+		return self._decode(row[0])
+
+	# Distinct configurations using a component named `name` (of `category`, if given), by the index
+	def configsUsing(self, name, category=None) -> List[int]:
+		if category is None:
+			where, args = 'c.name = ?', (name,)
+		else:
+			where, args = 'c.category = ? AND c.name = ?', (category, name)
+		sql = f'''
+			SELECT DISTINCT cc.config_id FROM component c JOIN config_component cc ON cc.component_id = c.id
+			WHERE {where} ORDER BY cc.config_id
+		'''
+		return [config_id for config_id, in self._db.execute(sql, args)]
+
+	def entriesOf(self, config_id) -> List[ArchiveEntry]:
+		rows = self._db.execute('SELECT id, name, config_id FROM entry WHERE config_id = ? ORDER BY id', (config_id,))
+		return [ArchiveEntry(*row) for row in rows]
+
+	def importFile(self, file_name, file_format: AbstractFileFormat = JsonFormat()) -> int:
+		if file_format.streamReadable():
+			configs = file_format.iterConfigs(file_name)
+		else:
+			configs = (file_format.read(file_name),)
+		return len(self.addMany((data, file_name) for data in configs))
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Конфигуратор АРМ: архив конфигураций")
+	parser.add_argument('--archive', default=CONFIG_ARCHIVE_NAME)
+	commands = parser.add_subparsers(dest='command', required=True)
+	add = commands.add_parser('add', help="archive configurations saved as JSON or JSON Lines")
+	add.add_argument('files', nargs='+')
+	commands.add_parser('list', help="list archived configurations")
+	using = commands.add_parser('using', help="configurations using a component")
+	using.add_argument('name')
+	using.add_argument('--category')
+	args = parser.parse_args(argv)
+
+	archive = ConfigArchive(args.archive)
+	try:
+		if args.command == 'add':
+			for file_name in args.files:
+				print(f"{file_name}: {archive.importFile(file_name)}")
+			print(f"Записей: {archive.entryCount()}, различных конфигураций: {archive.configCount()}")
+		elif args.command == 'list':
+			for entry in archive.entries():
+				print(entry.id, entry.config_id, entry.name or '', sep='\t')
+		else:
+			for config_id in archive.configsUsing(args.name, args.category):
+				names = ', '.join(entry.name or str(entry.id) for entry in archive.entriesOf(config_id))
+				print(config_id, json.dumps(dict(archive.config(config_id)), ensure_ascii=False), names, sep='\t')
+	finally:
+		archive.close()
+
+
+if __name__ == '__main__':
+	sys.exit(main())
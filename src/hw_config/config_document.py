@@ -0,0 +1,137 @@
+import io
+import mmap
+import re
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from hw_config_model import HardwareConfig
+
+__all__ = ['ConfigDocument', 'StreamedConfigDocument', 'DelimitedConfigDocument']
+
+
+# The configurations of an opened file, each decoded only once it is asked for
+class ConfigDocument:
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+	# `IndexError` past the last one
+	def config(self, index) -> HardwareConfig:
+		raise NotImplementedError
+
+	def hasConfig(self, index) -> bool:
+		try:
+			self.config(index)
+		except IndexError:
+			return False
+		return True
+
+	# Number of configurations, `None` while the end of the file has not been reached
+	def knownCount(self) -> Optional[int]:
+		raise NotImplementedError
+
+	# Reads through to the end
+	def count(self) -> int:
+		raise NotImplementedError
+
+	def close(self):
+		pass
+
+
+# Configurations parsed one after the other by a format's `iterConfigs`; those decoded are kept
+class StreamedConfigDocument(ConfigDocument):
+
+	def __init__(self, configs: Iterator[HardwareConfig]):
+		self._iterator = configs
+		self._configs: List[HardwareConfig] = list()
+		self._complete = False
+
+	def _decodeNext(self) -> bool:
+		if self._complete:
+			return False
+		config = next(self._iterator, None)
+		if config is None:
+			self._complete = True
+			self.close()
+			return False
+		self._configs.append(config)
+		return True
+
+	def config(self, index) -> HardwareConfig:
+		while len(self._configs) <= index:
+			if not self._decodeNext():
+				raise IndexError(index)
+		return self._configs[index]
+
+	def knownCount(self) -> Optional[int]:
+		return len(self._configs) if self._complete else None
+
+	def count(self) -> int:
+		while self._decodeNext():
+			pass
+		return len(self._configs)
+
+	def close(self):
+		close = getattr(self._iterator, 'close', None)
+		if close is not None:
+			close()
+
+
+# A file of records between separators (JSON Lines, plain text blocks), mapped into memory.
+# Records are only located as far as asked; only the one asked for is decoded. Blank records are
+# skipped, unless the separator `terminates` each record: then a blank one before it is a record too.
+class DelimitedConfigDocument(ConfigDocument):
+
+	def __init__(self, file_name, separator: bytes, decode: Callable[[bytes], HardwareConfig], terminates=False):
+		self._separator = re.compile(separator)
+		self._decode = decode
+		self._terminates = terminates
+		self._file = io.open(file_name, 'rb')
+		try:
+			self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:
+			# An empty file cannot be mapped
+			self._map = b''
+		self._size = len(self._map)
+		self._spans: List[Tuple[int, int]] = list()
+		self._position = 0
+
+	def _locateNext(self) -> bool:
+		while self._position < self._size:
+			match = self._separator.search(self._map, self._position)
+			start = self._position
+			end, self._position = match.span() if match else (self._size, self._size)
+			if self._map[start:end].strip() or self._terminates and match:
+				self._spans.append((start, end))
+				return True
+		return False
+
+	def config(self, index) -> HardwareConfig:
+		if index < 0:
+			raise IndexError(index)
+		while len(self._spans) <= index:
+			if not self._locateNext():
+				raise IndexError(index)
+		start, end = self._spans[index]
+		return self._decode(self._map[start:end])
+
+	def hasConfig(self, index) -> bool:
+		while len(self._spans) <= index:
+			if not self._locateNext():
+				return False
+		return index >= 0
+
+	def knownCount(self) -> Optional[int]:
+		return len(self._spans) if self._position >= self._size else None
+
+	def count(self) -> int:
+		while self._locateNext():
+			pass
+		return len(self._spans)
+
+	def close(self):
+		if isinstance(self._map, mmap.mmap):
+			self._map.close()
+		self._file.close()
@@ -0,0 +1,89 @@
+import re
+from html import escape
+from typing import Any, Mapping, NamedTuple, Tuple, Union
+
+__all__ = ['TemplateError', 'HtmlTemplate', 'escaped']
+
+
+class TemplateError(Exception):
+	pass
+
+
+# `{{name}}` is replaced by the escaped value, `{{&name}}` by the raw one
+_TAG = re.compile(r'{{\s*(&?)\s*([\w.-]+)\s*}}')
+
+
+class _Slot(NamedTuple):
+	name: str
+	escaped: bool
+
+
+def _compile(source: str) -> Tuple[Union[str, _Slot], ...]:
+	nodes = list()
+	position = 0
+	for match in _TAG.finditer(source):
+		if match.start() > position:
+			nodes.append(source[position:match.start()])
+		position = match.end()
+		kind, name = match.groups()
+		nodes.append(_Slot(name, kind != '&'))
+	if position < len(source):
+		nodes.append(source[position:])
+	return tuple(nodes)
+
+
+_SPECIAL = re.compile('[&<>"\']')
+
+
+# Text of `value` for HTML; plain text, the usual case, is returned as it is
+def escaped(value) -> str:
+	value = value if type(value) is str else str(value)
+	return escape(value) if _SPECIAL.search(value) else value
+
+
+# Turns the parsed template into the source of a Python function appending its pieces to a list
+def _build_function(nodes):
+	lines = ['def render(context):', '\tout = list()', '\tappend = out.append']
+	for node in nodes:
+		if type(node) is str:
+			lines.append(f"\tappend({node!r})")
+			continue
+		lines.append(f"\tvalue = context.get({node.name!r}, '')")
+		if node.escaped:
+			# Plain text, the usual case, goes straight through
+			lines.append("\tappend(value if type(value) is str and not _special(value) else escaped(value))")
+		else:
+			lines.append("\tappend(value if type(value) is str else str(value))")
+	lines.append('\treturn out')
+	namespace = dict(escaped=escaped, _special=_SPECIAL.search)
+	exec(compile('\n'.join(lines), '<html template>', 'exec'), namespace)
+	return namespace['render']
+
+
+# Compiled once into a Python function over static chunks and slots; rendering collects the
+# pieces of the whole document in one list and joins them once
+class HtmlTemplate:
+
+	def __init__(self, source: str):
+		self._nodes = _compile(source)
+		self._render = _build_function(self._nodes)
+
+	def render(self, context: Mapping[str, Any]) -> str:
+		return ''.join(self._render(context))
+
+	# The template with `values` filled in ahead of time: `(chunk, name, chunk, ..., name, chunk)`,
+	# static text around the escaped slots left. A fragment rendered many times over with only those
+	# changing is then just its chunks joined with the escaped values.
+	def bind(self, values: Mapping[str, Any]) -> Tuple[str, ...]:
+		parts = ['']
+		for node in self._nodes:
+			if type(node) is str:
+				parts[-1] += node
+			elif node.name in values:
+				value = values[node.name]
+				parts[-1] += escaped(value) if node.escaped else value if type(value) is str else str(value)
+			elif node.escaped:
+				parts += [node.name, '']
+			else:
+				raise TemplateError(f"Нет значения для {{{{{node.name}}}}}")
+		return tuple(parts)
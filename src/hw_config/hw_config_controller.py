@@ -2,18 +2,20 @@ import os.path
 import traceback
 from contextlib import contextmanager
 from dataclasses import dataclass
-from frozendict import frozendict
+from types import MappingProxyType
 
-from PyQt5.QtCore import pyqtSlot
+from PyQt5.QtCore import QTimer, pyqtSlot
 from PyQt5.QtGui import QKeySequence, QCloseEvent
 from PyQt5.QtWidgets import QMainWindow, QAction, QMessageBox, QMenuBar, qApp, QFileDialog, QWidget, \
-	QComboBox, QVBoxLayout, QLabel
+	QComboBox, QVBoxLayout, QLabel, QDialog
 
 from common import ActionSet
-from search_dialog import SearchDialog
-from hw_config_file import PlainTextFormat, JsonFormat, HtmlFormat
-from refresh_database_dialog import RefreshDatabaseDialog
-from hw_config_model import ComponentCategory
+from hw_config_model import COMPONENT_CATEGORIES, ComponentCategory, HardwareConfig
+from instrumentation import span, traced
+from startup_profile import callOnFirstPaint
+
+# Dialogs, file formats, the registry and the network stack are imported where first used,
+# so none of them delays the first paint of the window
 
 
 class AbstractHardwareConfigController:
@@ -22,6 +24,8 @@ class AbstractHardwareConfigController:
 	openConfig = pyqtSlot()
 	saveConfig = pyqtSlot()
 	saveConfigAs = pyqtSlot()
+	nextConfig = pyqtSlot()
+	previousConfig = pyqtSlot()
 	refreshDatabase = pyqtSlot()
 	findInRegistry = pyqtSlot()
 	displayAboutQt = pyqtSlot()
@@ -31,6 +35,8 @@ class AbstractHardwareConfigController:
 
 # TODO: Separate view (`QMainWindow`) from the controller
 class HardwareConfigController(QMainWindow, AbstractHardwareConfigController):
+	# Seconds to wait for a file still being written before asking whether to keep waiting
+	save_wait_timeout = 5
 
 	@dataclass(frozen=True)
 	class Actions(ActionSet):
@@ -38,6 +44,8 @@ class HardwareConfigController(QMainWindow, AbstractHardwareConfigController):
 		open: QAction
 		save: QAction
 		save_as: QAction
+		next_config: QAction
+		previous_config: QAction
 		print: QAction
 		exit: QAction
 		refresh: QAction
@@ -45,33 +53,53 @@ class HardwareConfigController(QMainWindow, AbstractHardwareConfigController):
 		about: QAction
 		about_qt: QAction
 
-	def __init__(self, parent=None, **props):
+	def __init__(self, parent=None, warm_cache=None, autosave_interval=0, **props):
 		super().__init__(parent, **props)
-
+		self._warm_cache = warm_cache
 
 		actions = self.Actions._fresh(self)
 		self._initActions(actions, self)
 		self.addActions(actions)
+		self._actions = actions
 
 		menu_bar = self.menuBar()
 		self._initMenuBar(menu_bar, actions)
 
 		self._component_widgets = self._createComponentSelectors(self)
 		self.setCentralWidget(self._createMainForm(self._component_widgets))
+		self._catalogue_models = None
+		# The selectors are populated only once the window is on screen
+		callOnFirstPaint(self, lambda: QTimer.singleShot(0, self._loadCatalogue))
+
+		self._search_dialog = None
 
-		self._file_formats = self._createFileFormatList()
-		self._file_format = self._file_formats[0]
+		self._file_formats = None
+		self._file_format = None
 		self._file_path = None
 		self._coherent = None
+		# The opened file's configurations, decoded as they are shown, and the one shown
+		self._document = None
+		self._config_index = 0
+		# Counts the edits, so a save that completes knows whether it wrote the latest state
+		self._revision = 0
+		self._save_queue = None
+
+		self._autosave_timer = QTimer(self)
+		self._autosave_timer.timeout.connect(self._autosave)
+		# A file autosave failed to write; it is not retried until the user saves it
+		self._autosave_failed_path = None
+		self.setAutosaveInterval(autosave_interval)
 		self._claimCoherent('')
 
 	@classmethod
 	def _createFileFormatList(cls):
-		return [
-			HtmlFormat("HTML"),
-			JsonFormat("JSON"),
-			PlainTextFormat("Обычный текст"),
-		]
+		from hw_config_file import create_file_formats
+		return create_file_formats()
+
+	def _fileFormats(self):
+		if self._file_formats is None:
+			self._file_formats = self._createFileFormatList()
+		return self._file_formats
 
 	@classmethod
 	def _initActions(cls, actions: Actions, receiver: AbstractHardwareConfigController):
@@ -80,6 +108,10 @@ class HardwareConfigController(QMainWindow, AbstractHardwareConfigController):
 		actions.open.pyqtConfigure(text="&Открыть...", shortcut=QKeySequence.Open)
 		actions.save.pyqtConfigure(text="&Сохранить", shortcut=QKeySequence.Save)
 		actions.save_as.pyqtConfigure(text="&Сохранить как...", shortcut=QKeySequence.SaveAs)
+		actions.next_config.pyqtConfigure(text="С&ледующая конфигурация", shortcut=QKeySequence("Ctrl+PgDown"),
+			enabled=False)
+		actions.previous_config.pyqtConfigure(text="&Предыдущая конфигурация", shortcut=QKeySequence("Ctrl+PgUp"),
+			enabled=False)
 		actions.print.pyqtConfigure(text="&Печать...", shortcut=QKeySequence.Print)
 		actions.exit.pyqtConfigure(text="В&ыход")
 		actions.refresh.pyqtConfigure(text="Об&новить БД...", shortcut=QKeySequence.Refresh)
@@ -92,6 +124,8 @@ class HardwareConfigController(QMainWindow, AbstractHardwareConfigController):
 			actions.open:     receiver.openConfig,
 			actions.save:     receiver.saveConfig,
 			actions.save_as:  receiver.saveConfigAs,
+			actions.next_config:     receiver.nextConfig,
+			actions.previous_config: receiver.previousConfig,
 			actions.exit:     receiver.close,
 			actions.refresh:  receiver.refreshDatabase,
 			actions.find:     receiver.findInRegistry,
@@ -109,6 +143,9 @@ class HardwareConfigController(QMainWindow, AbstractHardwareConfigController):
 		file_menu.addAction(actions.save)
 		file_menu.addAction(actions.save_as)
 		file_menu.addSeparator()
+		file_menu.addAction(actions.previous_config)
+		file_menu.addAction(actions.next_config)
+		file_menu.addSeparator()
 		file_menu.addAction(actions.print)
 		file_menu.addSeparator()
 		file_menu.addAction(actions.exit)
@@ -121,24 +158,56 @@ class HardwareConfigController(QMainWindow, AbstractHardwareConfigController):
 		help_menu.addAction(actions.about)
 		help_menu.addAction(actions.about_qt)
 
+	# Selectors start empty; the catalogue is attached once `CatalogueLoadTask` has it ready
 	@classmethod
 	def _createComponentSelectors(cls, receiver: AbstractHardwareConfigController):
-		from dummy_data import dummy_data
-
-		categories = [
-			ComponentCategory.SYSTEM_UNIT,
-			ComponentCategory.MONITOR,
-			ComponentCategory.KEYBOARD,
-			ComponentCategory.MOUSE,
-		]
 		widgets = list()
-		for key in categories:
-			combo_box = QComboBox(placeholderText="(не выбрано)")
-			combo_box.addItems(dummy_data[key])
+		for key in COMPONENT_CATEGORIES:
+			combo_box = QComboBox(editable=True, insertPolicy=QComboBox.NoInsert)
+			combo_box.lineEdit().setPlaceholderText("(не выбрано)")
 			combo_box.currentTextChanged.connect(receiver.touch)
 			widgets.append(combo_box)
 
-		return frozendict(zip(categories, widgets))
+		return MappingProxyType(dict(zip(COMPONENT_CATEGORIES, widgets)))
+
+	# Registry files whose state the cached catalogue generation depends on
+	@staticmethod
+	def _registryFiles():
+		from registry_db import REGISTRY_DB_NAME
+		return REGISTRY_DB_NAME, f'{REGISTRY_DB_NAME}-wal'
+
+	def _loadCatalogue(self):
+		from catalogue_model import CatalogueLoadTask
+		if self._warm_cache is None:
+			task = CatalogueLoadTask()
+		else:
+			# Unless the registry changed since, last run's catalogue is opened without consulting it
+			generation = self._warm_cache.getFor('catalogue', *self._registryFiles())
+			directory = os.path.join(self._warm_cache.directory(), 'catalogue')
+			os.makedirs(directory, exist_ok=True)
+			task = CatalogueLoadTask(self._registryFiles()[0], directory, generation)
+		task.signals.loaded.connect(self._setCatalogue)
+		task.signals.failed.connect(self._onCatalogueFailed)
+		task.start()
+
+	@pyqtSlot(object)
+	def _setCatalogue(self, catalogue):
+		from catalogue_model import CatalogueModels, attachCatalogue
+		previous = self._catalogue_models
+		models = CatalogueModels(catalogue, self)
+		for key, widget in self._component_widgets.items():
+			attachCatalogue(widget, models, key)
+		self._catalogue_models = models
+		self._checkCompatibility()
+		if self._warm_cache is not None and catalogue.generation() is not None:
+			self._warm_cache.setFor('catalogue', catalogue.generation(), *self._registryFiles())
+		if previous is not None:
+			previous.catalogue().close()
+			previous.deleteLater()
+
+	@pyqtSlot(str, str)
+	def _onCatalogueFailed(self, message, details):
+		self.statusBar().showMessage(f"Не удалось загрузить каталог: {message}")
 
 	@classmethod
 	def _createMainForm(cls, component_selectors):
@@ -167,15 +236,18 @@ class HardwareConfigController(QMainWindow, AbstractHardwareConfigController):
 			yield errors
 		except Exception as ex:
 			errors.append(ex)
-			ex_trace = traceback.format_exception(type(ex), ex, ex.__traceback__)
-			message_box = QMessageBox(self,
-				icon=QMessageBox.Warning,
-				text="Произошла чудовищная ошибка!",
-				informativeText=str(ex),
-				detailedText="".join(ex_trace),
-				# windowFlags=Qt.Dialog,  # This should enable resize, but for a bunch of reasons, it doesn't.
-			)
-			message_box.exec()
+			self._showError("Произошла чудовищная ошибка!", str(ex),
+				"".join(traceback.format_exception(type(ex), ex, ex.__traceback__)))
+
+	def _showError(self, text, message, details):
+		message_box = QMessageBox(self,
+			icon=QMessageBox.Warning,
+			text=text,
+			informativeText=message,
+			detailedText=details,
+			# windowFlags=Qt.Dialog,  # This should enable resize, but for a bunch of reasons, it doesn't.
+		)
+		message_box.exec()
 
 	def ensureCoherent(self):
 		if self._coherent:
@@ -185,7 +257,11 @@ class HardwareConfigController(QMainWindow, AbstractHardwareConfigController):
 		answer = QMessageBox.question(self, qApp.applicationDisplayName(), question,
 			QMessageBox.Save | QMessageBox.Discard | QMessageBox.Cancel)
 		if answer == QMessageBox.Save:
-			return self.saveConfig()
+			# Only saved once it is written
+			if not self.saveConfig():
+				return False
+			waited = self._waitForSaves()
+			return waited == QMessageBox.Discard or waited == QMessageBox.Ok and bool(self._coherent)
 		if answer == QMessageBox.Discard:
 			return True
 		if answer == QMessageBox.Cancel:
@@ -195,14 +271,67 @@ class HardwareConfigController(QMainWindow, AbstractHardwareConfigController):
 		if file_format:
 			self._file_format = file_format
 		self._file_path = file_path
+		if file_path and self._warm_cache is not None:
+			self._warm_cache.set('last_file', dict(path=file_path, format=self._file_format.name()))
 		self._coherent = True
 		self.setWindowFilePath(os.path.basename(file_path) or "(без имени)")
 		self.setWindowModified(False)
 
 	@pyqtSlot()
 	def touch(self):
+		self._revision += 1
 		self._coherent = False
 		self.setWindowModified(True)
+		self._checkCompatibility()
+
+	# `compatibility.Feature` flags of the component chosen in each selector that is not empty
+	def _chosenFeatures(self):
+		from compatibility import product_features
+		chosen = dict()
+		for category, widget in self._component_widgets.items():
+			text = widget.currentText()
+			if not text:
+				continue
+			if self._catalogue_models is None:
+				chosen[category] = product_features(text)
+			else:
+				chosen[category] = self._catalogue_models.features(category, text, widget.currentIndex())
+		return chosen
+
+	# Narrows the selectors down to what goes with the components chosen in the others
+	# and tells about a choice that does not
+	def _checkCompatibility(self):
+		from compatibility import check_compatibility
+		chosen = self._chosenFeatures()
+		if self._catalogue_models is not None:
+			widgets = self._component_widgets
+			texts = {category: widget.currentText() for category, widget in widgets.items()}
+			for widget in widgets.values():
+				widget.blockSignals(True)
+			try:
+				for category in self._catalogue_models.narrow(chosen):
+					# A model reset clears the text, which may well be something not in the list
+					widgets[category].setCurrentIndex(-1)
+					widgets[category].setEditText(texts[category])
+			finally:
+				for widget in widgets.values():
+					widget.blockSignals(False)
+		problems = check_compatibility(chosen)
+		if problems:
+			self.statusBar().showMessage("Несовместимо: " + "; ".join(problems))
+		elif self.statusBar().currentMessage().startswith("Несовместимо: "):
+			self.statusBar().clearMessage()
+
+	# Asks before saving a configuration whose components do not go together
+	def _confirmCompatible(self):
+		from compatibility import check_compatibility
+		problems = check_compatibility(self._chosenFeatures())
+		if not problems:
+			return True
+		question = "\n".join(problems) + "\n\nВсё равно сохранить конфигурацию?"
+		answer = QMessageBox.warning(self, qApp.applicationDisplayName(), question,
+			QMessageBox.Save | QMessageBox.Cancel, QMessageBox.Cancel)
+		return answer == QMessageBox.Save
 
 	@pyqtSlot()
 	def newConfig(self):
@@ -214,75 +343,239 @@ class HardwareConfigController(QMainWindow, AbstractHardwareConfigController):
 		return True
 
 	@pyqtSlot()
+	@traced(category='slot')
 	def openConfig(self):
 		if not self.ensureCoherent():
 			return False
 
 		file_formats = {
 			'{name} ({mask})'.format(name=ff.name(), mask=' '.join(f'*.{suf}' for suf in ff.fileSuffixes())): ff
-			for ff in self._file_formats if ff.readable()
+			for ff in self._fileFormats() if ff.readable()
 		}
-		file_path, ff_key = QFileDialog.getOpenFileName(self, None, self._file_path, ";;".join(file_formats.keys()))
-		file_format = file_formats.get(ff_key)
+		file_path, ff_key = QFileDialog.getOpenFileName(self, None, self._file_path or self._lastFile()[0],
+			";;".join(file_formats.keys()), self._lastFilter(file_formats))
 		if not file_path:
 			return False
 		with self._guardExceptions() as errors:
+			from hw_config_file import detect_file_format
+			# The content tells the format; the filter picked only matters for a file it does not
+			file_format = detect_file_format(file_path, file_formats.values()) or file_formats.get(ff_key)
+			if file_format is None:
+				raise ValueError(f"Не удалось определить формат файла {os.path.basename(file_path)}")
 			self._doLoad(file_path, file_format)
 			self._claimCoherent(file_path, file_format)
 		return not errors
 
 	@pyqtSlot()
+	def nextConfig(self):
+		return self._goToConfig(self._config_index + 1)
+
+	@pyqtSlot()
+	def previousConfig(self):
+		return self._goToConfig(self._config_index - 1)
+
+	# Shows another configuration of the opened file, decoding only that one
+	def _goToConfig(self, index):
+		if self._document is None or index < 0 or not self._document.hasConfig(index):
+			return False
+		if not self.ensureCoherent() or self._document is None:
+			return False
+		with self._guardExceptions() as errors:
+			self._showComponents(self._document.config(index))
+			self._config_index = index
+			self._claimCoherent(self._file_path)
+		self._updateDocumentActions()
+		return not errors
+
+	# Saving a file of several configurations would leave just the one shown
+	def _isMultiConfig(self):
+		return self._document is not None and self._document.hasConfig(1)
+
+	def _updateDocumentActions(self):
+		multiple = self._isMultiConfig()
+		self._actions.previous_config.setEnabled(multiple and self._config_index > 0)
+		self._actions.next_config.setEnabled(multiple and self._document.hasConfig(self._config_index + 1))
+		if multiple:
+			count = self._document.knownCount()
+			self.statusBar().showMessage(
+				f"Конфигурация {self._config_index + 1}" + (f" из {count}" if count is not None else ""))
+
+	def _closeDocument(self):
+		if self._document is not None:
+			self._document.close()
+			self._document = None
+		self._config_index = 0
+
+	@pyqtSlot()
+	@traced(category='slot')
 	def saveConfig(self):
-		if not self._file_path:
+		if not self._file_path or self._isMultiConfig():
 			return self.saveConfigAs()
+		if not self._confirmCompatible():
+			return False
 
 		with self._guardExceptions() as errors:
 			self._doSave(self._file_path, self._file_format)
-			self._claimCoherent()
 		return not errors
 
 	@pyqtSlot()
+	@traced(category='slot')
 	def saveConfigAs(self):
+		if not self._confirmCompatible():
+			return False
+
 		file_formats = {
 			'{name} ({mask})'.format(name=ff.name(), mask=' '.join(f'*.{suf}' for suf in ff.fileSuffixes())): ff
-			for ff in self._file_formats if ff.writable()
+			for ff in self._fileFormats() if ff.writable()
 		}
 
-		file_path, ff_key = QFileDialog.getSaveFileName(self, None, self._file_path, ';;'.join(file_formats.keys()))
+		file_path, ff_key = QFileDialog.getSaveFileName(self, None, self._file_path or self._lastFile()[0],
+			';;'.join(file_formats.keys()), self._lastFilter(file_formats))
 		file_format = file_formats.get(ff_key)
 		if not file_path:
 			return False
 
 		with self._guardExceptions() as errors:
 			self._doSave(file_path, file_format)
-			self._claimCoherent(file_path, file_format)
 		return not errors
 
-	def _doSave(self, file_path, file_format):
-		config = {
-			key: widget.currentText()
-			for key, widget in self._component_widgets.items()
-			if widget.currentIndex() != -1
-		}
-		file_format.write(file_path, config)
+	# Path and format name of the file last opened or saved, in this run or an earlier one
+	def _lastFile(self):
+		last = self._warm_cache.get('last_file') if self._warm_cache is not None else None
+		return (last['path'], last['format']) if last else ('', None)
+
+	def _lastFilter(self, file_formats):
+		name = self._file_format.name() if self._file_format else self._lastFile()[1]
+		return next((key for key, ff in file_formats.items() if ff.name() == name), '')
+
+	def _saveQueue(self):
+		if self._save_queue is None:
+			from save_queue import SaveQueue
+			self._save_queue = SaveQueue(parent=self)
+			self._save_queue.saved.connect(self._onSaved)
+			self._save_queue.failed.connect(self._onSaveFailed)
+		return self._save_queue
+
+	# Writes the configuration on a pool thread; it only counts as saved once `_onSaved` hears so.
+	# Further saves go to this file right away, even before this one is written.
+	def _doSave(self, file_path, file_format, autosave=False):
+		config = HardwareConfig({key: widget.currentText() for key, widget in self._component_widgets.items()})
+		# The file will hold just this configuration
+		self._closeDocument()
+		self._updateDocumentActions()
+		self._file_path = file_path
+		self._file_format = file_format
+		self._saveQueue().save(file_path, file_format, config, (self._revision, file_format, autosave))
+
+	# Waits for the saves still being written; false if the wait timed out
+	def _flushSaves(self, timeout=None):
+		if self._save_queue is None:
+			return True
+		return self._save_queue.flush(timeout)
+
+	# Waits a while for the saves still being written. Should they take longer (a network share
+	# that hangs), the user decides: `Ok` once written, `Discard` to stop waiting, `Cancel`.
+	def _waitForSaves(self):
+		while not self._flushSaves(self.save_wait_timeout):
+			answer = QMessageBox.question(self, qApp.applicationDisplayName(),
+				"Конфигурация всё ещё записывается. Подождать ещё?",
+				QMessageBox.Retry | QMessageBox.Discard | QMessageBox.Cancel, QMessageBox.Retry)
+			if answer != QMessageBox.Retry:
+				return QMessageBox.Discard if answer == QMessageBox.Discard else QMessageBox.Cancel
+		return QMessageBox.Ok
+
+	@pyqtSlot(str, object)
+	def _onSaved(self, file_path, token):
+		revision, file_format, autosave = token
+		if file_path == self._autosave_failed_path:
+			self._autosave_failed_path = None
+		# Superseded by a save to another file
+		if file_path != self._file_path:
+			return
+		self._claimCoherent(file_path, file_format)
+		if revision != self._revision:
+			# Edited while it was being written
+			self._coherent = False
+			self.setWindowModified(True)
+
+	@pyqtSlot(str, object, str, str)
+	def _onSaveFailed(self, file_path, token, message, details):
+		if file_path == self._file_path:
+			self._coherent = False
+			self.setWindowModified(True)
+		revision, file_format, autosave = token
+		if autosave:
+			# Not a modal box per timer tick: the status bar says so, and autosave leaves the file alone
+			self._autosave_failed_path = file_path
+			self.statusBar().showMessage(f"Автосохранение {os.path.basename(file_path)} не удалось: {message}")
+			return
+		self._showError(f"Не удалось сохранить {os.path.basename(file_path)}", message, details)
+
+	# Seconds between saves of a modified configuration into its file; 0 turns autosave off
+	def setAutosaveInterval(self, seconds):
+		if seconds > 0:
+			self._autosave_timer.start(int(seconds * 1000))
+		else:
+			self._autosave_timer.stop()
+
+	@pyqtSlot()
+	def _autosave(self):
+		if self._coherent is not False or not self._file_path or self._file_format is None \
+				or not self._file_format.writable() or self._isMultiConfig() \
+				or self._file_path == self._autosave_failed_path or self._saveQueue().isBusy(self._file_path):
+			return
+		with self._guardExceptions():
+			self._doSave(self._file_path, self._file_format, autosave=True)
 
 	def _doLoad(self, file_path, file_format):
-		config = file_format.read(file_path) if file_path else {}
+		self._closeDocument()
+		config = HardwareConfig()
+		if file_path:
+			with span(f'{type(file_format).__name__}.read', 'io', file=file_path):
+				if file_format.streamReadable():
+					document = file_format.openDocument(file_path)
+					if document.hasConfig(0):
+						config = document.config(0)
+					self._document = document
+				else:
+					config = file_format.read(file_path)
+		self._showComponents(config)
+		self._updateDocumentActions()
+
+	def _showComponents(self, config):
 		for key, widget in self._component_widgets.items():
 			if key in config:
-				widget.setCurrentText(config[key])
+				widget.setEditText(config[key])
 			else:
 				widget.setCurrentIndex(-1)
+				widget.clearEditText()
 
 	@pyqtSlot()
+	@traced(category='slot')
 	def refreshDatabase(self):
+		if self._search_dialog is not None:
+			self._search_dialog.closeRegistry()
+		from refresh_database_dialog import RefreshDatabaseDialog
 		dialog = RefreshDatabaseDialog(self)
-		dialog.exec()
+		accepted = dialog.exec() == QDialog.Accepted
+		if self._search_dialog is not None:
+			self._search_dialog.applyDelta(dialog.delta() if accepted else None)
+		if accepted and dialog.delta():
+			self._loadCatalogue()
 
 	@pyqtSlot()
+	@traced(category='slot')
 	def findInRegistry(self):
-		dialog = SearchDialog(self)
-		dialog.exec()
+		# Kept between invocations, so the registry is parsed once per session
+		if self._search_dialog is None:
+			from search_dialog import SearchDialog
+			self._search_dialog = SearchDialog(self)
+		if self._search_dialog.exec() != QDialog.Accepted:
+			return
+		# A component picked in the registry goes into its selector
+		product = self._search_dialog.selectedProduct()
+		if product is not None and product.category in self._component_widgets:
+			self._component_widgets[product.category].setEditText(product.name)
 
 	@pyqtSlot()
 	def displayAbout(self):
@@ -300,3 +593,11 @@ class HardwareConfigController(QMainWindow, AbstractHardwareConfigController):
 	def closeEvent(self, ev: QCloseEvent):
 		if not self.ensureCoherent():
 			ev.ignore()
+			return
+		# An autosave may still be under way
+		if self._waitForSaves() == QMessageBox.Cancel:
+			ev.ignore()
+			return
+		self._closeDocument()
+		if self._warm_cache is not None:
+			self._warm_cache.save()
@@ -1,7 +1,22 @@
+import functools
 import io
 import json
+import os
+import re
+from html.parser import HTMLParser
+from typing import Callable, Iterable, Iterator, List, Mapping, Optional
 
-from hw_config_model import ComponentCategory
+from config_document import ConfigDocument, DelimitedConfigDocument, StreamedConfigDocument
+from html_template import HtmlTemplate, escaped
+from hw_config_model import ComponentCategory, HardwareConfig
+from registry_json import iter_json_items
+
+__all__ = ['SNIFF_SIZE', 'AbstractFileFormat', 'ConfigWriter', 'write_atomic', 'PlainTextFormat', 'JsonFormat',
+	'HtmlFormat', 'create_file_formats', 'detect_file_format']
+
+
+# Formats are told apart by this much of the start of a file
+SNIFF_SIZE = 4096
 
 
 class AbstractFileFormat:
@@ -22,9 +37,134 @@ class AbstractFileFormat:
 	def readable(self):
 		return hasattr(self, 'read')
 
+	# `write(file_name, data, sync=True)` replaces the file atomically with `dumps(data)`
 	def writable(self):
 		return hasattr(self, 'write')
 
+	# Many configurations per file: `openWriter(file_name)` returns a `ConfigWriter`,
+	# `iterConfigs(file_name)` reads them back one at a time
+	def streamWritable(self):
+		return hasattr(self, 'openWriter')
+
+	def streamReadable(self):
+		return hasattr(self, 'iterConfigs')
+
+	# Whether the start of a file (up to `SNIFF_SIZE` bytes, decoded) looks like this format
+	def sniff(self, head: str) -> bool:
+		return False
+
+	# The configurations of the file, each decoded once it is asked for
+	def openDocument(self, file_name) -> ConfigDocument:
+		return StreamedConfigDocument(self.iterConfigs(file_name))
+
+	# The first configuration, without parsing the rest of the file
+	def _readFirst(self, file_name) -> HardwareConfig:
+		with self.openDocument(file_name) as document:
+			return document.config(0) if document.hasConfig(0) else HardwareConfig()
+
+
+# Replaces the file with `text` in one step: a crash leaves either the old file or the new one.
+# With `sync`, the data is on disk once this returns, not just handed to the OS.
+def write_atomic(file_name, text: str, sync=True):
+	temp_name = f'{file_name}.tmp'
+	try:
+		with io.open(temp_name, 'wt', encoding='utf-8') as file:
+			file.write(text)
+			if sync:
+				file.flush()
+				os.fsync(file.fileno())
+		os.replace(temp_name, file_name)
+	except BaseException:
+		_remove_quietly(temp_name)
+		raise
+	if sync:
+		_sync_directory(file_name)
+
+
+def _remove_quietly(file_name):
+	try:
+		os.remove(file_name)
+	except OSError:
+		pass
+
+
+# The rename itself is only durable once the directory is flushed; not possible on Windows
+def _sync_directory(file_name):
+	if os.name != 'posix':
+		return
+	fd = os.open(os.path.dirname(os.path.abspath(file_name)), os.O_RDONLY)
+	try:
+		os.fsync(fd)
+	finally:
+		os.close(fd)
+
+
+# Appends configurations to a file opened once, writing them out in chunks of about `chunk_size` characters.
+# They go to a temporary file that replaces `file_name` on `close`; one left by an exception is discarded.
+class ConfigWriter:
+	chunk_size = 1 << 16
+
+	def __init__(self, file_name, encode: Callable[[dict], str], header='', footer='', separator=''):
+		self._file_name = file_name
+		self._temp_name = f'{file_name}.tmp'
+		self._file = io.open(self._temp_name, 'wt', encoding='utf-8')
+		self._encode = encode
+		self._footer = footer
+		self._separator = separator
+		self._buffer = [header]
+		self._size = len(header)
+		self._count = 0
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, exc_type, exc_value, traceback):
+		if exc_type is None:
+			self.close()
+		else:
+			self.discard()
+
+	def count(self):
+		return self._count
+
+	def write(self, data):
+		text = self._encode(data)
+		if self._count and self._separator:
+			self._buffer.append(self._separator)
+		self._buffer.append(text)
+		self._size += len(text)
+		self._count += 1
+		if self._size >= self.chunk_size:
+			self.flush()
+
+	def flush(self):
+		self._file.write(''.join(self._buffer))
+		self._buffer.clear()
+		self._size = 0
+
+	def close(self):
+		if self._file is None:
+			return
+		self._buffer.append(self._footer)
+		try:
+			self.flush()
+			self._file.flush()
+			os.fsync(self._file.fileno())
+		except BaseException:
+			self.discard()
+			raise
+		self._file.close()
+		self._file = None
+		os.replace(self._temp_name, self._file_name)
+		_sync_directory(self._file_name)
+
+	def discard(self):
+		if self._file is None:
+			return
+		self._file.close()
+		self._file = None
+		_remove_quietly(self._temp_name)
+
 
 class PlainTextFormat(AbstractFileFormat):
 
@@ -34,10 +174,72 @@ class PlainTextFormat(AbstractFileFormat):
 	def fileSuffixes(self):
 		return 'txt',
 
-	def write(self, file_name, data):
-		with io.open(file_name, 'wt') as file:
-			for category, component in data.items():
-				file.write(f"{category}: \"{component}\"")
+	# A configuration is a block of `category: "component"` lines ending with a `---` line, so an empty
+	# one still takes a record. The last block of a file may lack it.
+	terminator = '---'
+
+	@classmethod
+	def _encode(cls, data):
+		return ''.join(f"{category}: {json.dumps(component, ensure_ascii=False)}\n"
+			for category, component in data.items()) + f'{cls.terminator}\n'
+
+	@classmethod
+	def _isTerminator(cls, line: str):
+		return line == cls.terminator
+
+	@staticmethod
+	def _decodeValue(text):
+		try:
+			return json.loads(text)
+		except ValueError:
+			return text.strip('"')
+
+	@classmethod
+	def _decodeLine(cls, config: dict, line: str):
+		category, _, value = line.partition(':')
+		config[category.strip()] = cls._decodeValue(value.strip())
+
+	_sniff_pattern = re.compile(r'\s*(?:---[ \t]*(?:\r?\n|$)|[^\s:<{\[]+[ \t]*:[ \t]*\S)')
+
+	def sniff(self, head: str) -> bool:
+		return self._sniff_pattern.match(head) is not None
+
+	# Blocks are found without decoding the ones before
+	def openDocument(self, file_name) -> ConfigDocument:
+		return DelimitedConfigDocument(file_name, rb'(?m)^[ \t]*---[ \t\r]*(?:\n|\Z)', self._decodeBlock, terminates=True)
+
+	def _decodeBlock(self, data: bytes) -> HardwareConfig:
+		config = dict()
+		for line in str(data, 'utf-8').splitlines():
+			line = line.strip()
+			if line:
+				self._decodeLine(config, line)
+		return HardwareConfig(config)
+
+	def openWriter(self, file_name) -> ConfigWriter:
+		return ConfigWriter(file_name, self._encode)
+
+	def iterConfigs(self, file_name) -> Iterator[HardwareConfig]:
+		with io.open(file_name, 'rt', encoding='utf-8') as file:
+			config = dict()
+			for line in file:
+				line = line.strip()
+				if self._isTerminator(line):
+					yield HardwareConfig(config)
+					config = dict()
+				elif line:
+					self._decodeLine(config, line)
+			if config:
+				yield HardwareConfig(config)
+
+	def read(self, file_name):
+		return self._readFirst(file_name)
+
+	def dumps(self, data) -> str:
+		return self._encode(data)
+
+	def write(self, file_name, data, sync=True):
+		write_atomic(file_name, self.dumps(data), sync)
 
 
 class JsonFormat(AbstractFileFormat):
@@ -48,63 +250,255 @@ class JsonFormat(AbstractFileFormat):
 	def fileSuffixes(self):
 		return 'json',
 
+	_sniff_pattern = re.compile(r'\s*(\{\s*["}]|\[\s*[{\]])')
+
+	def sniff(self, head: str) -> bool:
+		return self._sniff_pattern.match(head) is not None
+
+	# The first configuration of the file; of a large file, nothing after it is parsed
 	def read(self, file_name):
-		with io.open(file_name, 'rt', encoding='utf-8') as file:
-			return json.load(file)
+		return self._readFirst(file_name)
+
+	# JSON Lines are split at line ends without parsing the lines before the one asked for;
+	# a document or an array of configurations is parsed up to it
+	def openDocument(self, file_name) -> ConfigDocument:
+		if self._isJsonLines(file_name):
+			return DelimitedConfigDocument(file_name, rb'\n', lambda data: HardwareConfig(json.loads(data)))
+		return StreamedConfigDocument(self.iterConfigs(file_name))
 
-	def write(self, file_name, data):
-		with io.open(file_name, 'wt', encoding='utf-8') as file:
-			json.dump(data, file, ensure_ascii=False, indent=4)
+	# Whether the first line holds a whole object, as in a file written by `openWriter`
+	@staticmethod
+	def _isJsonLines(file_name) -> bool:
+		with io.open(file_name, 'rb') as file:
+			line = file.readline(SNIFF_SIZE * 16).strip()
+		if not line.startswith(b'{') or not line.endswith(b'}'):
+			return False
+		try:
+			return isinstance(json.loads(line), dict)
+		except ValueError:
+			return False
+
+	def dumps(self, data) -> str:
+		return json.dumps(dict(data), ensure_ascii=False, indent=4)
+
+	def write(self, file_name, data, sync=True):
+		write_atomic(file_name, self.dumps(data), sync)
+
+	# Writes JSON Lines, one configuration per line
+	def openWriter(self, file_name) -> ConfigWriter:
+		return ConfigWriter(file_name, lambda data: json.dumps(dict(data), ensure_ascii=False) + '\n')
+
+	# Reads JSON Lines as well as a file saved by `write` or an array of configurations
+	def iterConfigs(self, file_name) -> Iterator[HardwareConfig]:
+		with io.open(file_name, 'rt', encoding='utf-8') as file:
+			for value in iter_json_items(file):
+				yield HardwareConfig(value)
 
 
 class HtmlFormat(AbstractFileFormat):
 
-	# TODO: Refactor with Airium or Yattag
-	template = '''
+	header = HtmlTemplate('''
 		<!DOCTYPE html>
 		<html>
-		<head><title>Конфигурация АРМ</title></head>
+		<head>
+			<meta charset="utf-8">
+			<title>{{title}}</title>
+		</head>
 		<body>
-			<h1>Конфигурация АРМ</h1>
+			<h1>{{title}}</h1>
+''')
+
+	# A configuration is a table of these rows, under its caption in a report
+	caption_template = HtmlTemplate('''\
+			<h2>{{caption}}</h2>
+''')
+
+	table_start = '''\
 			<p>
 				<table>
 					<tr>
 						<th>Компонент</th>
 						<th>Наименование</th>
 					</tr>
+'''
+
+	row_template = HtmlTemplate('''\
 					<tr>
-						<td>Системный блок</td>
-						<td>{{systemUnit}}</td>
-					</tr>
-					<tr>
-						<td>Монитор</td>
-						<td>{{monitor}}</td>
-					</tr>
-					<tr>
-						<td>Клавиатура</td>
-						<td>{{keyboard}}</td>
-					</tr>
-					<tr>
-						<td>Мышь</td>
-						<td>{{mouse}}</td>
+						<td>{{label}}</td>
+						<td>{{name}}</td>
 					</tr>
+''')
+
+	table_end = '''\
 				</table>
 			<p>
+'''
+
+	footer = '''\
 		</body>
 		</html>
 	'''
 
+	labels = {
+		ComponentCategory.SYSTEM_UNIT: "Системный блок",
+		ComponentCategory.MONITOR: "Монитор",
+		ComponentCategory.KEYBOARD: "Клавиатура",
+		ComponentCategory.MOUSE: "Мышь",
+	}
+
+	not_chosen = "(не выбрано)"
+
 	def __init__(self, name=None):
 		super().__init__(name or "HTML")
+		# Rendered once: a table is its static chunks joined with the escaped names
+		self._caption_chunks = self.caption_template.bind(dict())
+		# By the plain string: looking up a `ComponentCategory` among string keys takes the slow path
+		self._row_chunks = {str(category): self._rowChunks(label) for category, label in self.labels.items()}
 
 	def fileSuffixes(self):
 		return 'html', 'htm'
 
-	def write(self, file_name, data):
-		html = HtmlFormat.template \
-			.replace('{{systemUnit}}', data.get(ComponentCategory.SYSTEM_UNIT, "(не выбрано)")) \
-			.replace('{{monitor}}', data.get(ComponentCategory.MONITOR, "(не выбрано)")) \
-			.replace('{{keyboard}}', data.get(ComponentCategory.KEYBOARD, "(не выбрано)")) \
-			.replace('{{mouse}}', data.get(ComponentCategory.MOUSE, "(не выбрано)"))
-		with io.open(file_name, 'wt') as file:
-			file.write(html)
+	# The row of `label` before and after the name
+	def _rowChunks(self, label):
+		before, _, after = self.row_template.bind(dict(label=label))
+		return before, after
+
+	# Titles are few; each header is rendered once
+	@classmethod
+	@functools.lru_cache(maxsize=8)
+	def _header(cls, title):
+		return cls.header.render(dict(title=title))
+
+	# Every category gets a row, "(не выбрано)" if it is missing; a list value gets a row per item.
+	# Keys of other categories follow in their own order.
+	def _appendConfig(self, out: List[str], data, caption=''):
+		if caption:
+			before, _, after = self._caption_chunks
+			out += before, escaped(caption), after
+		out.append(self.table_start)
+		not_chosen = self.not_chosen
+		for category, (before, after) in self._row_chunks.items():
+			value = data.get(category, not_chosen)
+			if type(value) is not str and isinstance(value, (list, tuple)):
+				for name in value:
+					out += before, escaped(name), after
+			else:
+				out += before, escaped(value), after
+		if not data.keys() <= self._row_chunks.keys():
+			for category, value in data.items():
+				if category not in self._row_chunks:
+					before, after = self._rowChunks(category)
+					for name in value if isinstance(value, (list, tuple)) else (value,):
+						out += before, escaped(name), after
+		out.append(self.table_end)
+
+	def _configText(self, data):
+		out = list()
+		self._appendConfig(out, data)
+		return ''.join(out)
+
+	def render(self, configs, title="Конфигурация АРМ", captions=()) -> str:
+		captions = tuple(captions)
+		out = [self._header(title)]
+		for i, data in enumerate(configs):
+			self._appendConfig(out, data, captions[i] if i < len(captions) else '')
+		out.append(self.footer)
+		return ''.join(out)
+
+	def dumps(self, data) -> str:
+		return self.render((data,))
+
+	def write(self, file_name, data, sync=True):
+		write_atomic(file_name, self.dumps(data), sync)
+
+	_sniff_pattern = re.compile(r'\s*<(!doctype\s+html|html|head|body|table|h[12]|!--)', re.IGNORECASE)
+
+	def sniff(self, head: str) -> bool:
+		return self._sniff_pattern.match(head) is not None
+
+	def read(self, file_name):
+		return self._readFirst(file_name)
+
+	# Reads back what `write` and `openWriter` write: a configuration per table
+	def iterConfigs(self, file_name) -> Iterator[HardwareConfig]:
+		parser = _HtmlConfigParser({label: category for category, label in self.labels.items()}, self.not_chosen)
+		with io.open(file_name, 'rt', encoding='utf-8') as file:
+			for chunk in iter(lambda: file.read(1 << 16), ''):
+				parser.feed(chunk)
+				yield from parser.takeConfigs()
+		parser.close()
+		yield from parser.takeConfigs()
+
+	def openWriter(self, file_name, title="Конфигурации АРМ") -> ConfigWriter:
+		return ConfigWriter(file_name, self._configText, header=self._header(title), footer=self.footer)
+
+
+# Collects the `label: name` rows of each table. Row labels are mapped back to categories;
+# a label repeated within a table makes a list.
+class _HtmlConfigParser(HTMLParser):
+
+	def __init__(self, categories: Mapping[str, str], not_chosen: str):
+		super().__init__(convert_charrefs=True)
+		self._categories = categories
+		self._not_chosen = not_chosen
+		self._configs: List[HardwareConfig] = list()
+		self._config: Optional[dict] = None
+		self._row: Optional[List[str]] = None
+		self._cell: Optional[List[str]] = None
+
+	def takeConfigs(self) -> List[HardwareConfig]:
+		configs, self._configs = self._configs, list()
+		return configs
+
+	def handle_starttag(self, tag, attrs):
+		if tag == 'table':
+			self._config = dict()
+		elif tag == 'tr' and self._config is not None:
+			self._row = list()
+		elif tag == 'td' and self._row is not None:
+			self._cell = list()
+
+	def handle_endtag(self, tag):
+		if tag == 'td' and self._cell is not None:
+			self._row.append(''.join(self._cell).strip())
+			self._cell = None
+		elif tag == 'tr' and self._row is not None:
+			if len(self._row) == 2:
+				self._add(*self._row)
+			self._row = None
+		elif tag == 'table' and self._config is not None:
+			self._configs.append(HardwareConfig(self._config))
+			self._config = None
+
+	def handle_data(self, data):
+		if self._cell is not None:
+			self._cell.append(data)
+
+	def _add(self, label, name):
+		if name == self._not_chosen:
+			return
+		category = self._categories.get(label, label)
+		if category not in self._config:
+			self._config[category] = name
+		elif isinstance(self._config[category], list):
+			self._config[category].append(name)
+		else:
+			self._config[category] = [self._config[category], name]
+
+
+# The formats offered for saving and opening, in the order they are listed
+def create_file_formats():
+	return [
+		HtmlFormat("HTML"),
+		JsonFormat("JSON"),
+		PlainTextFormat("Обычный текст"),
+	]
+
+
+# The first of `formats` that recognises the start of the file, `None` if none does
+def detect_file_format(file_name, formats: Iterable[AbstractFileFormat]) -> Optional[AbstractFileFormat]:
+	with io.open(file_name, 'rb') as file:
+		head = file.read(SNIFF_SIZE)
+	# The last character may be cut short
+	text = head.decode('utf-8', errors='ignore').lstrip('\ufeff')
+	return next((file_format for file_format in formats if file_format.sniff(text)), None)
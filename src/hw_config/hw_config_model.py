@@ -1,8 +1,109 @@
-class ComponentCategory:
+import sys
+from collections import abc
+from enum import Enum
+from typing import Iterator, Mapping, Optional, Tuple
+
+__all__ = ['ComponentCategory', 'COMPONENT_CATEGORIES', 'Product', 'HardwareConfig']
+
+
+# A `str`, so members compare, hash and serialise as their values ('monitor' == ComponentCategory.MONITOR)
+class ComponentCategory(str, Enum):
 	SYSTEM_UNIT = 'systemUnit'
 	MONITOR = 'monitor'
 	KEYBOARD = 'keyboard'
 	MOUSE = 'mouse'
 
-	def __new__(cls, *args, **kwargs):
-		raise TypeError(f"Non-instantiable type '{cls}'")
+	def __str__(self):
+		return self.value
+
+
+# The categories a configuration is made of, in the order they are shown
+COMPONENT_CATEGORIES = tuple(ComponentCategory)
+
+
+# One registry product, with only the fields the application uses. Classifier codes repeat across
+# products and are interned; the category is a shared enum member.
+class Product:
+	__slots__ = ('reg_number', 'name', 'category', 'okpd2', 'tnved')
+
+	def __init__(self, reg_number: str, name: str, category: Optional[ComponentCategory] = None,
+			okpd2: Optional[str] = None, tnved: Optional[str] = None):
+		self.reg_number = reg_number
+		self.name = name
+		self.category = ComponentCategory(category) if category else None
+		self.okpd2 = sys.intern(okpd2) if okpd2 else None
+		self.tnved = sys.intern(tnved) if tnved else None
+
+	@classmethod
+	def fromRecord(cls, record: dict, category: Optional[str] = None) -> 'Product':
+		return cls(record['product_reg_number'], record.get('product_name') or '', category,
+			record.get('product_okpd2'), record.get('product_tnved'))
+
+	def __repr__(self):
+		return f'Product({self.reg_number!r}, {self.name!r}, {self.category!s})'
+
+	def __eq__(self, other):
+		if not isinstance(other, Product):
+			return NotImplemented
+		return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+	def __hash__(self):
+		return hash(self.reg_number)
+
+
+# A configuration: the chosen component of each category, as a read-only mapping of category
+# to name. Holds a name per known category, interned like the codes of `Product`: configurations
+# choosing the same component share one string, which lives only as long as something refers to it.
+# Anything else read from a file (another category, a list of components) is kept as is.
+class HardwareConfig(abc.Mapping):
+	__slots__ = ('_names', '_extra')
+
+	def __init__(self, data: Mapping = None, **components):
+		names = [None] * len(COMPONENT_CATEGORIES)
+		extra = None
+		for category, value in dict(data or (), **components).items():
+			k = _CATEGORY_POSITIONS.get(category)
+			if k is not None and isinstance(value, str):
+				names[k] = sys.intern(str(value)) if value else None
+			elif value is not None:
+				if extra is None:
+					extra = dict()
+				extra[category] = value
+		self._names: Tuple[Optional[str], ...] = tuple(names)
+		self._extra: Optional[dict] = extra
+
+	def __getitem__(self, category):
+		k = _CATEGORY_POSITIONS.get(category)
+		if k is not None and self._names[k] is not None:
+			return self._names[k]
+		if self._extra is not None and category in self._extra:
+			return self._extra[category]
+		raise KeyError(category)
+
+	def __iter__(self) -> Iterator[str]:
+		for category, name in zip(COMPONENT_CATEGORIES, self._names):
+			if name is not None:
+				yield category
+		if self._extra is not None:
+			yield from self._extra
+
+	def __len__(self):
+		return sum(1 for name in self._names if name is not None) + (len(self._extra) if self._extra is not None else 0)
+
+	def __eq__(self, other):
+		if isinstance(other, HardwareConfig):
+			return self._names == other._names and self._extra == other._extra
+		return super().__eq__(other)
+
+	def __hash__(self):
+		return hash((self._names, tuple(self._extra or ())))
+
+	def __repr__(self):
+		return 'HardwareConfig({!r})'.format({str(category): value for category, value in self.items()})
+
+	# By name, so that the names are interned again when unpickled
+	def __reduce__(self):
+		return HardwareConfig, (dict(self),)
+
+
+_CATEGORY_POSITIONS = {category: k for k, category in enumerate(COMPONENT_CATEGORIES)}
@@ -0,0 +1,170 @@
+import functools
+import io
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import traceback
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+__all__ = ['TRACE_FLAG', 'TRACE_ENV', 'Tracer', 'StallWatchdog', 'tracer', 'enable', 'enable_from_argv',
+	'span', 'traced']
+
+
+# `--trace FILE` or `HW_CONFIG_TRACE=FILE` writes a Chrome trace (chrome://tracing, Perfetto, speedscope)
+TRACE_FLAG = '--trace'
+TRACE_ENV = 'HW_CONFIG_TRACE'
+
+_tracer: Optional['Tracer'] = None
+
+
+# Collects timed spans as Chrome trace events. Spans record wall time and, when memory tracking is on,
+# the change in memory allocated by Python (via `tracemalloc`) over the span.
+class Tracer:
+
+	def __init__(self, file_name, memory=True):
+		self._file_name = file_name
+		self._memory = memory
+		self._events = list()
+		self._lock = threading.Lock()
+		self._origin = time.perf_counter()
+		self._pid = os.getpid()
+		self._threads = set()
+		if memory and not tracemalloc.is_tracing():
+			tracemalloc.start()
+
+	def fileName(self):
+		return self._file_name
+
+	def _timestamp(self, perf_time) -> float:
+		return (perf_time - self._origin) * 1e6
+
+	def _add(self, event: dict):
+		tid = threading.get_ident()
+		event.update(pid=self._pid, tid=tid)
+		with self._lock:
+			if tid not in self._threads:
+				self._threads.add(tid)
+				self._events.append(dict(name='thread_name', ph='M', pid=self._pid, tid=tid,
+					args=dict(name=threading.current_thread().name)))
+			self._events.append(event)
+
+	def complete(self, name, category, started, finished, **args):
+		self._add(dict(name=name, cat=category, ph='X', ts=self._timestamp(started),
+			dur=(finished - started) * 1e6, args=args))
+
+	def _memory_in_use(self):
+		return tracemalloc.get_traced_memory()[0] if self._memory else 0
+
+	@contextmanager
+	def span(self, name, category='function', **args):
+		memory = self._memory_in_use()
+		started = time.perf_counter()
+		try:
+			yield
+		except BaseException as ex:
+			args['exception'] = repr(ex)
+			raise
+		finally:
+			finished = time.perf_counter()
+			if self._memory:
+				args['memory_delta_kib'] = round((self._memory_in_use() - memory) / 1024, 1)
+			self.complete(name, category, started, finished, **args)
+
+	def save(self):
+		with self._lock:
+			events = list(self._events)
+		temp_name = f'{self._file_name}.tmp'
+		with io.open(temp_name, 'wt', encoding='utf-8') as file:
+			json.dump(dict(traceEvents=events, displayTimeUnit='ms'), file, ensure_ascii=False)
+		os.replace(temp_name, self._file_name)
+
+
+def tracer() -> Optional[Tracer]:
+	return _tracer
+
+
+def enable(file_name, memory=True) -> Tracer:
+	global _tracer
+	_tracer = Tracer(file_name, memory)
+	return _tracer
+
+
+def enable_from_argv(argv, environ=os.environ) -> Optional[Tracer]:
+	file_name = environ.get(TRACE_ENV)
+	if TRACE_FLAG in argv:
+		position = argv.index(TRACE_FLAG)
+		if position + 1 < len(argv):
+			file_name = argv[position + 1]
+	return enable(file_name) if file_name else None
+
+
+@contextmanager
+def span(name, category='function', **args):
+	if _tracer is None:
+		yield
+	else:
+		with _tracer.span(name, category, **args):
+			yield
+
+
+# Traces every call of the decorated function while tracing is on; otherwise just one `None` check.
+# Goes beneath `pyqtSlot`, which has to see the wrapper.
+def traced(name: str = None, category='function'):
+	def decorator(f: Callable):
+		span_name = name or f.__qualname__
+
+		@functools.wraps(f)
+		def wrapper(*args, **kwargs):
+			if _tracer is None:
+				return f(*args, **kwargs)
+			with _tracer.span(span_name, category):
+				return f(*args, **kwargs)
+
+		return wrapper
+	return decorator
+
+
+# Reports intervals in which the GUI thread did not get back to its event loop.
+# A timer on the GUI thread ticks every `interval` ms; a watcher thread notices when a tick is
+# overdue by `threshold` ms and takes the GUI thread's stack, so the trace shows what blocked it.
+class StallWatchdog:
+
+	def __init__(self, tracer: Tracer, interval=50, threshold=200):
+		from PyQt5.QtCore import QTimer
+		self._tracer = tracer
+		self._interval = interval / 1000
+		self._threshold = threshold / 1000
+		self._gui_thread = threading.get_ident()
+		self._last_tick = time.perf_counter()
+		self._stack = None
+		self._stopped = threading.Event()
+		self._timer = QTimer(interval=interval)
+		self._timer.timeout.connect(self._tick)
+		self._watcher = threading.Thread(target=self._watch, name='stall watchdog', daemon=True)
+
+	def start(self):
+		self._last_tick = time.perf_counter()
+		self._timer.start()
+		self._watcher.start()
+
+	def stop(self):
+		self._timer.stop()
+		self._stopped.set()
+
+	def _tick(self):
+		now = time.perf_counter()
+		last, self._last_tick = self._last_tick, now
+		if now - last > self._interval + self._threshold:
+			stack, self._stack = self._stack, None
+			self._tracer.complete('event loop stall', 'stall', last, now, stack=stack or '')
+
+	def _watch(self):
+		while not self._stopped.wait(self._interval):
+			if self._stack is None and time.perf_counter() - self._last_tick > self._interval + self._threshold:
+				frame = sys._current_frames().get(self._gui_thread)
+				if frame is not None:
+					self._stack = ''.join(traceback.format_stack(frame))
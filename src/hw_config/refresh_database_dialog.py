@@ -1,17 +1,87 @@
 import sys
+import threading
+import traceback
+from concurrent.futures import CancelledError
+from typing import Optional
 
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
 from PyQt5.QtWidgets import QDialog, QApplication, QVBoxLayout, QGridLayout, QLineEdit, QLabel, QProgressBar, \
 	QDialogButtonBox
 
+from registry_delta import RegistryDelta
+from registry_db import REGISTRY_DB_NAME, RegistryDatabase
+from registry_sync import RegistrySync
+from response_cache import ResponseCache
+
+
+class RegistrySyncSignals(QObject):
+	progress = pyqtSignal(int, int)
+	# `RegistryDelta` that was applied
+	finished = pyqtSignal(object)
+	failed = pyqtSignal(str, str)
+
+
+# Downloads the registry and applies it to the store. The search snapshot is left stale rather than
+# rebuilt here: `SearchDialog` searches the store meanwhile and rebuilds it in the background.
+class RegistrySyncTask(QRunnable):
+	def __init__(self, sync: RegistrySync, db_file_name):
+		super().__init__()
+		self._sync = sync
+		self._db_file_name = db_file_name
+		self._lock = threading.Lock()
+		self._running = True
+		self._to_close = list()
+		self.signals = RegistrySyncSignals()
+
+	def start(self, pool: QThreadPool = None):
+		(pool or QThreadPool.globalInstance()).start(self)
+
+	def cancel(self):
+		self._sync.cancel()
+
+	# Closes `resource` once the task is over, right away if it is already
+	def closeWhenDone(self, resource):
+		with self._lock:
+			if self._running:
+				self._to_close.append(resource)
+				return
+		resource.close()
+
+	def run(self):
+		try:
+			self._run()
+		finally:
+			with self._lock:
+				self._running = False
+			for resource in self._to_close:
+				resource.close()
+
+	def _run(self):
+		try:
+			self._sync.run(self.signals.progress.emit)
+			database = RegistryDatabase(self._db_file_name)
+			try:
+				self.signals.finished.emit(self._sync.applyTo(database))
+			finally:
+				database.close()
+		except CancelledError:
+			pass
+		except Exception as ex:
+			if not self._sync.isCancelled():
+				self.signals.failed.emit(str(ex), ''.join(traceback.format_exception(type(ex), ex, ex.__traceback__)))
+
 
 class RefreshDatabaseDialog(QDialog):
-	def __init__(self, parent=None, **props):
+	def __init__(self, parent=None, file_name=REGISTRY_DB_NAME, **props):
 		super().__init__(parent, windowTitle="Обновление данных", **props)
 
-		self.setLayout(self._createMainForm(self))
+		self._file_name = file_name
+		self._task = None
+		self._delta = None
+		self._cache = None
+		self.setLayout(self._createMainForm())
 
-	@classmethod
-	def _createMainForm(cls, receiver: QDialog):
+	def _createMainForm(self):
 		layout = QGridLayout()
 
 		editLogin = QLineEdit()
@@ -26,17 +96,92 @@ class RefreshDatabaseDialog(QDialog):
 		layout.addWidget(label, 1, 0)
 		layout.addWidget(editPassword, 1, 1)
 
-		progressBar = QProgressBar(minimum=0, maximum=0, textVisible=False)
-		progressBar.setToolTip("Идёт обновление")
+		progressBar = QProgressBar(minimum=0, maximum=1, value=0, textVisible=False)
 		layout.addWidget(progressBar, 2, 0, 1, 2)
 
+		statusLabel = QLabel()
+		layout.addWidget(statusLabel, 3, 0, 1, 2)
+
 		buttonBox = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
-		buttonBox.accepted.connect(receiver.accept)
-		buttonBox.rejected.connect(receiver.reject)
-		layout.addWidget(buttonBox, 3, 0, 1, 2)
+		buttonBox.accepted.connect(self._startRefresh)
+		buttonBox.rejected.connect(self.reject)
+		layout.addWidget(buttonBox, 4, 0, 1, 2)
 
+		self._editLogin = editLogin
+		self._editPassword = editPassword
+		self._progressBar = progressBar
+		self._statusLabel = statusLabel
+		self._buttonBox = buttonBox
 		return layout
 
+	def delta(self) -> Optional[RegistryDelta]:
+		return self._delta
+
+	def _setRunning(self, running):
+		self._editLogin.setEnabled(not running)
+		self._editPassword.setEnabled(not running)
+		self._buttonBox.button(QDialogButtonBox.Ok).setEnabled(not running)
+
+	# Pages fetched recently are read from disk rather than from the registry
+	def _responseCache(self) -> ResponseCache:
+		if self._cache is None:
+			self._cache = ResponseCache.forApplication('registry')
+		return self._cache
+
+	@pyqtSlot()
+	def _startRefresh(self):
+		login = self._editLogin.text()
+		auth = (login, self._editPassword.text()) if login else None
+		sync = RegistrySync(f'{self._file_name}.parts', auth=auth, cache=self._responseCache())
+		task = RegistrySyncTask(sync, self._file_name)
+		task.signals.progress.connect(self._onProgress)
+		task.signals.finished.connect(self._onFinished)
+		task.signals.failed.connect(self._onFailed)
+
+		self._setRunning(True)
+		self._progressBar.setRange(0, 0)
+		self._progressBar.setToolTip("Идёт обновление")
+		self._statusLabel.setText("Подключение к реестру...")
+		self._task = task
+		task.start()
+
+	@pyqtSlot(int, int)
+	def _onProgress(self, done, total):
+		self._progressBar.setRange(0, max(total, 1))
+		self._progressBar.setValue(done)
+		if done < total:
+			self._statusLabel.setText(f"Загружено {done} из {total}")
+		else:
+			self._statusLabel.setText("Сохранение изменений...")
+
+	@pyqtSlot(object)
+	def _onFinished(self, delta):
+		self._task = None
+		self._delta = delta
+		self.accept()
+
+	@pyqtSlot(str, str)
+	def _onFailed(self, message, details):
+		self._task = None
+		self._setRunning(False)
+		self._progressBar.setRange(0, 1)
+		self._progressBar.setValue(0)
+		self._statusLabel.setText(f"Ошибка обновления: {message}")
+		self._statusLabel.setToolTip(details)
+
+	def done(self, result):
+		cache, self._cache = self._cache, None
+		# Whatever was downloaded so far stays in the spool and is resumed next time
+		if self._task is not None:
+			self._task.cancel()
+			if cache is not None:
+				# Left to the task, which may still be reading it
+				self._task.closeWhenDone(cache)
+			self._task = None
+		elif cache is not None:
+			cache.close()
+		super().done(result)
+
 if __name__ == '__main__':
 	app = QApplication(sys.argv)
 	wnd = RefreshDatabaseDialog()
@@ -0,0 +1,105 @@
+import re
+from typing import Dict, FrozenSet, Optional
+
+from hw_config_model import ComponentCategory
+
+__all__ = ['CLASSIFIER_VERSION', 'classify_name', 'classify_product']
+
+
+# Stored along with the classified registry; bump it whenever the rules below or
+# `compatibility.product_features` change, so the next start reclassifies every product
+CLASSIFIER_VERSION = 2
+
+_SYSTEM_UNIT = frozenset((ComponentCategory.SYSTEM_UNIT,))
+_MONITOR = frozenset((ComponentCategory.MONITOR,))
+_KEYBOARD = frozenset((ComponentCategory.KEYBOARD,))
+_MOUSE = frozenset((ComponentCategory.MOUSE,))
+_INPUT_DEVICE = _KEYBOARD | _MOUSE
+_NOTHING = frozenset()
+
+# Code prefix -> categories the product may belong to; the longest listed prefix of a code wins.
+# A code without any listed prefix rules the product out.
+_OKPD2_RULES = {
+	'26.20.13': _SYSTEM_UNIT,   # ЭВМ с процессором и устройствами ввода-вывода в одном корпусе (моноблоки)
+	'26.20.15': _SYSTEM_UNIT,   # ЭВМ цифровые прочие (системные блоки)
+	'26.20.16': _INPUT_DEVICE,  # Устройства ввода/вывода
+	'26.20.16.110': _KEYBOARD,
+	'26.20.16.120': _MOUSE,
+	'26.20.16.190': _NOTHING,
+	'26.20.17': _MONITOR,       # Мониторы и проекторы
+	'26.20.17.120': _NOTHING,   # Проекторы
+}
+
+_TNVED_RULES = {
+	'847141': _SYSTEM_UNIT,
+	'847150': _SYSTEM_UNIT,
+	'847160': _INPUT_DEVICE,
+	'8471607': _KEYBOARD,
+	'8471608': _MOUSE,
+	'852842': _MONITOR,
+	'852852': _MONITOR,
+	'852859': _MONITOR,
+}
+
+_NAME_RULES = {
+	ComponentCategory.SYSTEM_UNIT: ('системный блок', 'моноблок', 'персональный компьютер', 'рабочая станция'),
+	ComponentCategory.MONITOR:     ('монитор',),
+	ComponentCategory.KEYBOARD:    ('клавиатура',),
+	ComponentCategory.MOUSE:       ('мышь', 'манипулятор'),
+}
+
+# All keywords in one alternation, a named group per category. The leftmost match wins, so
+# "Системный блок ... с клавиатурой" stays a system unit.
+_NAME_PATTERN = re.compile('|'.join(
+	f'(?P<{category}>' + '|'.join(re.escape(keyword).replace('\\ ', '\\s+') for keyword in keywords) + ')'
+	for category, keywords in _NAME_RULES.items()
+), re.IGNORECASE)
+
+
+def _prefix_lookup(rules: Dict[str, FrozenSet[str]]):
+	lengths = sorted({len(prefix) for prefix in rules}, reverse=True)
+
+	def lookup(code) -> Optional[FrozenSet[str]]:
+		if not code:
+			return None
+		for length in lengths:
+			categories = rules.get(code[:length])
+			if categories is not None:
+				return categories
+		return _NOTHING
+
+	return lookup
+
+
+_okpd2_categories = _prefix_lookup(_OKPD2_RULES)
+_tnved_categories = _prefix_lookup(_TNVED_RULES)
+
+
+def classify_name(name: str) -> Optional[ComponentCategory]:
+	match = _NAME_PATTERN.search(name or '')
+	return ComponentCategory(match.lastgroup) if match else None
+
+
+# Category of a registry record, or `None` if it is none of the selectable components.
+# The codes narrow the choice down; the name settles it when they leave more than one
+# or contradict each other (then it has to agree with one of them).
+def classify_product(record: dict) -> Optional[ComponentCategory]:
+	candidates = None
+	conflict = False
+	for categories in (_okpd2_categories(record.get('product_okpd2')),
+			_tnved_categories((record.get('product_tnved') or '').replace(' ', ''))):
+		if categories is None:
+			continue
+		if candidates is None:
+			candidates = categories
+		elif candidates & categories:
+			candidates &= categories
+		else:
+			candidates |= categories
+			conflict = True
+	if candidates is not None and len(candidates) <= 1 and not conflict:
+		return next(iter(candidates), None)
+	category = classify_name(record.get('product_name'))
+	if candidates is None or category in candidates:
+		return category
+	return None
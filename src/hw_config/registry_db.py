@@ -0,0 +1,314 @@
+import io
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import CancelledError
+from contextlib import contextmanager
+from itertools import islice
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from compatibility import product_features
+from registry_classify import CLASSIFIER_VERSION, classify_product
+from hw_config_model import Product
+from registry_delta import REGISTRY_KEY, RegistryDelta, record_fingerprint
+from registry_index import NORMALIZER_VERSION, normalize_text
+from registry_json import iter_goods_items
+
+__all__ = ['REGISTRY_DB_NAME', 'RegistryDatabase']
+
+
+REGISTRY_DB_NAME = 'goods.db'
+
+_SCHEMA = '''
+	CREATE TABLE IF NOT EXISTS meta (
+		key TEXT PRIMARY KEY,
+		value TEXT
+	);
+	CREATE TABLE IF NOT EXISTS product (
+		id INTEGER PRIMARY KEY,
+		reg_number TEXT NOT NULL UNIQUE,
+		name TEXT NOT NULL DEFAULT '',
+		fingerprint INTEGER NOT NULL,
+		record TEXT NOT NULL,
+		-- `ComponentCategory` value set by `registry_classify`, NULL for anything else
+		category TEXT,
+		-- `compatibility.Feature` flags, set along with the category
+		features INTEGER NOT NULL DEFAULT 0
+	);
+	CREATE INDEX IF NOT EXISTS product_category ON product (category, name);
+	-- Holds normalised copies of the searchable columns; rowid is `product.id`
+	CREATE VIRTUAL TABLE IF NOT EXISTS product_fts USING fts5(name, reg_number, tokenize='trigram');
+'''
+
+# SQLite's default limit on host parameters per statement
+_MAX_VARIABLES = 999
+
+
+def _batched(iterable, size):
+	iterator = iter(iterable)
+	while batch := list(islice(iterator, size)):
+		yield batch
+
+
+def _record_features(record: dict) -> int:
+	return product_features(record.get('product_name'), record.get('product_spec'))
+
+
+def _like_pattern(text):
+	return '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+
+# Local registry store. One instance per thread: the GUI reads through its own connection
+# while refreshes and imports write through theirs (WAL keeps readers unblocked).
+class RegistryDatabase:
+
+	def __init__(self, file_name=REGISTRY_DB_NAME):
+		self._file_name = file_name
+		self._db = sqlite3.connect(file_name, isolation_level=None)
+		self._db.execute('PRAGMA journal_mode=WAL')
+		self._db.execute('PRAGMA synchronous=NORMAL')
+		self._migrate()
+		self._db.executescript(_SCHEMA)
+
+	def _migrate(self):
+		columns = {name for _, name, *_ in self._db.execute('PRAGMA table_info(product)')}
+		if columns and 'category' not in columns:
+			# Filled in by `classifyProducts`, as the classifier version is not stored yet either
+			self._db.execute('ALTER TABLE product ADD COLUMN category TEXT')
+		if columns and 'features' not in columns:
+			# Filled in by `classifyProducts` too: the classifier version that sets it is newer
+			self._db.execute('ALTER TABLE product ADD COLUMN features INTEGER NOT NULL DEFAULT 0')
+
+	def fileName(self):
+		return self._file_name
+
+	def close(self):
+		self._db.close()
+
+	# Makes the statement running on another thread fail with `sqlite3.OperationalError`
+	def interrupt(self):
+		self._db.interrupt()
+
+	@contextmanager
+	def _transaction(self):
+		self._db.execute('BEGIN IMMEDIATE')
+		try:
+			yield self._db
+		except BaseException:
+			self._db.execute('ROLLBACK')
+			raise
+		else:
+			self._db.execute('COMMIT')
+
+	def meta(self, key, default=None):
+		row = self._db.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+		return row[0] if row else default
+
+	def setMeta(self, key, value):
+		self._db.execute('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', (key, value))
+
+	def isComplete(self):
+		return self.meta('complete') == '1'
+
+	# Bumped by every refresh or import that changed anything; snapshots record the one they were made of
+	def generation(self):
+		return int(self.meta('generation', 0))
+
+	def _bumpGeneration(self):
+		self.setMeta('generation', str(self.generation() + 1))
+
+	def isClassified(self):
+		return self.meta('classifier') == str(CLASSIFIER_VERSION)
+
+	# Reclassifies every stored product; only needed after the classifier rules have changed,
+	# refreshes classify the records they write
+	def classifyProducts(self, batch_size=1000):
+		db = self._db
+		with self._transaction():
+			changed = 0
+			last_id = 0
+			while True:
+				rows = db.execute(
+					'SELECT id, category, features, record FROM product WHERE id > ? ORDER BY id LIMIT ?',
+					(last_id, batch_size)).fetchall()
+				if not rows:
+					break
+				last_id = rows[-1][0]
+				updates = list()
+				for id_, category, features, record in rows:
+					record = json.loads(record)
+					new_category = classify_product(record)
+					new_features = _record_features(record)
+					if new_category != category or new_features != features:
+						updates.append((new_category, new_features, id_))
+				db.executemany('UPDATE product SET category = ?, features = ? WHERE id = ?', updates)
+				changed += len(updates)
+			if changed:
+				self._bumpGeneration()
+			self.setMeta('classifier', str(CLASSIFIER_VERSION))
+		return changed
+
+	def isNormalized(self):
+		return self.meta('normalizer') == str(NORMALIZER_VERSION)
+
+	# Rewrites the normalised search copies of every stored product; only needed after
+	# `normalize_text` has changed, refreshes normalise the records they write
+	def normalizeProducts(self, batch_size=1000):
+		db = self._db
+		with self._transaction():
+			last_id = 0
+			while True:
+				rows = db.execute('SELECT id, reg_number, name FROM product WHERE id > ? ORDER BY id LIMIT ?',
+					(last_id, batch_size)).fetchall()
+				if not rows:
+					break
+				last_id = rows[-1][0]
+				db.executemany('UPDATE product_fts SET name = ?, reg_number = ? WHERE rowid = ?',
+					((normalize_text(name), normalize_text(reg_number), id_) for id_, reg_number, name in rows))
+			self.setMeta('normalizer', str(NORMALIZER_VERSION))
+
+	def category(self, reg_number) -> Optional[str]:
+		row = self._db.execute('SELECT category FROM product WHERE reg_number = ?', (reg_number,)).fetchone()
+		return row[0] if row else None
+
+	def product(self, reg_number) -> Optional[Product]:
+		row = self._db.execute('SELECT category, record FROM product WHERE reg_number = ?', (reg_number,)).fetchone()
+		return Product.fromRecord(json.loads(row[1]), row[0]) if row else None
+
+	def productCount(self):
+		return self._db.execute('SELECT count(*) FROM product').fetchone()[0]
+
+	def search(self, query: str, offset: int, limit: int) -> List[Tuple[str, str]]:
+		text = normalize_text(query)
+		if not text:
+			sql = 'SELECT reg_number, name FROM product ORDER BY id LIMIT ? OFFSET ?'
+			return self._db.execute(sql, (limit, offset)).fetchall()
+		if len(text) >= 3:
+			where, args = 'product_fts MATCH ?', ('"' + text.replace('"', '""') + '"',)
+		else:
+			# Too short for a trigram; the FTS copies are normalised, so a plain scan is still exact
+			pattern = _like_pattern(text)
+			where, args = "f.name LIKE ? ESCAPE '\\' OR f.reg_number LIKE ? ESCAPE '\\'", (pattern, pattern)
+		sql = f'''
+			SELECT p.reg_number, p.name FROM product_fts f JOIN product p ON p.id = f.rowid
+			WHERE {where} ORDER BY f.rowid LIMIT ? OFFSET ?
+		'''
+		return self._db.execute(sql, (*args, limit, offset)).fetchall()
+
+	# Rows in `REGISTRY_COLUMNS` order
+	def iterRows(self) -> Iterable[Tuple[str, str]]:
+		return self._db.execute('SELECT reg_number, name FROM product ORDER BY id')
+
+	# `(category, reg_number, name, features)` of the classified products, by category and then by name
+	def iterCategorised(self) -> Iterable[Tuple[str, str, str, int]]:
+		return self._db.execute('''
+			SELECT category, reg_number, name, features FROM product
+			WHERE category IS NOT NULL ORDER BY category, name
+		''')
+
+	def _upsert(self, db, records: List[dict], delta: dict):
+		keys = [record[REGISTRY_KEY] for record in records]
+		known = dict()
+		for chunk in _batched(keys, _MAX_VARIABLES):
+			sql = 'SELECT reg_number, id, fingerprint FROM product WHERE reg_number IN ({})'.format(
+				','.join('?' * len(chunk)))
+			known.update((key, (id_, fingerprint)) for key, id_, fingerprint in db.execute(sql, chunk))
+
+		for record, key in zip(records, keys):
+			fingerprint = record_fingerprint(record)
+			name = record.get('product_name') or ''
+			category = classify_product(record)
+			features = _record_features(record)
+			text = json.dumps(record, ensure_ascii=False)
+			fts_row = (normalize_text(name), normalize_text(key))
+			if key not in known:
+				cursor = db.execute(
+					'INSERT INTO product (reg_number, name, fingerprint, record, category, features) '
+					'VALUES (?, ?, ?, ?, ?, ?)',
+					(key, name, fingerprint, text, category, features))
+				db.execute('INSERT INTO product_fts (rowid, name, reg_number) VALUES (?, ?, ?)',
+					(cursor.lastrowid, *fts_row))
+				known[key] = (cursor.lastrowid, fingerprint)
+				delta['inserted'] += 1
+			elif known[key][1] != fingerprint:
+				id_ = known[key][0]
+				db.execute(
+					'UPDATE product SET name = ?, fingerprint = ?, record = ?, category = ?, features = ? WHERE id = ?',
+					(name, fingerprint, text, category, features, id_))
+				db.execute('UPDATE product_fts SET name = ?, reg_number = ? WHERE rowid = ?', (*fts_row, id_))
+				known[key] = (id_, fingerprint)
+				delta['updated'] += 1
+
+		db.executemany('INSERT OR IGNORE INTO temp.seen (reg_number) VALUES (?)', ((key,) for key in keys))
+
+	# Makes the store hold exactly `records`, writing only what differs from the stored fingerprints.
+	# With `commit_every`, every so many records are committed on their own, so readers see the rows
+	# arrive; otherwise the whole refresh is one transaction.
+	# Stored records missing from `records` are removed only with `remove_unseen`, and only if at least
+	# `expected_count` distinct ones came: a truncated or empty download must not empty the store.
+	def applyRecords(self, records: Iterable[dict], batch_size=1000, commit_every=None,
+			progress: Optional[Callable[[int], None]] = None, cancelled: threading.Event = None,
+			remove_unseen=True, expected_count: Optional[int] = None) -> RegistryDelta:
+		delta = dict(inserted=0, updated=0, removed=0)
+		db = self._db
+		db.execute('CREATE TEMP TABLE IF NOT EXISTS seen (reg_number TEXT PRIMARY KEY)')
+		db.execute('DELETE FROM temp.seen')
+		records = (record for record in records if record.get(REGISTRY_KEY) is not None)
+		# Unchanged records are not rewritten below, so they would keep their stale categories and search copies
+		if not self.isClassified():
+			self.classifyProducts()
+		if not self.isNormalized():
+			self.normalizeProducts()
+
+		if commit_every is None:
+			with self._transaction():
+				self.setMeta('complete', '0')
+				done = 0
+				for batch in _batched(records, batch_size):
+					if cancelled is not None and cancelled.is_set():
+						raise CancelledError()
+					self._upsert(db, batch, delta)
+					done += len(batch)
+					if progress:
+						progress(done)
+				self._finishApply(db, delta, remove_unseen, expected_count)
+		else:
+			self.setMeta('complete', '0')
+			done = 0
+			for batch in _batched(records, commit_every):
+				if cancelled is not None and cancelled.is_set():
+					raise CancelledError()
+				with self._transaction():
+					for chunk in _batched(batch, batch_size):
+						self._upsert(db, chunk, delta)
+				done += len(batch)
+				if progress:
+					progress(done)
+			with self._transaction():
+				self._finishApply(db, delta, remove_unseen, expected_count)
+
+		return RegistryDelta(**delta)
+
+	def _finishApply(self, db, delta, remove_unseen, expected_count):
+		if remove_unseen:
+			seen_count, = db.execute('SELECT count(*) FROM temp.seen').fetchone()
+			if expected_count is None or 0 < expected_count <= seen_count:
+				self._removeUnseen(db, delta)
+		if any(delta.values()):
+			self._bumpGeneration()
+		self.setMeta('complete', '1')
+
+	def _removeUnseen(self, db, delta):
+		stale = [id_ for id_, in db.execute(
+			'SELECT id FROM product WHERE reg_number NOT IN (SELECT reg_number FROM temp.seen)')]
+		db.executemany('DELETE FROM product WHERE id = ?', ((id_,) for id_ in stale))
+		db.executemany('DELETE FROM product_fts WHERE rowid = ?', ((id_,) for id_ in stale))
+		delta['removed'] += len(stale)
+
+	# One-shot import of an existing goods.json dump
+	def importJson(self, file_name, **kwargs) -> RegistryDelta:
+		with io.open(file_name, 'rt', encoding='utf-8') as file:
+			delta = self.applyRecords(iter_goods_items(file), **kwargs)
+		self.setMeta('imported_from', os.path.abspath(file_name))
+		return delta
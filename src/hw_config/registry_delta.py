@@ -0,0 +1,23 @@
+import hashlib
+import json
+from typing import NamedTuple
+
+__all__ = ['REGISTRY_KEY', 'RegistryDelta', 'record_fingerprint']
+
+
+REGISTRY_KEY = 'product_reg_number'
+
+
+class RegistryDelta(NamedTuple):
+	inserted: int = 0
+	updated: int = 0
+	removed: int = 0
+
+	def __bool__(self):
+		return bool(self.inserted or self.updated or self.removed)
+
+
+# Signed, so it fits an SQLite INTEGER
+def record_fingerprint(record: dict) -> int:
+	text = json.dumps(record, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+	return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little', signed=True)
@@ -0,0 +1,270 @@
+import array
+import bisect
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from concurrent.futures import CancelledError
+from typing import Dict, Iterable, NamedTuple, Optional, Sequence, Tuple
+
+from registry_store import RegistryColumns, StringColumn
+
+__all__ = ['INDEXED_COLUMNS', 'NORMALIZER_VERSION', 'SearchResult', 'RankedResult', 'RegistryIndex', 'normalize_text']
+
+
+GRAM_SIZE = 3
+_VERIFY_THRESHOLD = 1024
+# For a limited search, a shortest posting list longer than this is not intersected: matches
+# are common enough that scanning the text from the top finds the first ones sooner
+_SCAN_THRESHOLD = 8192
+# Rows verified between checks for cancellation
+_CANCEL_CHECK_ROWS = 4096
+
+_EMPTY = array.array('I')
+
+INDEXED_COLUMNS = ('product_name', 'product_reg_number')
+
+
+class SearchResult(NamedTuple):
+	query: str
+	# Sorted row numbers; `None` stands for "every row"
+	rows: Optional[array.array]
+	# Number of indexed rows the query was run against
+	row_count: int = 0
+	# Candidates after the last row of `rows` still to be checked, for a search cut short by its
+	# `limit`; `RegistryIndex.searchMore` continues it. `None` once every match is in `rows`.
+	pending: Optional[Sequence[int]] = None
+
+
+class RankedResult(NamedTuple):
+	query: str
+	# Best matches first
+	rows: Tuple[int, ...]
+	# Share of the query's trigrams found in each row
+	scores: Tuple[float, ...]
+
+
+# Bumped whenever `normalize_text` changes, as indexes and stored copies made by another version mismatch
+NORMALIZER_VERSION = 2
+
+# Latin and Cyrillic letters that look alike (in either case), which registry names mix freely
+_LATIN_HOMOGLYPHS = 'abcehkmoptxy'
+_CYRILLIC_HOMOGLYPHS = 'авсенкмортху'
+_TO_LATIN = str.maketrans(_CYRILLIC_HOMOGLYPHS, _LATIN_HOMOGLYPHS)
+_TO_CYRILLIC = str.maketrans(_LATIN_HOMOGLYPHS, _CYRILLIC_HOMOGLYPHS)
+_TRANSLITERATION = str.maketrans({
+	'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh', 'з': 'z', 'и': 'i',
+	'й': 'i', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't',
+	'у': 'u', 'ф': 'f', 'х': 'h', 'ц': 'c', 'ч': 'ch', 'ш': 'sh', 'щ': 'sch', 'ъ': '', 'ы': 'y', 'ь': '',
+	'э': 'e', 'ю': 'yu', 'я': 'ya',
+})
+_WORD = re.compile(r'[^\W_]+')
+_CYRILLIC = re.compile('[а-яё]')
+
+
+def _fold_word(word):
+	cyrillic = len(_CYRILLIC.findall(word))
+	if cyrillic and cyrillic < len(word):
+		# A mixed word is taken for the script most of it is in, or for Latin if it has digits (a model number)
+		word = word.translate(_TO_CYRILLIC if word.isalpha() and cyrillic * 2 > len(word) else _TO_LATIN)
+	return word.translate(_TRANSLITERATION)
+
+
+# Case-folded Latin words separated by single spaces: look-alike letters of a mixed word are taken
+# from its main script, Cyrillic is transliterated, quotes and other punctuation become word breaks.
+# "OМ238I" with a Cyrillic "М", "om238i" and "«Сова»" vs "sova" all compare equal.
+def normalize_text(text):
+	text = text.casefold()
+	if text.isascii():
+		return ' '.join(_WORD.findall(text))
+	return ' '.join(map(_fold_word, _WORD.findall(text)))
+
+
+def _grams(text):
+	return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def _check_cancelled(cancelled):
+	if cancelled is not None and cancelled.is_set():
+		raise CancelledError()
+
+
+# Rows `start` to `stop` (exclusive) of a normalised column containing `pattern`, found by running it over
+# the UTF-8 heap of the column rather than decoding every row. Yields each row with the number of rows
+# from `start` it is past.
+def _scan_column(pattern, column, start, stop, cancelled):
+	offsets, heap = column.buffers()
+	first, position, end = start, offsets[start], offsets[stop]
+	while True:
+		match = pattern.search(heap, position, end)
+		if match is None:
+			return
+		_check_cancelled(cancelled)
+		row = bisect.bisect_right(offsets, match.start(), start, stop + 1) - 1
+		if match.end() > offsets[row + 1]:
+			# Runs into the next row, as the heap has no separators
+			position = match.start() + 1
+			continue
+		yield row, row + 1 - first
+		start = row + 1
+		position = offsets[start]
+
+
+# Trigram inverted index over the normalised searchable registry columns, which it keeps
+# alongside, with the number of distinct trigrams of every row for ranking.
+# Rows are only ever appended, so every posting list stays sorted.
+class RegistryIndex:
+
+	def __init__(self, store: RegistryColumns, fields: Sequence[str] = INDEXED_COLUMNS):
+		self._store = store
+		self._fields = tuple(fields)
+		self._columns = tuple(store.column(field) for field in fields)
+		self._normalized = tuple(StringColumn() for _ in fields)
+		self._gram_counts = array.array('H')
+		self._postings: Dict[str, array.array] = dict()
+		self._row_count = 0
+		self._lock = threading.Lock()
+
+	def __len__(self):
+		return self._row_count
+
+	def fields(self):
+		return self._fields
+
+	def postings(self) -> Dict[str, array.array]:
+		return self._postings
+
+	# Normalised copy of each indexed field, in `fields()` order
+	def normalizedColumns(self) -> Tuple[StringColumn, ...]:
+		return self._normalized
+
+	def gramCounts(self) -> array.array:
+		return self._gram_counts
+
+	def _posting(self, gram):
+		return self._postings.get(gram, _EMPTY)
+
+	def update(self):
+		with self._lock:
+			self._addRows(range(self._row_count, len(self._store)))
+
+	def _addRows(self, rows: Iterable[int]):
+		postings = self._postings
+		for row in rows:
+			grams = set()
+			for column, normalized in zip(self._columns, self._normalized):
+				text = normalize_text(column[row])
+				normalized.append(text)
+				grams |= _grams(text)
+			self._gram_counts.append(min(len(grams), 0xFFFF))
+			for gram in grams:
+				posting = postings.get(gram)
+				if posting is None:
+					postings[gram] = posting = array.array('I')
+				posting.append(row)
+			self._row_count = row + 1
+
+	# Matching candidates in order, each with the number of candidates up to and including it
+	def _matches(self, pattern, candidates, cancelled):
+		if isinstance(candidates, range):
+			# Every row: the heaps are scanned, as most rows would be checked in vain
+			columns = (_scan_column(pattern, column, candidates.start, candidates.stop, cancelled)
+				for column in self._normalized)
+			last = -1
+			for row, consumed in heapq.merge(*columns):
+				if row != last:
+					yield row, consumed
+					last = row
+			return
+		buffers = tuple(column.buffers() for column in self._normalized)
+		for consumed, row in enumerate(candidates, 1):
+			if consumed % _CANCEL_CHECK_ROWS == 0:
+				_check_cancelled(cancelled)
+			if any(pattern.search(heap, offsets[row], offsets[row + 1]) for offsets, heap in buffers):
+				yield row, consumed
+
+	# The first `limit` matches among sorted `candidates` (all of them for no limit) and the candidates left
+	def _verify(self, text, candidates, limit, cancelled):
+		pattern = re.compile(re.escape(text.encode('utf-8')))
+		rows = array.array('I')
+		for row, consumed in self._matches(pattern, candidates, cancelled):
+			rows.append(row)
+			if limit is not None and len(rows) >= limit:
+				return rows, candidates[consumed:] or None
+		return rows, None
+
+	# With a `limit`, stops checking candidates after that many matches and leaves the rest to `searchMore`,
+	# so a query matching most of the registry is answered as fast as a narrow one.
+	# Raises `CancelledError` soon after `cancelled` is set.
+	def search(self, query: str, previous: SearchResult = None, cancelled: threading.Event = None,
+			limit: int = None) -> SearchResult:
+		text = normalize_text(query)
+		with self._lock:
+			row_count = self._row_count
+			if not text:
+				return SearchResult(text, None, row_count)
+
+			# A refined query can only match a subset of what the previous one did
+			candidates = None
+			if previous is not None and previous.rows is not None and previous.pending is None \
+					and previous.query and previous.query in text and previous.row_count == row_count:
+				candidates = previous.rows
+
+			postings = sorted((self._posting(gram) for gram in _grams(text)), key=len)
+			if len(text) == GRAM_SIZE:
+				# The one trigram is the query itself
+				return SearchResult(text, array.array('I', postings[0]), row_count)
+			if postings and limit is not None and len(postings[0]) > _SCAN_THRESHOLD \
+					and (candidates is None or len(candidates) > _SCAN_THRESHOLD):
+				candidates = range(row_count)
+			elif postings and (candidates is None or len(postings[0]) < len(candidates)):
+				candidates = set(postings.pop(0))
+				# Intersect while that is cheaper than checking the survivors one by one
+				while postings and len(candidates) > _VERIFY_THRESHOLD:
+					_check_cancelled(cancelled)
+					candidates.intersection_update(postings.pop(0))
+			elif candidates is None:
+				candidates = range(row_count)
+
+			# A range or a previous result is in order already
+			if isinstance(candidates, set):
+				candidates = array.array('I', sorted(candidates))
+			rows, pending = self._verify(text, candidates, limit, cancelled)
+		return SearchResult(text, rows, row_count, pending)
+
+	# `result` with up to `limit` more matches checked (all of them for `None`)
+	def searchMore(self, result: SearchResult, limit: Optional[int], cancelled: threading.Event = None) -> SearchResult:
+		if result.pending is None:
+			return result
+		with self._lock:
+			rows, pending = self._verify(result.query, result.pending, limit, cancelled)
+		return result._replace(rows=result.rows + rows, pending=pending)
+
+	# Up to `limit` rows sharing most trigrams with `query`, so misspelt or partly typed words still
+	# find something. Rows having less than `min_share` of the query's trigrams are left out; among
+	# equals, rows with fewer trigrams of their own (closer to the query as a whole) come first.
+	# Trigram hits are counted over whole posting lists at once, and only the best `limit` are ordered.
+	def rank(self, query: str, limit=100, min_share=0.5, cancelled: threading.Event = None) -> RankedResult:
+		text = normalize_text(query)
+		grams = _grams(text)
+		if not grams:
+			# Too short to rank; the plain search is as good
+			rows = self.search(query, cancelled=cancelled, limit=limit).rows
+			rows = tuple(rows[:limit]) if rows is not None else tuple(range(min(limit, len(self))))
+			return RankedResult(text, rows, (1.0,) * len(rows))
+		with self._lock:
+			hits = Counter()
+			for gram in grams:
+				_check_cancelled(cancelled)
+				hits.update(self._posting(gram))
+			gram_counts = self._gram_counts
+			size = len(grams)
+			need = max(1, math.ceil(size * min_share))
+
+			def similarity(item):
+				row, shared = item
+				return shared, shared / (size + gram_counts[row] - shared)
+
+			best = heapq.nlargest(limit, (item for item in hits.items() if item[1] >= need), key=similarity)
+		return RankedResult(text, tuple(row for row, _ in best), tuple(shared / size for _, shared in best))
@@ -0,0 +1,125 @@
+import io
+import json
+from typing import Iterator, Optional, Sequence, TextIO
+
+from registry_store import REGISTRY_COLUMNS, RegistryColumns
+
+__all__ = ['iter_json_items', 'iter_goods_items', 'load_goods_columns']
+
+
+_WHITESPACE = ' \t\n\r'
+# Characters that may continue a number past where it already parses ("1" of "1.25", "1." of "1e5")
+_NUMBER_CHARS = '0123456789+-.eE'
+
+
+# Pull-style reader of a JSON text that only ever keeps one value (plus a chunk of
+# look-ahead) in memory.
+class _JsonStream:
+	def __init__(self, file: TextIO, chunk_size=1 << 16):
+		self._file = file
+		self._chunk_size = chunk_size
+		self._buffer = ''
+		self._pos = 0
+		self._eof = False
+		self._decoder = json.JSONDecoder()
+
+	def _fill(self, size=None):
+		if self._eof:
+			return False
+		chunk = self._file.read(size or self._chunk_size)
+		if not chunk:
+			self._eof = True
+			return False
+		self._buffer = self._buffer[self._pos:] + chunk
+		self._pos = 0
+		return True
+
+	def _error(self, message):
+		return json.JSONDecodeError(message, self._buffer, self._pos)
+
+	def peek(self) -> str:
+		while True:
+			buffer, pos = self._buffer, self._pos
+			while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+				pos += 1
+			self._pos = pos
+			if pos < len(buffer):
+				return buffer[pos]
+			if not self._fill():
+				return ''
+
+	def next(self, expected: str) -> str:
+		char = self.peek()
+		if not char or char not in expected:
+			raise self._error(f"Expecting one of {expected!r}")
+		self._pos += 1
+		return char
+
+	def value(self):
+		self.peek()
+		size = self._chunk_size
+		while True:
+			try:
+				value, end = self._decoder.raw_decode(self._buffer, self._pos)
+			except json.JSONDecodeError:
+				if not self._fill(size):
+					raise
+			else:
+				# A number cut by the chunk boundary still parses; it is complete only once something
+				# other than its own characters follows
+				if end < len(self._buffer) and self._buffer[end] not in _NUMBER_CHARS or not self._fill(size):
+					self._pos = end
+					return value
+			size *= 2
+
+
+# Top-level values of a file holding any number of them, e.g. JSON Lines or a single document;
+# a top-level array yields its items one at a time
+def iter_json_items(file: TextIO) -> Iterator:
+	stream = _JsonStream(file)
+	while True:
+		char = stream.peek()
+		if not char:
+			return
+		if char != '[':
+			yield stream.value()
+			continue
+		stream.next('[')
+		if stream.peek() == ']':
+			stream.next(']')
+			continue
+		while True:
+			yield stream.value()
+			if stream.next(',]') == ']':
+				break
+
+
+def iter_goods_items(file: TextIO, fields: Optional[Sequence[str]] = None, key='items') -> Iterator:
+	stream = _JsonStream(file)
+	stream.next('{')
+	if stream.peek() == '}':
+		return
+	while True:
+		name = stream.value()
+		stream.next(':')
+		if name != key:
+			stream.value()
+		else:
+			stream.next('[')
+			if stream.peek() == ']':
+				stream.next(']')
+			else:
+				while True:
+					record = stream.value()
+					yield record if fields is None else tuple(record.get(field) for field in fields)
+					if stream.next(',]') == ']':
+						break
+		if stream.next(',}') == '}':
+			return
+
+
+def load_goods_columns(file_name, fields: Sequence[str] = REGISTRY_COLUMNS) -> RegistryColumns:
+	store = RegistryColumns(fields)
+	with io.open(file_name, 'rt', encoding='utf-8') as file:
+		store.extend(iter_goods_items(file, fields))
+	return store
@@ -0,0 +1,63 @@
+import threading
+import traceback
+from concurrent.futures import CancelledError
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from registry_db import RegistryDatabase
+from registry_snapshot import write_snapshot
+
+__all__ = ['RegistryImportTask']
+
+
+class RegistryImportSignals(QObject):
+	# Number of records imported and committed so far
+	rowsLoaded = pyqtSignal(int)
+	finished = pyqtSignal()
+	failed = pyqtSignal(str, str)
+
+
+# One-shot import of a goods.json dump into the local store on a pool thread, followed by
+# a fresh snapshot of the store (without a dump, only the snapshot is rebuilt).
+# Records are committed in batches, so readers on other connections see them arrive.
+class RegistryImportTask(QRunnable):
+	batch_size = 4096
+
+	def __init__(self, file_name, db_file_name, snapshot_file_name):
+		super().__init__()
+		self._file_name = file_name
+		self._db_file_name = db_file_name
+		self._snapshot_file_name = snapshot_file_name
+		self._cancelled = threading.Event()
+		self.signals = RegistryImportSignals()
+
+	def start(self, pool: QThreadPool = None):
+		(pool or QThreadPool.globalInstance()).start(self)
+
+	def cancel(self):
+		self._cancelled.set()
+
+	def isCancelled(self):
+		return self._cancelled.is_set()
+
+	def run(self):
+		signals = self.signals
+		try:
+			database = RegistryDatabase(self._db_file_name)
+			try:
+				if self._file_name:
+					database.importJson(self._file_name, commit_every=self.batch_size,
+						progress=signals.rowsLoaded.emit, cancelled=self._cancelled)
+				if self._cancelled.is_set():
+					return
+				if not database.isNormalized():
+					database.normalizeProducts()
+				write_snapshot(self._snapshot_file_name, database.iterRows(), generation=database.generation())
+			finally:
+				database.close()
+			signals.finished.emit()
+		except CancelledError:
+			pass
+		except Exception as ex:
+			if not self._cancelled.is_set():
+				signals.failed.emit(str(ex), ''.join(traceback.format_exception(type(ex), ex, ex.__traceback__)))
@@ -0,0 +1,196 @@
+from typing import Optional, Sequence
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QThreadPool, QVariant, pyqtSignal, pyqtSlot
+
+from registry_index import RegistryIndex, SearchResult
+from registry_search import RegistryDatabaseSearchTask
+from registry_store import RegistryColumns
+
+__all__ = ['RegistryTableModel', 'RegistrySqlTableModel']
+
+
+# Shows the rows of a column store, or only those listed in a sorted array of matches
+# (as produced by `RegistryIndex.search`). Rows are revealed a batch at a time as the view scrolls;
+# for a filter, batches are counted in matches, so a narrow one does not leave the view empty.
+# A search result cut short by its limit is continued as the view scrolls past its last match.
+class RegistryTableModel(QAbstractTableModel):
+	fetch_batch_size = 256
+
+	def __init__(self, store: RegistryColumns, headers: Sequence[str] = None, parent=None):
+		super().__init__(parent)
+		self._store = store
+		self._headers = tuple(headers or store.fields())
+		self._rows: Optional[Sequence[int]] = None
+		self._fetched = 0
+		self._index: Optional[RegistryIndex] = None
+		self._result: Optional[SearchResult] = None
+
+	def store(self) -> RegistryColumns:
+		return self._store
+
+	def rows(self) -> Optional[Sequence[int]]:
+		return self._rows
+
+	# Swaps in a new set of matching rows (`None` for every row) in one reset,
+	# then reveals the first batch of them
+	def setRows(self, rows: Optional[Sequence[int]]):
+		self._setRows(rows, None, None)
+
+	# Like `setRows`, for a result of `index.search`, the unchecked rest of which is searched for more
+	# matches a batch at a time
+	def setSearchResult(self, result: SearchResult, index: RegistryIndex):
+		self._setRows(result.rows, index, result if result.pending is not None else None)
+
+	def _setRows(self, rows, index, result):
+		self.beginResetModel()
+		self._rows = rows
+		self._index = index
+		self._result = result
+		self._fetched = 0
+		self.endResetModel()
+		self.fetchMore()
+
+	def _total(self):
+		return len(self._store) if self._rows is None else len(self._rows)
+
+	def _storeRow(self, row):
+		return row if self._rows is None else self._rows[row]
+
+	def rowCount(self, parent=QModelIndex()):
+		return 0 if parent.isValid() else self._fetched
+
+	def columnCount(self, parent=QModelIndex()):
+		return 0 if parent.isValid() else len(self._headers)
+
+	def data(self, index: QModelIndex, role=Qt.DisplayRole):
+		if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+			return QVariant()
+		return self._store.cell(self._storeRow(index.row()), index.column())
+
+	def headerData(self, section, orientation, role=Qt.DisplayRole):
+		if role != Qt.DisplayRole:
+			return QVariant()
+		if orientation == Qt.Horizontal:
+			return self._headers[section]
+		return self._storeRow(section) + 1
+
+	def canFetchMore(self, parent=QModelIndex()):
+		return not parent.isValid() and (self._fetched < self._total() or self._result is not None)
+
+	def fetchMore(self, parent=QModelIndex()):
+		if parent.isValid():
+			return
+		self.fetchUpTo(self._fetched + self.fetch_batch_size)
+
+	def fetchUpTo(self, row_count):
+		if self._result is not None and row_count > len(self._rows):
+			self._result = self._index.searchMore(self._result, row_count - len(self._rows))
+			self._rows = self._result.rows
+			if self._result.pending is None:
+				self._result = None
+		count = min(row_count, self._total()) - self._fetched
+		if count <= 0:
+			return
+		self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+		self._fetched += count
+		self.endInsertRows()
+
+	def fetchAll(self):
+		if self._result is not None:
+			self._result = self._index.searchMore(self._result, None)
+			self._rows = self._result.rows
+			self._result = None
+		self.fetchUpTo(self._total())
+
+
+# Pages query results out of the local store with LIMIT/OFFSET as the view scrolls.
+# Pages are read on a pool thread; one is read at a time, and a new query drops the page being read.
+class RegistrySqlTableModel(QAbstractTableModel):
+	fetch_batch_size = 256
+
+	# Message and details of a page that could not be read
+	failed = pyqtSignal(str, str)
+
+	def __init__(self, database, headers: Sequence[str], pool: QThreadPool = None, parent=None):
+		super().__init__(parent)
+		self._database = database
+		self._headers = tuple(headers)
+		self._pool = pool
+		self._query = ''
+		self._rows = list()
+		self._exhausted = False
+		self._task: Optional[RegistryDatabaseSearchTask] = None
+
+	def query(self):
+		return self._query
+
+	def setQuery(self, query: str):
+		self.cancel()
+		self.beginResetModel()
+		self._query = query
+		self._rows = list()
+		self._exhausted = False
+		self.endResetModel()
+		self.fetchMore()
+
+	# Drops the page being read, if any
+	def cancel(self):
+		if self._task is not None:
+			self._task.cancel()
+			self._task = None
+
+	def refresh(self):
+		self.setQuery(self._query)
+
+	def rowCount(self, parent=QModelIndex()):
+		return 0 if parent.isValid() else len(self._rows)
+
+	def columnCount(self, parent=QModelIndex()):
+		return 0 if parent.isValid() else len(self._headers)
+
+	def data(self, index: QModelIndex, role=Qt.DisplayRole):
+		if not index.isValid() or role not in (Qt.DisplayRole, Qt.ToolTipRole):
+			return QVariant()
+		return self._rows[index.row()][index.column()]
+
+	def headerData(self, section, orientation, role=Qt.DisplayRole):
+		if role != Qt.DisplayRole:
+			return QVariant()
+		if orientation == Qt.Horizontal:
+			return self._headers[section]
+		return section + 1
+
+	def canFetchMore(self, parent=QModelIndex()):
+		return not parent.isValid() and not self._exhausted and self._task is None
+
+	def fetchMore(self, parent=QModelIndex()):
+		if parent.isValid() or self._exhausted or self._task is not None:
+			return
+		task = RegistryDatabaseSearchTask(self._database.fileName(), self._query, len(self._rows), self.fetch_batch_size)
+		task.signals.finished.connect(self._onPageRead)
+		task.signals.failed.connect(self._onPageFailed)
+		task.start(self._pool)
+		self._task = task
+
+	def _isCurrentTask(self):
+		return self._task is not None and self.sender() is self._task.signals
+
+	@pyqtSlot(object)
+	def _onPageRead(self, rows):
+		if not self._isCurrentTask():
+			return
+		self._task = None
+		self._exhausted = len(rows) < self.fetch_batch_size
+		if not rows:
+			return
+		self.beginInsertRows(QModelIndex(), len(self._rows), len(self._rows) + len(rows) - 1)
+		self._rows.extend(rows)
+		self.endInsertRows()
+
+	@pyqtSlot(str, str)
+	def _onPageFailed(self, message, details):
+		if not self._isCurrentTask():
+			return
+		self._task = None
+		self._exhausted = True
+		self.failed.emit(message, details)
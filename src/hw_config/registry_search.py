@@ -0,0 +1,113 @@
+import sqlite3
+import threading
+import traceback
+from concurrent.futures import CancelledError
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from registry_db import RegistryDatabase
+from registry_index import RegistryIndex, SearchResult
+
+__all__ = ['RegistrySearchTask', 'RegistryDatabaseSearchTask']
+
+
+class RegistrySearchSignals(QObject):
+	# The `SearchResult` (`RankedResult` for a ranked search, a list of rows for a database search);
+	# not emitted for a cancelled search
+	finished = pyqtSignal(object)
+	failed = pyqtSignal(str, str)
+
+
+# One query against a registry index on a pool thread. A newer query cancels it; the search
+# gives up within a few thousand rows after that and reports nothing.
+# A `ranked` search returns the `ranked_limit` closest rows rather than every row containing the query.
+# A plain one stops after `limit` matches, leaving the rest to `RegistryIndex.searchMore`.
+class RegistrySearchTask(QRunnable):
+	ranked_limit = 200
+
+	def __init__(self, index: RegistryIndex, query: str, previous: SearchResult = None, ranked=False, limit=None):
+		super().__init__()
+		self._index = index
+		self._query = query
+		self._previous = previous
+		self._ranked = ranked
+		self._limit = limit
+		self._cancelled = threading.Event()
+		self._done = threading.Event()
+		self._pool = None
+		self.signals = RegistrySearchSignals()
+
+	def start(self, pool: QThreadPool = None):
+		self._pool = pool or QThreadPool.globalInstance()
+		self._pool.start(self)
+
+	def query(self):
+		return self._query
+
+	def cancel(self):
+		self._cancelled.set()
+
+	def isCancelled(self):
+		return self._cancelled.is_set()
+
+	# Blocks until the task is no longer reading the index, e.g. before its snapshot is closed
+	def wait(self, timeout=None):
+		# One still queued is simply taken back
+		if self._pool is not None and self._pool.tryTake(self):
+			return True
+		return self._done.wait(timeout)
+
+	def run(self):
+		try:
+			if self._cancelled.is_set():
+				return
+			result = self._search()
+			if not self._cancelled.is_set():
+				self.signals.finished.emit(result)
+		except CancelledError:
+			pass
+		except Exception as ex:
+			if not self._cancelled.is_set():
+				self.signals.failed.emit(str(ex), ''.join(traceback.format_exception(type(ex), ex, ex.__traceback__)))
+		finally:
+			self._done.set()
+
+	def _search(self):
+		if self._ranked:
+			return self._index.rank(self._query, self.ranked_limit, cancelled=self._cancelled)
+		return self._index.search(self._query, self._previous, self._cancelled, self._limit)
+
+
+# A page of `RegistryDatabase.search` on a pool thread, read through a connection of its own,
+# for while there is no snapshot to search. Cancelling interrupts the statement running.
+class RegistryDatabaseSearchTask(RegistrySearchTask):
+
+	def __init__(self, db_file_name: str, query: str, offset: int, limit: int):
+		super().__init__(None, query, limit=limit)
+		self._db_file_name = db_file_name
+		self._offset = offset
+		self._database = None
+		self._database_lock = threading.Lock()
+
+	def cancel(self):
+		super().cancel()
+		with self._database_lock:
+			if self._database is not None:
+				self._database.interrupt()
+
+	def _search(self):
+		database = RegistryDatabase(self._db_file_name)
+		try:
+			with self._database_lock:
+				if self._cancelled.is_set():
+					raise CancelledError()
+				self._database = database
+			return database.search(self._query, self._offset, self._limit)
+		except sqlite3.OperationalError:
+			if self._cancelled.is_set():
+				raise CancelledError()
+			raise
+		finally:
+			with self._database_lock:
+				self._database = None
+			database.close()
@@ -0,0 +1,240 @@
+import array
+import io
+import json
+import mmap
+import os
+import sys
+from typing import Iterable, Mapping, Optional, Sequence
+
+from registry_index import INDEXED_COLUMNS, NORMALIZER_VERSION, RegistryIndex
+from registry_store import REGISTRY_COLUMNS, RegistryColumns
+
+__all__ = ['REGISTRY_SNAPSHOT_NAME', 'SnapshotError', 'RegistrySnapshot', 'write_snapshot']
+
+
+REGISTRY_SNAPSHOT_NAME = 'goods.snap'
+
+# Layout: magic, u32 header size, JSON header, then 8-byte aligned sections in native byte order.
+# Per column: `u64 offsets[rows + 1]` into a UTF-8 heap. The index: the normalised indexed columns
+# (laid out the same), `u16` trigram count per row, grams sorted by their UTF-8 bytes (`u64` offsets
+# + heap) and, for gram `i`, the rows `postings[post_offsets[i]:post_offsets[i + 1]]` as `u32`.
+# Named arrays, a number per row of the type the header gives, follow.
+_MAGIC = b'HWSNAP\x00\x01'
+_VERSION = 2
+_ALIGN = 8
+
+
+class SnapshotError(Exception):
+	pass
+
+
+def _padding(size):
+	return -size % _ALIGN
+
+
+# `arrays` are only read once `rows` are exhausted, so the generator of the rows may fill them
+def write_snapshot(file_name, rows: Iterable[Sequence[str]], fields: Sequence[str] = REGISTRY_COLUMNS,
+		generation=None, indexed: Sequence[str] = INDEXED_COLUMNS, arrays: Mapping[str, array.array] = None):
+	store = RegistryColumns(fields)
+	store.extend(rows)
+	arrays = dict(arrays or ())
+	for name, values in arrays.items():
+		if len(values) != len(store):
+			raise ValueError(f"{name}: {len(values)} values for {len(store)} rows")
+	index = RegistryIndex(store, indexed)
+	index.update()
+
+	sections = list()
+	for k, field in enumerate(fields):
+		offsets, heap = store.column(field).buffers()
+		sections.append((f'column.{k}.offsets', offsets))
+		sections.append((f'column.{k}.heap', heap))
+
+	for k, column in enumerate(index.normalizedColumns()):
+		offsets, heap = column.buffers()
+		sections.append((f'normalized.{k}.offsets', offsets))
+		sections.append((f'normalized.{k}.heap', heap))
+	sections.append(('gram_counts', index.gramCounts()))
+
+	postings = index.postings()
+	grams = sorted(gram.encode('utf-8') for gram in postings)
+	gram_offsets = array.array('Q', [0])
+	post_offsets = array.array('Q', [0])
+	for gram in grams:
+		gram_offsets.append(gram_offsets[-1] + len(gram))
+		post_offsets.append(post_offsets[-1] + len(postings[gram.decode('utf-8')]))
+	sections.append(('grams.offsets', gram_offsets))
+	sections.append(('grams.heap', b''.join(grams)))
+	sections.append(('postings.offsets', post_offsets))
+	sections.append(('postings', b''.join(postings[gram.decode('utf-8')].tobytes() for gram in grams)))
+	for name, values in arrays.items():
+		sections.append((f'array.{name}', values))
+
+	layout = dict()
+	position = 0
+	for name, data in sections:
+		size = len(memoryview(data).cast('B'))
+		layout[name] = [position, size]
+		position += size + _padding(size)
+	header = json.dumps(dict(
+		version=_VERSION,
+		normalizer=NORMALIZER_VERSION,
+		byteorder=sys.byteorder,
+		generation=generation,
+		rows=len(store),
+		fields=list(fields),
+		indexed=list(indexed),
+		arrays={name: values.typecode for name, values in arrays.items()},
+		sections=layout,
+	)).encode('utf-8')
+	header += b' ' * _padding(len(_MAGIC) + 4 + len(header))
+
+	temp_name = f'{file_name}.tmp'
+	with io.open(temp_name, 'wb') as file:
+		file.write(_MAGIC)
+		file.write(len(header).to_bytes(4, 'little'))
+		file.write(header)
+		for name, data in sections:
+			size = layout[name][1]
+			file.write(data)
+			file.write(b'\0' * _padding(size))
+		file.flush()
+		os.fsync(file.fileno())
+	os.replace(temp_name, file_name)
+
+
+class _MappedStringColumn:
+	__slots__ = ('_offsets', '_heap')
+
+	def __init__(self, offsets: memoryview, heap: memoryview):
+		self._offsets = offsets
+		self._heap = heap
+
+	def __len__(self):
+		return len(self._offsets) - 1
+
+	def __getitem__(self, row) -> str:
+		offsets = self._offsets
+		return str(self._heap[offsets[row]:offsets[row + 1]], 'utf-8')
+
+	def buffers(self):
+		return self._offsets, self._heap
+
+
+# The prebuilt index of a snapshot; posting lists are looked up by binary search over the gram table
+class _MappedRegistryIndex(RegistryIndex):
+
+	def __init__(self, snapshot, fields, normalized, gram_counts, gram_offsets, gram_heap, post_offsets, postings):
+		super().__init__(snapshot, fields)
+		self._normalized = normalized
+		self._gram_counts = gram_counts
+		self._gram_offsets = gram_offsets
+		self._gram_heap = gram_heap
+		self._post_offsets = post_offsets
+		self._postings_view = postings
+		self._row_count = len(snapshot)
+
+	def update(self):
+		pass
+
+	def _posting(self, gram):
+		key = gram.encode('utf-8')
+		offsets, heap = self._gram_offsets, self._gram_heap
+		low, high = 0, len(offsets) - 1
+		while low < high:
+			middle = (low + high) // 2
+			if bytes(heap[offsets[middle]:offsets[middle + 1]]) < key:
+				low = middle + 1
+			else:
+				high = middle
+		if low < len(offsets) - 1 and bytes(heap[offsets[low]:offsets[low + 1]]) == key:
+			return self._postings_view[self._post_offsets[low]:self._post_offsets[low + 1]]
+		return self._postings_view[0:0]
+
+
+# Read-only registry opened with `mmap`: nothing is decoded until a row is asked for.
+# Offers the `RegistryColumns` reading interface, so `RegistryTableModel` can show it directly.
+class RegistrySnapshot:
+
+	def __init__(self, file_name=REGISTRY_SNAPSHOT_NAME):
+		self._file = io.open(file_name, 'rb')
+		try:
+			self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+		except ValueError:
+			self._file.close()
+			raise SnapshotError(f"Пустой файл снимка: {file_name}")
+		try:
+			self._open()
+		except Exception:
+			self.close()
+			raise
+
+	def _open(self):
+		data = self._map
+		if data[:len(_MAGIC)] != _MAGIC:
+			raise SnapshotError("Неизвестный формат снимка реестра")
+		header_size = int.from_bytes(data[len(_MAGIC):len(_MAGIC) + 4], 'little')
+		base = len(_MAGIC) + 4 + header_size
+		header = json.loads(data[len(_MAGIC) + 4:base])
+		if header['version'] != _VERSION or header.get('normalizer') != NORMALIZER_VERSION \
+				or header['byteorder'] != sys.byteorder:
+			raise SnapshotError("Снимок реестра записан несовместимой версией")
+
+		self._view = memoryview(data)
+		self._views = list()
+
+		def section(name, fmt='B'):
+			offset, size = header['sections'][name]
+			view = self._view[base + offset:base + offset + size].cast(fmt)
+			self._views.append(view)
+			return view
+
+		self._header = header
+		self._fields = tuple(header['fields'])
+		self._row_count = header['rows']
+		self._columns = tuple(
+			_MappedStringColumn(section(f'column.{k}.offsets', 'Q'), section(f'column.{k}.heap'))
+			for k in range(len(self._fields))
+		)
+		normalized = tuple(
+			_MappedStringColumn(section(f'normalized.{k}.offsets', 'Q'), section(f'normalized.{k}.heap'))
+			for k in range(len(header['indexed']))
+		)
+		self._index = _MappedRegistryIndex(self, header['indexed'], normalized, section('gram_counts', 'H'),
+			section('grams.offsets', 'Q'), section('grams.heap'),
+			section('postings.offsets', 'Q'), section('postings', 'I'))
+		self._arrays = {name: section(f'array.{name}', typecode) for name, typecode in header.get('arrays', {}).items()}
+
+	def close(self):
+		for view in getattr(self, '_views', ()):
+			view.release()
+		if getattr(self, '_view', None) is not None:
+			self._view.release()
+			self._view = None
+		self._map.close()
+		self._file.close()
+
+	def generation(self):
+		return self._header.get('generation')
+
+	def index(self) -> RegistryIndex:
+		return self._index
+
+	def __len__(self):
+		return self._row_count
+
+	def fields(self):
+		return self._fields
+
+	def column(self, field) -> _MappedStringColumn:
+		return self._columns[self._fields.index(field)]
+
+	# A number per row, as written through `write_snapshot(arrays=...)`; `None` if there is no such array
+	def array(self, name) -> Optional[memoryview]:
+		return self._arrays.get(name)
+
+	def cell(self, row, column) -> str:
+		return self._columns[column][row]
+
+	def row(self, row):
+		return tuple(column[row] for column in self._columns)
@@ -0,0 +1,77 @@
+import array
+from typing import Iterable, Optional, Sequence
+
+__all__ = ['REGISTRY_FILE_NAME', 'REGISTRY_COLUMNS', 'StringColumn', 'RegistryColumns']
+
+
+REGISTRY_FILE_NAME = 'goods.json'
+
+REGISTRY_COLUMNS = (
+	'product_reg_number',
+	'product_name',
+)
+
+
+# Strings kept as one UTF-8 heap plus an offset table: a row costs its encoded bytes
+# and one offset instead of a Python object.
+class StringColumn:
+	__slots__ = ('_heap', '_offsets')
+
+	def __init__(self):
+		self._heap = bytearray()
+		self._offsets = array.array('Q', [0])
+
+	def __len__(self):
+		return len(self._offsets) - 1
+
+	def __getitem__(self, row) -> str:
+		offsets = self._offsets
+		return self._heap[offsets[row]:offsets[row + 1]].decode('utf-8')
+
+	def append(self, value: Optional[str]):
+		if value:
+			self._heap += str(value).encode('utf-8')
+		self._offsets.append(len(self._heap))
+
+	def nbytes(self):
+		return len(self._heap) + self._offsets.itemsize * len(self._offsets)
+
+	def buffers(self):
+		return self._offsets, self._heap
+
+
+# Compact column store of the projected registry fields.
+class RegistryColumns:
+
+	def __init__(self, fields: Sequence[str] = REGISTRY_COLUMNS):
+		self._fields = tuple(fields)
+		self._columns = tuple(StringColumn() for _ in self._fields)
+
+	def __len__(self):
+		return len(self._columns[0])
+
+	def fields(self):
+		return self._fields
+
+	def column(self, field) -> StringColumn:
+		return self._columns[self._fields.index(field)]
+
+	def cell(self, row, column) -> str:
+		return self._columns[column][row]
+
+	def row(self, row):
+		return tuple(column[row] for column in self._columns)
+
+	def append(self, values: Sequence[Optional[str]]):
+		for column, value in zip(self._columns, values):
+			column.append(value)
+
+	def extend(self, rows: Iterable[Sequence[Optional[str]]]):
+		for values in rows:
+			self.append(values)
+
+	def appendRecord(self, record: dict):
+		self.append([record.get(field) for field in self._fields])
+
+	def nbytes(self):
+		return sum(column.nbytes() for column in self._columns)
@@ -0,0 +1,249 @@
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, CancelledError
+from typing import Callable, Optional
+
+from registry_db import RegistryDatabase
+from registry_delta import RegistryDelta
+from response_cache import ResponseCache
+
+__all__ = ['REGISTRY_URL', 'RegistrySync', 'RegistrySyncError']
+
+
+REGISTRY_URL = 'https://gisp.gov.ru/pp719v2/pub/prod/rep/b/'
+
+
+class RegistrySyncError(Exception):
+	pass
+
+
+def _page_request(skip, take):
+	return {
+		'opt': {
+			'sort': None,
+			'requireTotalCount': True,
+			'searchOperation': "contains",
+			'searchValue': None,
+			'skip': skip,
+			'take': take,
+			'userData': {}
+		}
+	}
+
+
+def _total_count(page):
+	for key in ('total_count', 'totalCount'):
+		if page.get(key) is not None:
+			return int(page[key])
+	raise RegistrySyncError("В ответе реестра нет общего числа записей")
+
+
+def _write_atomic(file_name, write):
+	temp_name = f'{file_name}.tmp'
+	with io.open(temp_name, 'wt', encoding='utf-8') as file:
+		write(file)
+		file.flush()
+		os.fsync(file.fileno())
+	os.replace(temp_name, file_name)
+
+
+# Downloads the registry page by page into a spool directory.
+# Completed pages survive an interrupted run, so the next `run` only fetches the rest.
+# With a `cache`, a page fetched recently is read from disk; an older one is asked for conditionally
+# and, should the registry be out of reach, still used as it is. Pages are fetched by offset, so stale
+# ones may skip or repeat records: a download with any of them adds and updates, but removes nothing.
+class RegistrySync:
+
+	def __init__(self, spool_dir, url=REGISTRY_URL, page_size=1000, concurrency=4, retries=3, backoff=0.5,
+			timeout=60, auth=None, session=None, cache: ResponseCache = None):
+		self._spool_dir = spool_dir
+		self._url = url
+		self._page_size = page_size
+		self._concurrency = concurrency
+		self._retries = retries
+		self._backoff = backoff
+		self._timeout = timeout
+		self._auth = auth
+		self._session = session
+		self._cache = cache
+		self._cancelled = threading.Event()
+
+	def cancel(self):
+		self._cancelled.set()
+
+	def isCancelled(self):
+		return self._cancelled.is_set()
+
+	def _statePath(self):
+		return os.path.join(self._spool_dir, 'state.json')
+
+	def _pagePath(self, page_no):
+		return os.path.join(self._spool_dir, f'page-{page_no:06}.json')
+
+	def _loadState(self):
+		try:
+			with io.open(self._statePath(), 'rt', encoding='utf-8') as file:
+				state = json.load(file)
+		except (OSError, ValueError):
+			return None
+		if state.get('url') != self._url or state.get('page_size') != self._page_size:
+			return None
+		return state
+
+	def _saveState(self, total, done, stale):
+		state = dict(url=self._url, page_size=self._page_size, total=total, done=sorted(done), stale=sorted(stale))
+		_write_atomic(self._statePath(), lambda file: json.dump(state, file))
+
+	def _createSession(self):
+		import requests
+		from requests.adapters import HTTPAdapter
+		session = requests.Session()
+		adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._concurrency)
+		session.mount('http://', adapter)
+		session.mount('https://', adapter)
+		session.auth = self._auth
+		return session
+
+	# `(page, stale)`, `stale` if the page is an outdated copy from the cache
+	def _postPage(self, session, page_no):
+		request = _page_request(page_no * self._page_size, self._page_size)
+		if self._cache is None:
+			resp = session.post(self._url, json=request, timeout=self._timeout)
+			resp.raise_for_status()
+			return resp.json(), False
+		return self._postCached(session, json.dumps(request, sort_keys=True).encode('utf-8'))
+
+	def _postCached(self, session, body: bytes):
+		import requests
+		cache = self._cache
+		key = cache.key(self._url, body)
+		entry = cache.get(key)
+		if entry is not None and cache.isFresh(entry):
+			return self._readCached(entry), False
+		headers = {'Content-Type': 'application/json'}
+		if entry is not None:
+			if entry.etag:
+				headers['If-None-Match'] = entry.etag
+			if entry.last_modified:
+				headers['If-Modified-Since'] = entry.last_modified
+		try:
+			resp = session.post(self._url, data=body, headers=headers, timeout=self._timeout, stream=True)
+		except (requests.ConnectionError, requests.Timeout):
+			# Offline: a stale page beats none
+			if entry is not None:
+				return self._readCached(entry), True
+			raise
+		with resp:
+			if resp.status_code == 304 and entry is not None:
+				return self._readCached(cache.revalidated(entry)), False
+			resp.raise_for_status()
+			# Compressed into the cache as it arrives, then parsed from there
+			entry = cache.store(key, resp.iter_content(1 << 16), resp.headers.get('ETag'),
+				resp.headers.get('Last-Modified'))
+		try:
+			return self._readCached(entry), False
+		except ValueError:
+			cache.remove(key)
+			raise
+
+	def _readCached(self, entry):
+		with self._cache.open(entry) as file:
+			return json.load(file)
+
+	def _fetchPage(self, session, page_no):
+		import requests
+		delay = self._backoff
+		for attempt in range(self._retries + 1):
+			if self._cancelled.is_set():
+				raise CancelledError()
+			try:
+				return self._postPage(session, page_no)
+			except (requests.RequestException, ValueError) as ex:
+				if attempt == self._retries:
+					raise RegistrySyncError(f"Не удалось загрузить страницу {page_no}: {ex}") from ex
+			if self._cancelled.wait(delay):
+				raise CancelledError()
+			delay *= 2
+
+	def _storePage(self, page_no, page):
+		items = page.get('items') or []
+		_write_atomic(self._pagePath(page_no), lambda file: json.dump(items, file, ensure_ascii=False))
+		return len(items)
+
+	def pageCount(self, total):
+		return -(-total // self._page_size)
+
+	# `progress(done, total)` is called from the calling thread after every completed page
+	def run(self, progress: Optional[Callable[[int, int], None]] = None) -> int:
+		os.makedirs(self._spool_dir, exist_ok=True)
+		session = self._session or self._createSession()
+		state = self._loadState()
+		done = set(state['done']) if state else set()
+		stale = set(state.get('stale', ())) if state else set()
+		total = state['total'] if state else None
+		if total is None:
+			first, first_stale = self._fetchPage(session, 0)
+			total = _total_count(first)
+			self._storePage(0, first)
+			done = {0}
+			stale = {0} if first_stale else set()
+			self._saveState(total, done, stale)
+
+		page_count = self.pageCount(total)
+		fetched = sum(self._pageSize(total, page_no) for page_no in done)
+		if progress:
+			progress(fetched, total)
+
+		pending = [page_no for page_no in range(page_count) if page_no not in done]
+		with ThreadPoolExecutor(self._concurrency) as pool:
+			futures = {pool.submit(self._fetchPage, session, page_no): page_no for page_no in pending}
+			try:
+				for future in as_completed(futures):
+					page_no = futures[future]
+					page, page_stale = future.result()
+					self._storePage(page_no, page)
+					done.add(page_no)
+					if page_stale:
+						stale.add(page_no)
+					self._saveState(total, done, stale)
+					fetched += self._pageSize(total, page_no)
+					if progress:
+						progress(fetched, total)
+			except BaseException:
+				self._cancelled.set()
+				for future in futures:
+					future.cancel()
+				raise
+		return total
+
+	def _pageSize(self, total, page_no):
+		return min(self._page_size, total - page_no * self._page_size)
+
+	def iterItems(self):
+		state = self._loadState()
+		if state is None:
+			raise RegistrySyncError("Нет загруженных страниц реестра")
+		for page_no in range(self.pageCount(state['total'])):
+			with io.open(self._pagePath(page_no), 'rt', encoding='utf-8') as file:
+				yield from json.load(file)
+
+	# Brings the local store up to date with the spooled pages and drops the spool.
+	# Only added, changed and removed records are written; records are removed only when every page
+	# is current and they add up to the total the registry reported.
+	def applyTo(self, database: RegistryDatabase) -> RegistryDelta:
+		state = self._loadState()
+		if state is None:
+			raise RegistrySyncError("Нет загруженных страниц реестра")
+		delta = database.applyRecords(self.iterItems(), cancelled=self._cancelled,
+			remove_unseen=not state.get('stale'), expected_count=state['total'])
+		self.clear()
+		return delta
+
+	def clear(self):
+		if not os.path.isdir(self._spool_dir):
+			return
+		for name in os.listdir(self._spool_dir):
+			os.remove(os.path.join(self._spool_dir, name))
+		os.rmdir(self._spool_dir)
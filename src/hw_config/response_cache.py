@@ -0,0 +1,176 @@
+import gzip
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from typing import BinaryIO, Iterable, NamedTuple, Optional
+
+__all__ = ['ResponseCache', 'CacheEntry']
+
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+# Entries of either codec stay readable; new ones are written with zstd when it is available
+_CODEC = 'zstd' if zstandard is not None else 'gzip'
+
+_SCHEMA = '''
+	CREATE TABLE IF NOT EXISTS entry (
+		key TEXT PRIMARY KEY,
+		codec TEXT NOT NULL,
+		-- Compressed size on disk
+		size INTEGER NOT NULL,
+		etag TEXT,
+		last_modified TEXT,
+		-- When the response was fetched or last revalidated, and when it was last read (for LRU)
+		stored REAL NOT NULL,
+		used REAL NOT NULL
+	);
+	CREATE INDEX IF NOT EXISTS entry_used ON entry (used);
+'''
+
+
+class CacheEntry(NamedTuple):
+	key: str
+	codec: str
+	size: int
+	etag: Optional[str]
+	last_modified: Optional[str]
+	stored: float
+
+
+# Responses kept on disk, compressed, under a key made of the request (see `key`). An entry is fresh
+# for `ttl` seconds; after that it is revalidated with its `ETag`/`Last-Modified` or fetched again,
+# though it can still stand in while the server is out of reach. Once the entries take more than
+# `max_size` bytes, the least recently used go. Usable from several threads.
+class ResponseCache:
+	index_name = 'index.db'
+
+	def __init__(self, directory, ttl=12 * 3600, max_size=256 << 20):
+		self._directory = directory
+		self._ttl = ttl
+		self._max_size = max_size
+		os.makedirs(directory, exist_ok=True)
+		self._lock = threading.Lock()
+		self._db = sqlite3.connect(os.path.join(directory, self.index_name), isolation_level=None,
+			check_same_thread=False)
+		self._db.execute('PRAGMA journal_mode=WAL')
+		self._db.executescript(_SCHEMA)
+
+	# In the per-user cache directory
+	@classmethod
+	def forApplication(cls, name, **kwargs) -> 'ResponseCache':
+		from PyQt5.QtCore import QStandardPaths
+		directory = QStandardPaths.writableLocation(QStandardPaths.CacheLocation)
+		return cls(os.path.join(directory, name), **kwargs)
+
+	def directory(self):
+		return self._directory
+
+	def close(self):
+		with self._lock:
+			self._db.close()
+
+	@staticmethod
+	def key(url: str, body: bytes = b'') -> str:
+		return hashlib.sha256(url.encode('utf-8') + b'\0' + body).hexdigest()
+
+	def _path(self, key, codec):
+		return os.path.join(self._directory, f'{key}.{codec}')
+
+	def get(self, key) -> Optional[CacheEntry]:
+		with self._lock:
+			row = self._db.execute(
+				'SELECT key, codec, size, etag, last_modified, stored FROM entry WHERE key = ?', (key,)).fetchone()
+			if row is None:
+				return None
+			self._db.execute('UPDATE entry SET used = ? WHERE key = ?', (time.time(), key))
+		entry = CacheEntry(*row)
+		return entry if os.path.exists(self._path(key, entry.codec)) else None
+
+	def isFresh(self, entry: CacheEntry) -> bool:
+		return time.time() - entry.stored < self._ttl
+
+	# The decompressed response
+	def open(self, entry: CacheEntry) -> BinaryIO:
+		path = self._path(entry.key, entry.codec)
+		if entry.codec == 'gzip':
+			return gzip.open(path, 'rb')
+		if zstandard is None:
+			raise OSError(f"Для чтения {path} нужен модуль zstandard")
+		return zstandard.ZstdDecompressor().stream_reader(io.open(path, 'rb'), closefd=True)
+
+	# Compresses the response into the cache as its chunks arrive; replaces any entry of the key
+	def store(self, key, chunks: Iterable[bytes], etag: str = None, last_modified: str = None) -> CacheEntry:
+		path = self._path(key, _CODEC)
+		temp_name = f'{path}.{threading.get_ident()}.tmp'
+		try:
+			with io.open(temp_name, 'wb') as raw:
+				if _CODEC == 'gzip':
+					compressed = gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=5, mtime=0)
+				else:
+					compressed = zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=False)
+				with compressed:
+					for chunk in chunks:
+						compressed.write(chunk)
+			os.replace(temp_name, path)
+		except BaseException:
+			_remove_quietly(temp_name)
+			raise
+		now = time.time()
+		entry = CacheEntry(key, _CODEC, os.path.getsize(path), etag, last_modified, now)
+		with self._lock:
+			previous = self._db.execute('SELECT codec FROM entry WHERE key = ?', (key,)).fetchone()
+			self._db.execute('INSERT OR REPLACE INTO entry VALUES (?, ?, ?, ?, ?, ?, ?)', (*entry, now))
+		if previous is not None and previous[0] != _CODEC:
+			_remove_quietly(self._path(key, previous[0]))
+		self.prune()
+		return entry
+
+	# The server answered "not modified": the entry is fresh again
+	def revalidated(self, entry: CacheEntry) -> CacheEntry:
+		now = time.time()
+		with self._lock:
+			self._db.execute('UPDATE entry SET stored = ?, used = ? WHERE key = ?', (now, now, entry.key))
+		return entry._replace(stored=now)
+
+	def remove(self, key):
+		with self._lock:
+			row = self._db.execute('SELECT codec FROM entry WHERE key = ?', (key,)).fetchone()
+			self._db.execute('DELETE FROM entry WHERE key = ?', (key,))
+		if row is not None:
+			_remove_quietly(self._path(key, row[0]))
+
+	# Drops the least recently used entries until the rest fit in `max_size`
+	def prune(self):
+		with self._lock:
+			excess = self._db.execute('SELECT coalesce(sum(size), 0) FROM entry').fetchone()[0] - self._max_size
+			if excess <= 0:
+				return
+			evicted = list()
+			for key, codec, size in self._db.execute('SELECT key, codec, size FROM entry ORDER BY used'):
+				if excess <= 0:
+					break
+				evicted.append((key, codec))
+				excess -= size
+			self._db.executemany('DELETE FROM entry WHERE key = ?', ((key,) for key, _ in evicted))
+		for key, codec in evicted:
+			_remove_quietly(self._path(key, codec))
+
+	def clear(self):
+		with self._lock:
+			rows = self._db.execute('SELECT key, codec FROM entry').fetchall()
+			self._db.execute('DELETE FROM entry')
+		for key, codec in rows:
+			_remove_quietly(self._path(key, codec))
+
+
+def _remove_quietly(file_name):
+	try:
+		os.remove(file_name)
+	except OSError:
+		pass
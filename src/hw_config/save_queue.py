@@ -0,0 +1,95 @@
+import os
+import threading
+import traceback
+from typing import Dict, Optional
+
+from PyQt5.QtCore import QCoreApplication, QEvent, QObject, QRunnable, QThreadPool, pyqtSignal
+
+from instrumentation import span
+
+__all__ = ['AUTOSAVE_FLAG', 'AUTOSAVE_ENV', 'SaveQueue', 'autosave_interval_from_argv']
+
+
+# `--autosave SECONDS` or `HW_CONFIG_AUTOSAVE=SECONDS` saves a modified configuration that has a file that often
+AUTOSAVE_FLAG = '--autosave'
+AUTOSAVE_ENV = 'HW_CONFIG_AUTOSAVE'
+
+
+# Autosave interval in seconds, 0 if it is off
+def autosave_interval_from_argv(argv, environ=os.environ) -> float:
+	value = environ.get(AUTOSAVE_ENV)
+	if AUTOSAVE_FLAG in argv:
+		position = argv.index(AUTOSAVE_FLAG)
+		if position + 1 < len(argv):
+			value = argv[position + 1]
+	try:
+		return max(float(value), 0) if value else 0
+	except ValueError:
+		return 0
+
+
+class _SaveTask(QRunnable):
+
+	def __init__(self, queue: 'SaveQueue', file_name):
+		super().__init__()
+		self._queue = queue
+		self._file_name = file_name
+
+	def run(self):
+		self._queue._drain(self._file_name)
+
+
+# Writes configurations on a pool thread, so the GUI never waits for the disk. A format serialises
+# the configuration in memory and replaces the file atomically (see `hw_config_file.write_atomic`).
+# Saves of a path made while an earlier one is still being written are coalesced: only the latest
+# is written next. `saved` and `failed` carry the `token` given to the save they report.
+class SaveQueue(QObject):
+	saved = pyqtSignal(str, object)
+	failed = pyqtSignal(str, object, str, str)
+
+	def __init__(self, pool: QThreadPool = None, parent=None):
+		super().__init__(parent)
+		self._pool = pool or QThreadPool.globalInstance()
+		self._condition = threading.Condition()
+		# Path -> `(file_format, data, token)` of the latest save not being written yet
+		self._pending: Dict[str, tuple] = dict()
+		# Paths a task is writing; it picks up whatever is pending for its path before it finishes
+		self._busy = set()
+
+	# `data` must not change afterwards; a `HardwareConfig` does not
+	def save(self, file_name, file_format, data, token=None):
+		with self._condition:
+			self._pending[file_name] = (file_format, data, token)
+			if file_name in self._busy:
+				return
+			self._busy.add(file_name)
+		self._pool.start(_SaveTask(self, file_name))
+
+	def isBusy(self, file_name: Optional[str] = None):
+		with self._condition:
+			return file_name in self._busy if file_name is not None else bool(self._busy)
+
+	# Blocks until every save made so far is written, then delivers their `saved`/`failed` signals
+	def flush(self, timeout=None) -> bool:
+		with self._condition:
+			done = self._condition.wait_for(lambda: not self._busy, timeout)
+		QCoreApplication.sendPostedEvents(None, QEvent.MetaCall)
+		return done
+
+	def _drain(self, file_name):
+		while True:
+			with self._condition:
+				entry = self._pending.pop(file_name, None)
+				if entry is None:
+					self._busy.discard(file_name)
+					self._condition.notify_all()
+					return
+			file_format, data, token = entry
+			try:
+				with span(f'{type(file_format).__name__}.write', 'io', file=file_name):
+					file_format.write(file_name, data)
+			except Exception as ex:
+				self.failed.emit(file_name, token, str(ex),
+					''.join(traceback.format_exception(type(ex), ex, ex.__traceback__)))
+			else:
+				self.saved.emit(file_name, token)
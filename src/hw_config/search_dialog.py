@@ -1,39 +1,27 @@
+import os.path
+from typing import Optional
 
-from PyQt5.QtCore import QObject, pyqtSlot
+from PyQt5.QtCore import QObject, QThreadPool, QTimer, pyqtSlot
 from PyQt5.QtWidgets import QDialog, QApplication, QGridLayout, QLineEdit, QLabel, QPushButton, QTableView, \
-	QTableWidget, QTableWidgetItem, QDialogButtonBox
+	QDialogButtonBox, QCheckBox
 
-__all__ = ['SearchDialog']
-
-
-def _fetch_goods_from_registry(how_many):
-	req_json = {
-		'opt': {
-			'sort': None,
-			'requireTotalCount': True,
-			'searchOperation': "contains",
-			'searchValue': None,
-			'skip': 0,
-			'take': how_many,
-			'userData': {}
-		}
-	}
-
-	import requests
-	resp = requests.post('https://gisp.gov.ru/pp719v2/pub/prod/rep/b/', json=req_json)
-	return resp.json() if resp.ok else None
+from hw_config_model import Product
+from registry_db import REGISTRY_DB_NAME, RegistryDatabase
+from registry_delta import RegistryDelta
+from registry_index import RankedResult
+from registry_loader import RegistryImportTask
+from registry_model import RegistryTableModel, RegistrySqlTableModel
+from registry_search import RegistrySearchTask
+from registry_snapshot import REGISTRY_SNAPSHOT_NAME, RegistrySnapshot, SnapshotError
+from registry_store import REGISTRY_FILE_NAME
 
-
-def _fetch_goods_from_file(file_name):
-	import io
-	import json
-	with io.open(file_name, 'rt', encoding='utf-8') as file:
-		data = json.load(file)
-	# record_count = data['total_count']
-	return data
+__all__ = ['SearchDialog']
 
 
 class SearchDialog(QObject):
+	# Pause in typing after which the query is run
+	search_delay = 250
+
 	def __init__(self, parent=None, **props):
 		super().__init__(parent, **props)
 
@@ -45,9 +33,15 @@ class SearchDialog(QObject):
 		search_box_label.setBuddy(search_box)
 		search_button = QPushButton("Поиск", clicked=self._updateFilter)
 		self._search_box = search_box
+		self._search_timer = QTimer(self, singleShot=True, interval=self.search_delay, timeout=self._updateFilter)
+		search_box.textChanged.connect(self._search_timer.start)
+		# Closest names first, misspellings included, instead of every name containing the text
+		fuzzy_box = QCheckBox("Похожие", toggled=self._updateFilter)
+		self._fuzzy_box = fuzzy_box
 		layout.addWidget(search_box_label, 0, 0)
 		layout.addWidget(search_box, 0, 1)
-		layout.addWidget(search_button, 0, 2)
+		layout.addWidget(fuzzy_box, 0, 2)
+		layout.addWidget(search_button, 0, 3)
 
 		columns = [
 			# 'gisp_url',
@@ -66,47 +60,206 @@ class SearchDialog(QObject):
 			# 'product_score_desc',
 			# 'product_electronic_product_level',
 		]
-		search_result_table = QTableWidget(columnCount=len(columns))
-		search_result_table.setHorizontalHeaderLabels(columns)
+		search_result_table = QTableView()
 		search_result_table.setSelectionBehavior(QTableView.SelectRows)
 		search_result_table.setSelectionMode(QTableView.SingleSelection)
-		self._fillResultTable(search_result_table, columns)
 		self._search_result_table = search_result_table
-		layout.addWidget(search_result_table, 1, 0, 1, 3)
+		layout.addWidget(search_result_table, 1, 0, 1, 4)
+
+		status_label = QLabel()
+		self._status_label = status_label
+		layout.addWidget(status_label, 2, 0, 1, 3)
 
 		button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel,
 			accepted=dialog.accept,
 			rejected=dialog.reject,
 		)
-		layout.addWidget(button_box, 2, 0, 1, 3)
+		layout.addWidget(button_box, 2, 3)
 
 		dialog.setLayout(layout)
+		dialog.finished.connect(self._cancelLoading)
 		self._dialog = dialog
 
-	def _fillResultTable(self, table: QTableWidget, fields):
-		data = _fetch_goods_from_file('goods.json')
-		records = data['items']
+		self._columns = columns
+		self._database = RegistryDatabase(REGISTRY_DB_NAME)
+		self._snapshot = None
+		self._search_result_model = None
+		self._search_result = None
+		self._search_task = None
+		# Searches do not queue up behind imports and other long tasks of the global pool;
+		# a cancelled one gives up soon, so they run one at a time
+		self._search_pool = QThreadPool(self, maxThreadCount=1)
+		self._load_task = None
+		self._reload()
+
+	def _openSnapshot(self) -> Optional[RegistrySnapshot]:
+		try:
+			snapshot = RegistrySnapshot(REGISTRY_SNAPSHOT_NAME)
+		except (OSError, SnapshotError):
+			return None
+		if snapshot.generation() != self._database.generation():
+			snapshot.close()
+			return None
+		return snapshot
+
+	def _reload(self):
+		if self._load_task is not None:
+			self._load_task.cancel()
+			self._load_task = None
+		self.closeRegistry()
+
+		self._snapshot = self._openSnapshot()
+		if self._snapshot is not None:
+			model = RegistryTableModel(self._snapshot, self._columns, parent=self)
+			self._search_result_table.setModel(model)
+			self._search_result_model = model
+			self._search_result = None
+			self._showRecordCount()
+			self._updateFilter()
+			return
+
+		# Until the snapshot is (re)built, search goes straight to the store
+		model = RegistrySqlTableModel(self._database, self._columns, self._search_pool, parent=self)
+		model.failed.connect(self._showSearchError)
+		self._search_result_table.setModel(model)
+		self._search_result_model = model
+		# The JSON dump is only read once, to seed an empty or half-imported store
+		json_file_name = REGISTRY_FILE_NAME if os.path.exists(REGISTRY_FILE_NAME) else None
+		if not self._database.isComplete() and json_file_name:
+			self._status_label.setText("Импорт реестра...")
+			self._load_task = self._startLoading(json_file_name)
+		elif self._database.isComplete():
+			self._showRecordCount()
+			self._load_task = self._startLoading(None)
+		else:
+			self._showRecordCount()
+		self._updateFilter()
+
+	# Releases the snapshot, so a refresh can replace the file
+	def closeRegistry(self):
+		self._cancelSearch(wait=True)
+		if isinstance(self._search_result_model, RegistrySqlTableModel):
+			self._search_result_model.cancel()
+		self._search_result_table.setModel(None)
+		self._search_result_model = None
+		if self._snapshot is not None:
+			self._snapshot.close()
+			self._snapshot = None
+
+	def _startLoading(self, json_file_name):
+		task = RegistryImportTask(json_file_name, self._database.fileName(), REGISTRY_SNAPSHOT_NAME)
+		task.signals.rowsLoaded.connect(self._onRowsLoaded)
+		task.signals.finished.connect(self._onLoadFinished)
+		task.signals.failed.connect(self._onLoadFailed)
+		task.start()
+		return task
 
-		table.setRowCount(len(records))
-		for i, record in enumerate(records):
-			for k, field in enumerate(fields):
-				item = record[field]
-				if item is not None:
-					table.setItem(i, k, QTableWidgetItem(str(item)))
+	def _isCurrentTask(self):
+		return self._load_task is not None and self.sender() is self._load_task.signals
 
+	@pyqtSlot()
+	def _cancelLoading(self):
+		if self._load_task is not None:
+			self._load_task.cancel()
+
+	@pyqtSlot(int)
+	def _onRowsLoaded(self, row_count):
+		if not self._isCurrentTask():
+			return
+		self._status_label.setText(f"Импортировано записей: {row_count}...")
+		if self._search_result_model.rowCount() < RegistrySqlTableModel.fetch_batch_size:
+			self._search_result_model.refresh()
+
+	@pyqtSlot()
+	def _onLoadFinished(self):
+		if not self._isCurrentTask():
+			return
+		self._load_task = None
+		self._reload()
+
+	def _showRecordCount(self):
+		count = len(self._snapshot) if self._snapshot is not None else self._database.productCount()
+		self._status_label.setText(f"Записей в реестре: {count}")
+
+	@pyqtSlot(str, str)
+	def _onLoadFailed(self, message, details):
+		if not self._isCurrentTask():
+			return
+		self._load_task = None
+		self._status_label.setText(f"Не удалось загрузить реестр: {message}")
+		self._status_label.setToolTip(details)
+
+	# Called after a registry refresh wrote into the store
+	def applyDelta(self, delta: Optional[RegistryDelta]):
+		if delta or self._search_result_model is None:
+			self._reload()
+
+	# Runs the query now on a pool thread, replacing any search still running:
+	# against the snapshot, or against the store a page at a time
 	@pyqtSlot()
 	def _updateFilter(self):
-		null_item = QTableWidgetItem("")
-		query = self._search_box.text().casefold()
-		table = self._search_result_table
-		for i in range(table.rowCount()):
-			item = table.item(i, 1) or null_item
-			table.setRowHidden(i, query not in item.text().casefold())
+		self._search_timer.stop()
+		self._cancelSearch()
+		query = self._search_box.text()
+		if self._snapshot is None:
+			self._search_result_model.setQuery(query)
+			return
+		ranked = self._fuzzy_box.isChecked() and bool(query.strip())
+		task = RegistrySearchTask(self._snapshot.index(), query, self._search_result, ranked,
+			RegistryTableModel.fetch_batch_size)
+		task.signals.finished.connect(self._onSearchFinished)
+		task.signals.failed.connect(self._onSearchFailed)
+		task.start(self._search_pool)
+		self._search_task = task
+
+	def _cancelSearch(self, wait=False):
+		if self._search_task is not None:
+			self._search_task.cancel()
+			if wait:
+				self._search_task.wait()
+			self._search_task = None
+
+	def _isCurrentSearch(self):
+		return self._search_task is not None and self.sender() is self._search_task.signals
+
+	@pyqtSlot(object)
+	def _onSearchFinished(self, result):
+		if not self._isCurrentSearch():
+			return
+		self._search_task = None
+		if isinstance(result, RankedResult):
+			self._search_result_model.setRows(result.rows)
+			return
+		# Narrows down the next, refined query
+		self._search_result = result
+		self._search_result_model.setSearchResult(result, self._snapshot.index())
+
+	@pyqtSlot(str, str)
+	def _onSearchFailed(self, message, details):
+		if not self._isCurrentSearch():
+			return
+		self._search_task = None
+		self._showSearchError(message, details)
+
+	@pyqtSlot(str, str)
+	def _showSearchError(self, message, details):
+		self._status_label.setText(f"Ошибка поиска: {message}")
+		self._status_label.setToolTip(details)
+
+	# The product of the selected row, looked up in the store
+	def selectedProduct(self) -> Optional[Product]:
+		selection = self._search_result_table.selectionModel()
+		rows = selection.selectedRows(self._columns.index('product_reg_number')) if selection is not None else ()
+		return self._database.product(rows[0].data()) if rows else None
 
 	def show(self):
+		if self._search_result_model is None or self._load_task is not None and self._load_task.isCancelled():
+			self._reload()
 		self._dialog.show()
 
 	def exec(self) -> QDialog.DialogCode:
+		if self._search_result_model is None or self._load_task is not None and self._load_task.isCancelled():
+			self._reload()
 		return self._dialog.exec()
 
 
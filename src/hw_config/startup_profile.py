@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+from typing import Callable
+
+from PyQt5.QtCore import QObject, QEvent
+from PyQt5.QtWidgets import QWidget
+
+__all__ = ['PROFILE_STARTUP_FLAG', 'PROFILE_STARTUP_ENV', 'StartupProfile', 'callOnFirstPaint']
+
+
+PROFILE_STARTUP_FLAG = '--profile-startup'
+PROFILE_STARTUP_ENV = 'HW_CONFIG_PROFILE_STARTUP'
+
+
+# Time spent in each startup phase, printed to stderr once the window is up.
+# A phase lasts from the previous mark (or `started`) to its own mark.
+class StartupProfile:
+
+	def __init__(self, started: float = None, enabled=False, stream=None):
+		self._enabled = enabled
+		self._stream = stream or sys.stderr
+		self._started = time.perf_counter() if started is None else started
+		self._last = self._started
+		self._phases = list()
+
+	@classmethod
+	def fromArgv(cls, argv, started: float = None) -> 'StartupProfile':
+		enabled = PROFILE_STARTUP_FLAG in argv or bool(os.environ.get(PROFILE_STARTUP_ENV))
+		return cls(started, enabled)
+
+	def enabled(self):
+		return self._enabled
+
+	def mark(self, phase):
+		now = time.perf_counter()
+		self._phases.append((phase, now - self._last))
+		self._last = now
+
+	def report(self):
+		if not self._enabled:
+			return
+		for phase, seconds in self._phases:
+			print(f"startup: {phase:<20} {seconds * 1000:8.1f} ms", file=self._stream)
+		print(f"startup: {'total':<20} {(self._last - self._started) * 1000:8.1f} ms", file=self._stream)
+
+
+class _FirstPaintFilter(QObject):
+
+	def __init__(self, callback: Callable[[], None], parent: QWidget):
+		super().__init__(parent)
+		self._callback = callback
+
+	def eventFilter(self, watched, event: QEvent):
+		if event.type() == QEvent.Paint:
+			watched.removeEventFilter(self)
+			self.deleteLater()
+			self._callback()
+		return False
+
+
+# Calls `callback` right before `widget` is painted for the first time
+def callOnFirstPaint(widget: QWidget, callback: Callable[[], None]):
+	widget.installEventFilter(_FirstPaintFilter(callback, widget))
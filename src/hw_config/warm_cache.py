@@ -0,0 +1,84 @@
+import io
+import json
+import os
+from typing import Any, Optional
+
+from PyQt5.QtCore import QStandardPaths
+
+__all__ = ['WARM_CACHE_NAME', 'WarmStartCache', 'file_stamp']
+
+
+WARM_CACHE_NAME = 'warm_start.json'
+# Bumped whenever the layout of the cached entries changes
+_CACHE_VERSION = 1
+
+
+# Modification time and size of each file (`None` for a missing one); a cached value derived
+# from the files stays valid as long as this does not change
+def file_stamp(*file_names) -> list:
+	stamp = list()
+	for file_name in file_names:
+		try:
+			st = os.stat(file_name)
+		except OSError:
+			stamp.append(None)
+		else:
+			stamp.append([st.st_mtime_ns, st.st_size])
+	return stamp
+
+
+# What the previous run found out and the next one can reuse, kept as JSON in the application data
+# directory. A cache written by another application version is ignored as a whole.
+class WarmStartCache:
+
+	def __init__(self, file_name, version):
+		self._file_name = file_name
+		self._version = f'{version}/{_CACHE_VERSION}'
+		self._data = self._read()
+		self._dirty = False
+
+	@classmethod
+	def forApplication(cls, version) -> 'WarmStartCache':
+		directory = QStandardPaths.writableLocation(QStandardPaths.AppDataLocation)
+		return cls(os.path.join(directory, WARM_CACHE_NAME), version)
+
+	def directory(self):
+		return os.path.dirname(self._file_name)
+
+	def _read(self) -> dict:
+		try:
+			with io.open(self._file_name, 'rt', encoding='utf-8') as file:
+				data = json.load(file)
+		except (OSError, ValueError):
+			return dict()
+		if not isinstance(data, dict) or data.get('version') != self._version:
+			return dict()
+		return data.get('entries', dict())
+
+	def get(self, key, default=None) -> Any:
+		return self._data.get(key, default)
+
+	def set(self, key, value):
+		if self._data.get(key) != value:
+			self._data[key] = value
+			self._dirty = True
+
+	# A value derived from `file_names`, or `None` if any of them changed since it was stored
+	def getFor(self, key, *file_names) -> Optional[Any]:
+		entry = self._data.get(key)
+		if not isinstance(entry, dict) or entry.get('stamp') != file_stamp(*file_names):
+			return None
+		return entry.get('value')
+
+	def setFor(self, key, value, *file_names):
+		self.set(key, dict(stamp=file_stamp(*file_names), value=value))
+
+	def save(self):
+		if not self._dirty:
+			return
+		os.makedirs(self.directory(), exist_ok=True)
+		temp_name = f'{self._file_name}.tmp'
+		with io.open(temp_name, 'wt', encoding='utf-8') as file:
+			json.dump(dict(version=self._version, entries=self._data), file, ensure_ascii=False, indent=1)
+		os.replace(temp_name, self._file_name)
+		self._dirty = False
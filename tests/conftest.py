@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# The application modules import each other by their plain names, as when run from src/hw_config
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src', 'hw_config'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+
+@pytest.fixture(scope='session')
+def qapp():
+	from PyQt5.QtWidgets import QApplication
+	return QApplication.instance() or QApplication([])
+
+
+# Registry records with names in both scripts, mixed-script look-alikes, quotes and punctuation
+def make_records(count, prefix='РЭП'):
+	names = (
+		"Монитор Samsung S24 «Сова»",
+		"Системный блок OМ238I",
+		"Клавиатура Oklick 130M",
+		"Мышь оптическая Sven RX-30",
+		"monitor LG 27\"",
+		"Moнитор AOC (ч/б)",
+		"ПК \"Бештау\" pc5-2021",
+	)
+	return [
+		dict(product_reg_number=f'{prefix}-{i:05}', product_name=f'{names[i % len(names)]} {i}')
+		for i in range(count)
+	]
@@ -0,0 +1,62 @@
+import os
+
+import pytest
+
+import hw_config_file
+from hw_config_file import JsonFormat, write_atomic
+from hw_config_model import HardwareConfig
+
+
+def test_write_atomic_replaces_the_file(tmp_path):
+	file_name = tmp_path / 'config.json'
+	file_name.write_text('old', encoding='utf-8')
+	write_atomic(str(file_name), 'новое')
+	assert file_name.read_text(encoding='utf-8') == 'новое'
+	assert os.listdir(tmp_path) == ['config.json']
+
+
+@pytest.mark.parametrize('sync', (True, False))
+def test_failed_write_leaves_the_original(tmp_path, sync):
+	file_name = tmp_path / 'config.json'
+	file_name.write_text('old', encoding='utf-8')
+	# A lone surrogate cannot be encoded, so writing fails half way
+	with pytest.raises(UnicodeEncodeError):
+		write_atomic(str(file_name), 'начало' * 1000 + '\ud800', sync)
+	assert file_name.read_text(encoding='utf-8') == 'old'
+	assert os.listdir(tmp_path) == ['config.json']
+
+
+def test_failed_replace_leaves_the_original(tmp_path, monkeypatch):
+	file_name = tmp_path / 'config.json'
+	file_name.write_text('old', encoding='utf-8')
+
+	def replace(source, target):
+		raise PermissionError(target)
+
+	monkeypatch.setattr(hw_config_file.os, 'replace', replace)
+	with pytest.raises(PermissionError):
+		write_atomic(str(file_name), 'new')
+	assert file_name.read_text(encoding='utf-8') == 'old'
+	assert os.listdir(tmp_path) == ['config.json']
+
+
+def test_missing_directory_fails_without_leftovers(tmp_path):
+	with pytest.raises(OSError):
+		write_atomic(str(tmp_path / 'missing' / 'config.json'), 'text')
+	assert os.listdir(tmp_path) == []
+
+
+def test_format_write_is_atomic(tmp_path, monkeypatch):
+	file_name = str(tmp_path / 'config.json')
+	config = HardwareConfig(dict(systemUnit="Системный блок OМ238I", monitor="Монитор Samsung S24"))
+	JsonFormat().write(file_name, config)
+	assert JsonFormat().read(file_name) == config
+
+	def dumps(data):
+		raise RuntimeError("serialisation failed")
+
+	monkeypatch.setattr(JsonFormat, 'dumps', staticmethod(dumps))
+	with pytest.raises(RuntimeError):
+		JsonFormat().write(file_name, HardwareConfig())
+	monkeypatch.undo()
+	assert JsonFormat().read(file_name) == config
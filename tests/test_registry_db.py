@@ -0,0 +1,78 @@
+import pytest
+
+from conftest import make_records
+from registry_db import RegistryDatabase
+from registry_delta import RegistryDelta
+
+
+@pytest.fixture
+def database(tmp_path):
+	database = RegistryDatabase(str(tmp_path / 'goods.db'))
+	yield database
+	database.close()
+
+
+def reg_numbers(database):
+	return [reg_number for reg_number, _ in database.iterRows()]
+
+
+def test_apply_inserts_updates_and_removes(database):
+	records = make_records(10)
+	assert database.applyRecords(records) == RegistryDelta(inserted=10)
+	assert database.isComplete()
+	generation = database.generation()
+
+	# Unchanged records are not rewritten, and nothing changed leaves the generation alone
+	assert database.applyRecords(records) == RegistryDelta()
+	assert database.generation() == generation
+
+	changed = [dict(record) for record in records[:8]]
+	changed[0]['product_name'] = "Монитор Philips"
+	assert database.applyRecords(changed) == RegistryDelta(updated=1, removed=2)
+	assert reg_numbers(database) == [record['product_reg_number'] for record in records[:8]]
+	assert database.product(records[0]['product_reg_number']).name == "Монитор Philips"
+	assert database.generation() > generation
+
+
+def test_records_without_key_are_skipped(database):
+	records = make_records(3) + [dict(product_name="Без номера")]
+	assert database.applyRecords(records) == RegistryDelta(inserted=3)
+
+
+def test_remove_unseen_off_keeps_missing_records(database):
+	records = make_records(10)
+	database.applyRecords(records)
+	assert database.applyRecords(records[:3], remove_unseen=False) == RegistryDelta()
+	assert database.productCount() == 10
+
+
+@pytest.mark.parametrize('expected_count, removed', [
+	(None, 7),
+	# As many as the registry reported came: the rest is gone from it
+	(3, 7),
+	# A truncated download must not empty the store
+	(10, 0),
+	(0, 0),
+])
+def test_expected_count_guards_removal(database, expected_count, removed):
+	records = make_records(10)
+	database.applyRecords(records)
+	delta = database.applyRecords(records[:3], expected_count=expected_count)
+	assert delta.removed == removed
+	assert database.productCount() == 10 - removed
+
+
+def test_empty_download_with_total_removes_nothing(database):
+	database.applyRecords(make_records(5))
+	assert database.applyRecords([], expected_count=5) == RegistryDelta()
+	assert database.productCount() == 5
+
+
+@pytest.mark.parametrize('commit_every', (None, 2))
+def test_commit_every_gives_the_same_result(database, commit_every):
+	records = make_records(7)
+	database.applyRecords(make_records(9, prefix='OLD'))
+	delta = database.applyRecords(records, batch_size=3, commit_every=commit_every)
+	assert delta == RegistryDelta(inserted=7, removed=9)
+	assert reg_numbers(database) == [record['product_reg_number'] for record in records]
+	assert database.isComplete()
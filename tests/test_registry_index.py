@@ -0,0 +1,118 @@
+import pytest
+
+from conftest import make_records
+from registry_db import RegistryDatabase
+from registry_index import RegistryIndex, normalize_text
+from registry_store import REGISTRY_COLUMNS, RegistryColumns
+
+
+@pytest.mark.parametrize('text, expected', [
+	("Монитор", 'monitor'),
+	("MONITOR", 'monitor'),
+	# Look-alike Latin letters in a Cyrillic word and the other way round
+	("Moнитор", 'monitor'),
+	("OМ238I", 'om238i'),
+	("«Сова»", 'sova'),
+	("Бештау pc5-2021", 'beshtau pc5 2021'),
+	("  ч/б  ", 'ch b'),
+	("Ёлка щит", 'elka schit'),
+	("", ''),
+	("«»—", ''),
+])
+def test_normalize_text(text, expected):
+	assert normalize_text(text) == expected
+
+
+def test_homoglyphs_compare_equal():
+	# Latin "O", Cyrillic "М"; all Latin; all Cyrillic
+	assert normalize_text("OМ238I") == normalize_text("om238i") == normalize_text("ОМ238І".replace("І", "I"))
+
+
+def build_index(records):
+	store = RegistryColumns()
+	for record in records:
+		store.appendRecord(record)
+	index = RegistryIndex(store)
+	index.update()
+	return store, index
+
+
+RECORDS = make_records(300)
+
+QUERIES = (
+	'', ' ', 'м', 'mo', 'мон', 'монитор', 'monitor', 'MONITOR', 'Moнитор', 'sova', '«Сова»', 'om238i', 'OМ238I',
+	'бештау pc5', 'pc5-2021', '2021', '1', '12', '123', 'рэп 000', 'rx-30', 'ч/б', 'нет такого', 'zz', 'lg 27',
+)
+
+
+def expected_rows(store, query):
+	text = normalize_text(query)
+	if not text:
+		return None
+	return [
+		row for row in range(len(store))
+		if any(text in normalize_text(store.cell(row, column)) for column in range(len(REGISTRY_COLUMNS)))
+	]
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_search_finds_substrings_of_normalised_text(query):
+	store, index = build_index(RECORDS)
+	rows = index.search(query).rows
+	assert (list(rows) if rows is not None else None) == expected_rows(store, query)
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_limited_search_continues_to_the_same_rows(query):
+	store, index = build_index(RECORDS)
+	result = index.search(query, limit=5)
+	if result.rows is None:
+		assert expected_rows(store, query) is None
+		return
+	# Unless nothing was left to check
+	assert len(result.rows) <= 5 or result.pending is None
+	while result.pending is not None:
+		result = index.searchMore(result, 7)
+	assert list(result.rows) == expected_rows(store, query)
+
+
+def test_refined_query_narrows_the_previous_result():
+	store, index = build_index(RECORDS)
+	previous = None
+	for end in range(1, len("монитор") + 1):
+		query = "монитор"[:end]
+		previous = index.search(query, previous)
+		assert list(previous.rows) == expected_rows(store, query)
+
+
+def test_rows_added_to_the_store_are_indexed():
+	store, index = build_index(RECORDS[:10])
+	previous = index.search('monitor')
+	for record in RECORDS[10:]:
+		store.appendRecord(record)
+	index.update()
+	# The previous result was made over fewer rows, so it must not narrow this one
+	assert list(index.search('monitor', previous).rows) == expected_rows(store, 'monitor')
+
+
+def test_search_matches_the_store():
+	store, index = build_index(RECORDS)
+	database = RegistryDatabase(':memory:')
+	try:
+		database.applyRecords(RECORDS)
+		for query in QUERIES:
+			rows = index.search(query).rows
+			found = [store.cell(row, 0) for row in (rows if rows is not None else range(len(store)))]
+			assert [reg_number for reg_number, _ in database.search(query, 0, len(RECORDS) + 1)] == found, query
+	finally:
+		database.close()
+
+
+def test_rank_prefers_closest_rows():
+	store, index = build_index(RECORDS)
+	result = index.rank("Мониторр Samsung", limit=5)
+	assert result.rows
+	assert all("Samsung" in store.cell(row, 1) for row in result.rows)
+	assert list(result.scores) == sorted(result.scores, reverse=True)
+	# Too short for a trigram: the plain search is used
+	assert len(index.rank('м', limit=3).rows) == 3
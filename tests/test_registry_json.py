@@ -0,0 +1,86 @@
+import io
+import json
+
+import pytest
+
+from registry_json import iter_goods_items, iter_json_items, load_goods_columns
+
+
+# Hands the parser `size` characters per read, so values are cut at every possible place
+class TrickleReader(io.StringIO):
+
+	def __init__(self, text, size):
+		super().__init__(text)
+		self._size = size
+
+	def read(self, size=-1):
+		return super().read(self._size if size is None or size < 0 else min(size, self._size))
+
+
+VALUES = [
+	{'a': 1, 'b': [1.25, -3e5, 10, []], 'c': "строка с \"кавычками\" и \\u0441"},
+	{},
+	12345.678,
+	"«ёлка»",
+	None,
+	True,
+	{'nested': {'deep': [{'x': 0}, {}]}},
+]
+
+
+@pytest.mark.parametrize('size', range(1, 17))
+def test_json_lines_across_chunk_boundaries(size):
+	text = '\n'.join(json.dumps(value, ensure_ascii=False) for value in VALUES) + '\n'
+	assert list(iter_json_items(TrickleReader(text, size))) == VALUES
+
+
+@pytest.mark.parametrize('size', range(1, 17))
+def test_top_level_array_yields_items(size):
+	text = json.dumps(VALUES, ensure_ascii=False, indent='\t')
+	assert list(iter_json_items(TrickleReader(text, size))) == VALUES
+
+
+@pytest.mark.parametrize('text, expected', [
+	('1 23 456', [1, 23, 456]),
+	('1.5e3\n-0.25', [1500.0, -0.25]),
+	('[]', []),
+	('', []),
+	('[1,2] [3]', [1, 2, 3]),
+])
+def test_numbers_and_empty_input(text, expected):
+	for size in range(1, len(text) + 2):
+		assert list(iter_json_items(TrickleReader(text, size))) == expected
+
+
+def test_truncated_input_fails():
+	with pytest.raises(json.JSONDecodeError):
+		list(iter_json_items(TrickleReader('[{"a": 1}, {"b"', 3)))
+
+
+@pytest.mark.parametrize('size', (1, 2, 5, 64))
+def test_goods_items_skip_other_keys(size):
+	goods = {
+		'total_count': 2,
+		'meta': {'items': ['not these']},
+		'items': [
+			{'product_reg_number': '1', 'product_name': "Монитор", 'extra': [1, 2]},
+			{'product_reg_number': '2', 'product_name': None},
+		],
+		'after': "}]",
+	}
+	text = json.dumps(goods, ensure_ascii=False)
+	assert list(iter_goods_items(TrickleReader(text, size))) == goods['items']
+	assert list(iter_goods_items(TrickleReader(text, size), ('product_name', 'missing'))) == \
+		[("Монитор", None), (None, None)]
+
+
+def test_load_goods_columns(tmp_path):
+	file_name = tmp_path / 'goods.json'
+	file_name.write_text(json.dumps({'items': [
+		{'product_reg_number': 'A-1', 'product_name': "Клавиатура"},
+		{'product_reg_number': 'A-2'},
+	]}, ensure_ascii=False), encoding='utf-8')
+	store = load_goods_columns(str(file_name))
+	assert len(store) == 2
+	assert store.row(0) == ('A-1', "Клавиатура")
+	assert store.row(1) == ('A-2', '')
@@ -0,0 +1,80 @@
+import array
+
+import pytest
+
+from conftest import make_records
+from registry_index import RegistryIndex
+from registry_snapshot import RegistrySnapshot, SnapshotError, write_snapshot
+from registry_store import REGISTRY_COLUMNS, RegistryColumns
+
+ROWS = [(record['product_reg_number'], record['product_name']) for record in make_records(200)] + [
+	('ПУСТО-1', ''),
+	('ПУСТО-2', None),
+]
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+	file_name = str(tmp_path / 'goods.snap')
+	features = array.array('B', (row % 7 for row in range(len(ROWS))))
+	write_snapshot(file_name, ROWS, generation=42, arrays=dict(features=features))
+	snapshot = RegistrySnapshot(file_name)
+	yield snapshot
+	snapshot.close()
+
+
+def test_rows_round_trip(snapshot):
+	assert len(snapshot) == len(ROWS)
+	assert snapshot.fields() == REGISTRY_COLUMNS
+	assert snapshot.generation() == 42
+	for row, values in enumerate(ROWS):
+		assert snapshot.row(row) == (values[0], values[1] or '')
+		assert snapshot.cell(row, 1) == (values[1] or '')
+	assert snapshot.column('product_reg_number')[3] == ROWS[3][0]
+
+
+def test_arrays_round_trip(snapshot):
+	assert list(snapshot.array('features')) == [row % 7 for row in range(len(ROWS))]
+	assert snapshot.array('missing') is None
+
+
+def test_arrays_must_have_a_value_per_row(tmp_path):
+	with pytest.raises(ValueError):
+		write_snapshot(str(tmp_path / 'goods.snap'), ROWS, arrays=dict(features=array.array('B', [1])))
+
+
+@pytest.mark.parametrize('query', ('', 'м', 'mo', 'монитор', 'MONITOR', 'sova', 'om238i', 'pc5-2021', 'нет такого'))
+def test_mapped_index_searches_like_a_built_one(snapshot, query):
+	store = RegistryColumns()
+	store.extend(ROWS)
+	index = RegistryIndex(store)
+	index.update()
+	expected, found = index.search(query), snapshot.index().search(query)
+	assert found.query == expected.query
+	assert (list(found.rows) if found.rows is not None else None) == \
+		(list(expected.rows) if expected.rows is not None else None)
+	ranked = snapshot.index().rank(query, limit=10)
+	assert ranked == index.rank(query, limit=10)
+
+
+def test_rejects_files_that_are_not_snapshots(tmp_path):
+	empty = tmp_path / 'empty.snap'
+	empty.write_bytes(b'')
+	with pytest.raises(SnapshotError):
+		RegistrySnapshot(str(empty))
+	other = tmp_path / 'other.snap'
+	other.write_bytes(b'{"items": []}' + b' ' * 64)
+	with pytest.raises(SnapshotError):
+		RegistrySnapshot(str(other))
+
+
+def test_replaced_atomically(tmp_path):
+	file_name = str(tmp_path / 'goods.snap')
+	write_snapshot(file_name, ROWS[:5], generation=1)
+	write_snapshot(file_name, ROWS[:7], generation=2)
+	snapshot = RegistrySnapshot(file_name)
+	try:
+		assert (len(snapshot), snapshot.generation()) == (7, 2)
+	finally:
+		snapshot.close()
+	assert [path.name for path in tmp_path.iterdir()] == ['goods.snap']
@@ -0,0 +1,184 @@
+import json
+import threading
+from concurrent.futures import CancelledError
+
+import pytest
+
+from conftest import make_records
+from registry_db import RegistryDatabase
+from registry_delta import RegistryDelta
+from registry_sync import RegistrySync, RegistrySyncError
+from response_cache import ResponseCache
+
+requests = pytest.importorskip('requests')
+
+PAGE_SIZE = 4
+
+
+class FakeResponse:
+
+	def __init__(self, status_code, payload=None, headers=None):
+		self.status_code = status_code
+		self.headers = headers or dict()
+		self._body = json.dumps(payload, ensure_ascii=False).encode('utf-8') if payload is not None else b''
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		pass
+
+	def raise_for_status(self):
+		if self.status_code >= 400:
+			raise requests.HTTPError(f"{self.status_code}")
+
+	def json(self):
+		return json.loads(self._body)
+
+	def iter_content(self, size):
+		for start in range(0, len(self._body), size):
+			yield self._body[start:start + size]
+
+
+# Serves `records` a page at a time, answering conditional requests with 304 when `etag` matches.
+# `failures` maps a page number to how many requests for it fail before one succeeds.
+class FakeRegistry:
+
+	def __init__(self, records, failures=None, etag='"v1"', offline=False):
+		self.records = records
+		self.failures = dict(failures or ())
+		self.etag = etag
+		self.offline = offline
+		self.requests = list()
+		self._lock = threading.Lock()
+
+	# `json=` without a cache, a `data=` body with one
+	def post(self, url, data=None, headers=None, timeout=None, stream=False, **kwargs):
+		request = kwargs['json'] if 'json' in kwargs else json.loads(data)
+		skip, take = request['opt']['skip'], request['opt']['take']
+		page_no = skip // take
+		headers = headers or dict()
+		with self._lock:
+			self.requests.append((page_no, headers.get('If-None-Match')))
+			if self.offline:
+				raise requests.ConnectionError("offline")
+			if self.failures.get(page_no, 0) > 0:
+				self.failures[page_no] -= 1
+				raise requests.ConnectionError(f"page {page_no} failed")
+		if headers.get('If-None-Match') == self.etag:
+			return FakeResponse(304)
+		page = dict(total_count=len(self.records), items=self.records[skip:skip + take])
+		return FakeResponse(200, page, {'ETag': self.etag})
+
+	def pagesRequested(self):
+		return sorted(page_no for page_no, _ in self.requests)
+
+
+@pytest.fixture
+def database(tmp_path):
+	database = RegistryDatabase(str(tmp_path / 'goods.db'))
+	yield database
+	database.close()
+
+
+def make_sync(tmp_path, session, **kwargs):
+	kwargs.setdefault('retries', 2)
+	return RegistrySync(str(tmp_path / 'spool'), page_size=PAGE_SIZE, concurrency=2, backoff=0, session=session,
+		**kwargs)
+
+
+def stored(database):
+	return [reg_number for reg_number, _ in database.iterRows()]
+
+
+def test_downloads_every_page_and_applies_it(tmp_path, database):
+	records = make_records(10)
+	registry = FakeRegistry(records)
+	sync = make_sync(tmp_path, registry)
+	progress = list()
+	assert sync.run(lambda done, total: progress.append((done, total))) == 10
+	assert registry.pagesRequested() == [0, 1, 2]
+	assert progress[-1] == (10, 10)
+	assert sync.applyTo(database) == RegistryDelta(inserted=10)
+	assert stored(database) == [record['product_reg_number'] for record in records]
+	# The spool is dropped once applied
+	assert not (tmp_path / 'spool').exists()
+
+
+def test_failed_requests_are_retried(tmp_path, database):
+	registry = FakeRegistry(make_records(10), failures={0: 1, 2: 2})
+	make_sync(tmp_path, registry).run()
+	assert registry.pagesRequested() == [0, 0, 1, 2, 2, 2]
+
+
+def test_gives_up_after_the_retries_and_resumes_later(tmp_path, database):
+	records = make_records(10)
+	with pytest.raises(RegistrySyncError):
+		make_sync(tmp_path, FakeRegistry(records, failures={2: 5})).run()
+	# Only the missing page is fetched again
+	registry = FakeRegistry(records)
+	sync = make_sync(tmp_path, registry)
+	assert sync.run() == 10
+	assert registry.pagesRequested() == [2]
+	assert sync.applyTo(database) == RegistryDelta(inserted=10)
+
+
+def test_cancelled_run_stops(tmp_path):
+	sync = make_sync(tmp_path, FakeRegistry(make_records(10)))
+	sync.cancel()
+	with pytest.raises(CancelledError):
+		sync.run()
+
+
+@pytest.fixture
+def cache(tmp_path):
+	cache = ResponseCache(str(tmp_path / 'cache'), ttl=0)
+	yield cache
+	cache.close()
+
+
+def test_outdated_cached_pages_are_revalidated(tmp_path, database, cache):
+	records = make_records(10)
+	make_sync(tmp_path, FakeRegistry(records), cache=cache).run()
+	make_sync(tmp_path, FakeRegistry(records), cache=cache).applyTo(database)
+
+	# Every page is asked for conditionally and answered "not modified"
+	registry = FakeRegistry(records)
+	sync = make_sync(tmp_path, registry, cache=cache)
+	sync.run()
+	assert sorted(registry.requests) == [(0, '"v1"'), (1, '"v1"'), (2, '"v1"')]
+	database.applyRecords(make_records(2, prefix='УДАЛЁН'), remove_unseen=False)
+	# Pages revalidated are current, so records gone from the registry are removed
+	assert sync.applyTo(database) == RegistryDelta(removed=2)
+
+
+def test_changed_pages_replace_cached_ones(tmp_path, database, cache):
+	records = make_records(10)
+	make_sync(tmp_path, FakeRegistry(records), cache=cache).run()
+	make_sync(tmp_path, FakeRegistry(records), cache=cache).applyTo(database)
+
+	changed = [dict(record) for record in records]
+	changed[5]['product_name'] = "Монитор Philips"
+	sync = make_sync(tmp_path, FakeRegistry(changed, etag='"v2"'), cache=cache)
+	sync.run()
+	assert sync.applyTo(database) == RegistryDelta(updated=1)
+
+
+def test_stale_pages_do_not_remove_records(tmp_path, database, cache):
+	records = make_records(10)
+	make_sync(tmp_path, FakeRegistry(records), cache=cache).run()
+	make_sync(tmp_path, FakeRegistry(records), cache=cache).applyTo(database)
+	database.applyRecords(make_records(2, prefix='ЛИШНИЙ'), remove_unseen=False)
+
+	# Offline: the outdated cached pages are used as they are
+	sync = make_sync(tmp_path, FakeRegistry(records, offline=True), cache=cache)
+	assert sync.run() == 10
+	state = json.loads((tmp_path / 'spool' / 'state.json').read_text(encoding='utf-8'))
+	assert state['stale'] == [0, 1, 2]
+	assert sync.applyTo(database) == RegistryDelta()
+	assert len(stored(database)) == 12
+
+
+def test_offline_without_a_cached_page_fails(tmp_path, cache):
+	with pytest.raises(RegistrySyncError):
+		make_sync(tmp_path, FakeRegistry(make_records(10), offline=True), cache=cache).run()
@@ -0,0 +1,90 @@
+import threading
+
+import pytest
+from PyQt5.QtCore import QThreadPool
+
+from save_queue import SaveQueue, autosave_interval_from_argv
+
+
+# Records what it is asked to write; the first write of a path waits for `gate`
+class RecordingFormat:
+
+	def __init__(self, fail=()):
+		self.gate = threading.Event()
+		self.started = threading.Event()
+		self.written = list()
+		self._fail = set(fail)
+
+	def write(self, file_name, data):
+		self.started.set()
+		self.gate.wait(5)
+		if data in self._fail:
+			raise OSError(f"cannot write {data}")
+		self.written.append((file_name, data))
+
+
+@pytest.fixture
+def queue(qapp):
+	pool = QThreadPool()
+	pool.setMaxThreadCount(2)
+	queue = SaveQueue(pool)
+	events = list()
+	queue.saved.connect(lambda file_name, token: events.append(('saved', file_name, token)))
+	queue.failed.connect(lambda file_name, token, message, details: events.append(('failed', file_name, token)))
+	queue.events = events
+	yield queue
+	pool.waitForDone()
+
+
+def test_saves_made_while_writing_are_coalesced(queue):
+	file_format = RecordingFormat()
+	queue.save('a.json', file_format, 1, token='t1')
+	assert file_format.started.wait(5)
+	for data in (2, 3, 4):
+		queue.save('a.json', file_format, data, token=f't{data}')
+	assert queue.isBusy('a.json')
+	file_format.gate.set()
+	assert queue.flush(5)
+	# The first write and only the latest of those made meanwhile
+	assert file_format.written == [('a.json', 1), ('a.json', 4)]
+	assert queue.events == [('saved', 'a.json', 't1'), ('saved', 'a.json', 't4')]
+	assert not queue.isBusy()
+
+
+def test_paths_are_saved_independently(queue):
+	file_format = RecordingFormat()
+	file_format.gate.set()
+	queue.save('a.json', file_format, 1)
+	queue.save('b.json', file_format, 2)
+	assert queue.flush(5)
+	assert sorted(file_format.written) == [('a.json', 1), ('b.json', 2)]
+
+
+def test_failure_is_reported_with_its_token(queue):
+	file_format = RecordingFormat(fail={1})
+	file_format.gate.set()
+	queue.save('a.json', file_format, 1, token='t1')
+	assert queue.flush(5)
+	queue.save('a.json', file_format, 2, token='t2')
+	assert queue.flush(5)
+	assert queue.events == [('failed', 'a.json', 't1'), ('saved', 'a.json', 't2')]
+
+
+def test_flush_times_out_on_a_hung_write(queue):
+	file_format = RecordingFormat()
+	queue.save('a.json', file_format, 1)
+	assert not queue.flush(0.05)
+	file_format.gate.set()
+	assert queue.flush(5)
+
+
+@pytest.mark.parametrize('argv, environ, expected', [
+	([], {}, 0),
+	(['--autosave', '30'], {}, 30),
+	(['--autosave'], {'HW_CONFIG_AUTOSAVE': '5'}, 5),
+	([], {'HW_CONFIG_AUTOSAVE': '2.5'}, 2.5),
+	(['--autosave', 'never'], {}, 0),
+	(['--autosave', '-1'], {}, 0),
+])
+def test_autosave_interval(argv, environ, expected):
+	assert autosave_interval_from_argv(argv, environ) == expected